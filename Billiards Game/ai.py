@@ -0,0 +1,198 @@
+"""
+Đối thủ máy (computer player) cho pool, snooker và carom.
+
+Máy chọn cú đánh bằng cách lấy mẫu nhiều cặp (angle, power), mô phỏng từng
+cú từ trạng thái bàn hiện tại bằng physics headless và chấm điểm kết quả
+bằng đúng luật của game (rules.GameRules: score_pool_ball,
+score_snooker_ball, kiểm tra carom). Vì physics là tất định nên cú đánh được
+chọn sẽ cho đúng kết quả đã mô phỏng.
+
+Việc tìm kiếm chạy trên process pool trong một ngân sách thời gian; Game chỉ
+gọi poll() mỗi frame nên giao diện không bao giờ bị chặn. Độ khó = số mẫu
+được thử (DIFFICULTY_SAMPLES).
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from levels import rule_set_of, simulation_class
+from physics import from_snapshot, snapshot
+from rules import GameRules, shot_velocity
+
+DIFFICULTY_SAMPLES = {'easy': 8, 'normal': 32, 'hard': 128}
+TIME_BUDGET = 3.0  # seconds of search before the best shot found so far is played
+FOUL_PENALTY = 10  # value of a foul (scratch, wrong ball) in points
+POWERS = (0.45, 0.7, 0.95)  # tried for every aimed candidate
+
+
+def evaluate_shot(sim, rules, angle, power, mode='step'):
+    """Play one shot on a scratch simulation; returns its value for the shooter."""
+    before = rules.score
+    rules.begin_shot()
+    sim.shoot(*shot_velocity(angle, power))
+    sim.run_until_rest(on_event=rules.handle_physics_event, mode=mode)
+    rules.finish_shot()
+    return rules.score - before - FOUL_PENALTY * len(rules.shot_fouls)
+
+
+def evaluate_batch(job):
+    """
+    Worker entry point. job: (snapshot, rules_state, [(i, angle, power)],
+    deadline, mode, backend, substeps); backend and substeps are the game's,
+    so shots are planned on the physics they will be played on. Stops at the
+    wall-clock deadline; returns [(value, i)].
+    """
+    snap, rules_state, shots, deadline, mode, backend, substeps = job
+    cls = simulation_class(backend)
+    results = []
+    for i, angle, power in shots:
+        if time.time() > deadline:
+            break
+        sim = from_snapshot(snap, cls, substeps=substeps)
+        rules = GameRules.from_rules_state(rules_state, sim)
+        results.append((evaluate_shot(sim, rules, angle, power, mode), i))
+    return results
+
+
+def _targets(balls, rules_state):
+    """Object balls worth aiming at under the current rules."""
+    live = [b for b in balls if not b.is_cue and not b.in_pocket]
+    rule_set = rule_set_of(rules_state['map_type'])
+    if rule_set == 'pool':
+        group = rules_state['pool_player_group']
+        if group is None:
+            return [b for b in live if b.number != 8] or live
+        mine = [b for b in live if (1 <= b.number <= 7 if group == 'solid' else 9 <= b.number <= 15)]
+        return mine or [b for b in live if b.number == 8] or live
+    if rule_set == 'snooker':
+        reds = [b for b in live if b.number == 1]
+        if rules_state['snooker_expecting_red'] and reds:
+            return reds
+        return [b for b in live if b.number != 1] or live
+    return live
+
+
+def candidate_shots(sim, rules_state, count, rng):
+    """
+    Up to `count` (angle, power) shots, most promising first: cue ball to the
+    ghost-ball position that sends a legal ball at a pocket (by cut angle),
+    then straight at each legal ball, then random shots.
+    """
+    cue = next((b for b in sim.balls if b.is_cue and not b.in_pocket), None)
+    if cue is None:
+        return []
+    targets = _targets(sim.balls, rules_state)
+    aimed = []
+    for ball in targets:
+        for px, py in sim.table.pockets:
+            ox, oy = px - ball.x, py - ball.y
+            d = math.hypot(ox, oy)
+            if d == 0:
+                continue
+            reach = cue.radius + ball.radius
+            gx, gy = ball.x - ox / d * reach, ball.y - oy / d * reach
+            ax, ay = gx - cue.x, gy - cue.y
+            a = math.hypot(ax, ay)
+            if a == 0:
+                continue
+            cut = (ax * ox + ay * oy) / (a * d)  # 1 = straight pot
+            if cut > 0.3:
+                aimed.append((cut, math.degrees(math.atan2(ay, ax))))
+    aimed.sort(key=lambda c: -c[0])
+    shots = [(angle, power) for _, angle in aimed for power in POWERS]
+    for ball in targets:
+        angle = math.degrees(math.atan2(ball.y - cue.y, ball.x - cue.x))
+        shots += [(angle, power) for power in POWERS]
+    shots = shots[:count]
+    while len(shots) < count:
+        shots.append((rng.uniform(0.0, 360.0), rng.uniform(0.3, 1.0)))
+    return shots
+
+
+class ComputerPlayer:
+    """
+    Non-blocking shot search: start() hands the work to a process pool,
+    poll() returns None until a shot (angle, power) has been chosen.
+    """
+
+    def __init__(self, difficulty='normal', time_budget=TIME_BUDGET, workers=None,
+                 mode='step', seed=None, backend='python', substeps=1):
+        self.samples = DIFFICULTY_SAMPLES.get(difficulty, difficulty)
+        self.time_budget = time_budget
+        self.workers = workers
+        self.mode = mode
+        self.backend = backend  # same physics as the table the shot is played on
+        self.substeps = substeps
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.futures = []
+        self.shots = []
+        self.deadline = None
+        self.evaluated = 0
+
+    @property
+    def searching(self):
+        return self.deadline is not None
+
+    def start(self, sim, rules):
+        """Begin searching for a shot from the current table state."""
+        self.cancel()
+        self.shots = candidate_shots(sim, rules.rules_state(), self.samples, self.rng)
+        self.deadline = time.time() + self.time_budget
+        if not self.shots:
+            return
+        workers = self.workers or os.cpu_count() or 1
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        snap = snapshot(sim)
+        state = rules.rules_state()
+        # one chunk per worker so all of them start at once; interleaved so
+        # each chunk tries its most promising shots first
+        chunks = max(1, min(len(self.shots), workers))
+        indexed = [(i, a, p) for i, (a, p) in enumerate(self.shots)]
+        self.futures = [self.pool.submit(evaluate_batch, (snap, state, indexed[k::chunks],
+                                                          self.deadline, self.mode,
+                                                          self.backend, self.substeps))
+                        for k in range(chunks)]
+
+    def poll(self):
+        """(angle, power) once the search has finished or run out of time, else None."""
+        if not self.searching:
+            return None
+        if time.time() >= self.deadline:
+            # out of time: drop chunks that have not started; running ones
+            # stop after their current shot (they check the deadline too)
+            for f in self.futures:
+                f.cancel()
+        if any(not f.done() for f in self.futures):
+            return None
+        best = None
+        self.evaluated = 0
+        for f in self.futures:
+            if f.cancelled() or f.exception() is not None:
+                continue
+            for value, i in f.result():
+                self.evaluated += 1
+                # ties go to the earlier (more promising) candidate
+                if best is None or (value, -i) > (best[0], -best[1]):
+                    best = (value, i)
+        self.futures = []
+        self.deadline = None
+        if best is not None:
+            return self.shots[best[1]]
+        # nothing finished inside the budget: play the first candidate
+        return self.shots[0] if self.shots else (0.0, 0.5)
+
+    def cancel(self):
+        for f in self.futures:
+            f.cancel()
+        self.futures = []
+        self.deadline = None
+
+    def close(self):
+        self.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,234 @@
+"""
+Dự đoán đường đi khi ngắm (headless, không cần pygame).
+
+trace_aim() đi theo hướng ngắm của bi cái, bật thành như _compute_reflected_path
+cũ, nhưng dừng ở bi đầu tiên mà bi cái chạm vào: phép thử là "swept circle"
+(bi cái bán kính r trượt dọc tia) với mọi bi trên bàn, tăng tốc bằng lưới
+SpatialHash nên chỉ các ô nằm dọc tia mới được xét. Kết quả (Contact) gồm vị
+trí ghost ball, hướng bi mục tiêu sau va chạm và hướng lệch của bi cái.
+
+AimPreview cache kết quả và chỉ tính lại khi góc ngắm đổi quá một ngưỡng nhỏ
+hoặc bi trên bàn di chuyển, nên vẽ mỗi frame khi kéo chuột gần như miễn phí.
+"""
+import math
+
+from broadphase import SpatialHash
+from physics import BALL_RESTITUTION
+
+ANGLE_THRESHOLD = 0.25  # degrees of aim change before the preview is recomputed
+PREVIEW_LENGTH = 1040  # longest preview drawn (800 + 6 * full power)
+
+
+def rail_path(origin, direction, bounds, max_segments=4, max_length=1200):
+    """
+    Points [origin, p1, p2, ...] of a ray reflected off the rails.
+    bounds: (left, top, right, bottom) limits for the ball centre.
+    """
+    left, top, right, bottom = bounds
+    px, py = origin
+    length = math.hypot(*direction)
+    dx, dy = direction[0] / length, direction[1] / length
+    pts = [(px, py)]
+    remaining = max_length
+    for _ in range(max_segments):
+        if remaining <= 0:
+            break
+        tx = float('inf')
+        ty = float('inf')
+        if abs(dx) > 1e-6:
+            tx = ((right if dx > 0 else left) - px) / dx
+        if abs(dy) > 1e-6:
+            ty = ((bottom if dy > 0 else top) - py) / dy
+        # choose nearest positive
+        t = min([t for t in (tx, ty) if t > 1e-6], default=None)
+        if t is None:
+            # goes nowhere (parallel), extend by remaining
+            pts.append((px + dx * remaining, py + dy * remaining))
+            break
+        travel = min(t, remaining)
+        px, py = px + dx * travel, py + dy * travel
+        pts.append((px, py))
+        remaining -= travel
+        # reflect the component of the wall that was hit
+        if abs(t - tx) < 1e-4:
+            dx = -dx
+        elif abs(t - ty) < 1e-4:
+            dy = -dy
+        else:
+            break
+    return pts
+
+
+class Contact:
+    """First ball the cue ball would hit along the aim path."""
+
+    def __init__(self, index, distance, ghost, object_dir, object_speed, cue_dir, cue_speed):
+        self.index = index  # ball index in the simulation
+        self.distance = distance  # path length travelled to the contact
+        self.ghost = ghost  # cue ball centre at impact
+        self.object_dir = object_dir  # unit direction the object ball leaves in
+        self.object_speed = object_speed  # as a fraction of the cue ball's speed
+        self.cue_dir = cue_dir  # unit direction of the cue ball after impact (None = stops)
+        self.cue_speed = cue_speed
+
+
+class BallIndex:
+    """SpatialHash over the balls on the table for swept-circle ray queries."""
+
+    def __init__(self, balls, skip=None):
+        self.balls = balls
+        self.skip = skip
+        radius = max((b.radius for b in balls), default=1.0)
+        # a swept cue ball touches only balls whose centre is within
+        # r_cue + r_ball <= cell_size of the ray, i.e. in the 3x3 block of cells
+        self.grid = SpatialHash(2.0 * radius)
+        self.grid.build(balls)
+
+    def raycast(self, origin, direction, length, radius):
+        """
+        First ball hit by a circle of `radius` moving from origin along the
+        unit `direction` for at most `length`. Returns (index, t) or None.
+        """
+        ox, oy = origin
+        dx, dy = direction
+        grid = self.grid
+        cells = grid.cells
+        best = None
+        best_t = length
+        tested = set()
+        for t_enter, cx, cy in self._cells_along(ox, oy, dx, dy, length):
+            # any ball not found yet is hit, if at all, no earlier than t_enter
+            if best is not None and best_t <= t_enter:
+                break
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for k in cells.get((gx, gy), ()):
+                        if k in tested or k == self.skip:
+                            continue
+                        tested.add(k)
+                        ball = self.balls[k]
+                        t = _sweep(ox, oy, dx, dy, ball.x, ball.y, radius + ball.radius)
+                        if t is not None and (t < best_t or t == best_t and best is not None and k < best):
+                            best, best_t = k, t
+        return None if best is None else (best, best_t)
+
+    def _cells_along(self, x, y, dx, dy, length):
+        # grid traversal (Amanatides & Woo): cells in the order the ray enters them
+        size = self.grid.cell_size
+        cx, cy = math.floor(x / size), math.floor(y / size)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        inf = float('inf')
+        next_x = ((cx + (dx > 0)) * size - x) / dx if dx else inf
+        next_y = ((cy + (dy > 0)) * size - y) / dy if dy else inf
+        delta_x = size / abs(dx) if dx else inf
+        delta_y = size / abs(dy) if dy else inf
+        t = 0.0
+        while t <= length:
+            yield t, cx, cy
+            if next_x < next_y:
+                t = next_x
+                next_x += delta_x
+                cx += step_x
+            else:
+                t = next_y
+                next_y += delta_y
+                cy += step_y
+
+
+def _sweep(ox, oy, dx, dy, cx, cy, reach):
+    # smallest t >= 0 with |o + t*d - c| == reach (d is a unit vector)
+    fx, fy = ox - cx, oy - cy
+    b = fx * dx + fy * dy
+    c = fx * fx + fy * fy - reach * reach
+    if c <= 0:
+        # already touching: a hit only if moving towards the ball
+        return 0.0 if b < 0 else None
+    disc = b * b - c
+    if disc < 0 or b >= 0:
+        return None
+    return -b - math.sqrt(disc)
+
+
+def _contact(cue, ball, index, ghost, direction, distance):
+    dx, dy = direction
+    nx, ny = ball.x - ghost[0], ball.y - ghost[1]
+    n = math.hypot(nx, ny)
+    nx, ny = (nx / n, ny / n) if n else (dx, dy)
+    # same impulse as Simulation._resolve_pair, for a cue ball of unit speed
+    along = dx * nx + dy * ny
+    share = (1 + BALL_RESTITUTION) * along / (cue.mass + ball.mass)
+    object_speed = share * cue.mass
+    cvx, cvy = dx - share * ball.mass * nx, dy - share * ball.mass * ny
+    cue_speed = math.hypot(cvx, cvy)
+    cue_dir = (cvx / cue_speed, cvy / cue_speed) if cue_speed > 1e-9 else None
+    return Contact(index, distance, ghost, (nx, ny), object_speed, cue_dir, cue_speed)
+
+
+def trace_aim(sim, cue_index, direction, index=None, max_segments=5, max_length=PREVIEW_LENGTH):
+    """
+    Path of the cue ball along `direction` (rail reflections included) up to
+    the first ball it hits. Returns (points, contact or None).
+    """
+    cue = sim.balls[cue_index]
+    t = sim.table
+    r = cue.radius
+    if index is None:
+        index = BallIndex(sim.balls, skip=cue_index)
+    path = rail_path((cue.x, cue.y), direction,
+                     (t.x + r, t.y + r, t.x + t.width - r, t.y + t.height - r),
+                     max_segments, max_length)
+    points = [path[0]]
+    travelled = 0.0
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        seg = math.hypot(bx - ax, by - ay)
+        if seg == 0:
+            continue
+        d = ((bx - ax) / seg, (by - ay) / seg)
+        hit = index.raycast((ax, ay), d, seg, r)
+        if hit is not None:
+            k, s = hit
+            ghost = (ax + d[0] * s, ay + d[1] * s)
+            points.append(ghost)
+            return points, _contact(cue, sim.balls[k], k, ghost, d, travelled + s)
+        points.append((bx, by))
+        travelled += seg
+    return points, None
+
+
+class AimPreview:
+    """trace_aim() cached per aim angle (within `threshold` degrees) and table state."""
+
+    def __init__(self, threshold=ANGLE_THRESHOLD):
+        self.threshold = threshold
+        self.invalidate()
+
+    def invalidate(self):
+        self.result = None
+        self.angle = None
+        self.sim = None
+        self.frame = None
+        self.positions = None
+        self.index = None
+
+    def get(self, sim, cue_index, direction):
+        """(points, contact) for aiming the cue ball along `direction`."""
+        if sim is not self.sim:
+            self.invalidate()
+            self.sim = sim
+        if sim.frame != self.frame:
+            # the simulation stepped: rebuild only if something actually moved
+            self.frame = sim.frame
+            positions = sim.positions()
+            if positions != self.positions:
+                self.positions = positions
+                self.index = None
+                self.result = None
+        angle = math.degrees(math.atan2(direction[1], direction[0]))
+        if self.result is not None and abs((angle - self.angle + 180.0) % 360.0 - 180.0) <= self.threshold:
+            return self.result
+        if self.index is None:
+            self.index = BallIndex(sim.balls, skip=cue_index)
+        self.angle = angle
+        self.result = trace_aim(sim, cue_index, direction, self.index)
+        return self.result
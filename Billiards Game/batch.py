@@ -0,0 +1,151 @@
+"""
+Mô phỏng hàng loạt cú đánh, không cần màn hình (headless), chia cho nhiều
+tiến trình.
+
+Mỗi cú đánh bắt đầu từ trạng thái ban đầu của map (giống Game.start_level),
+đánh bi cái theo (angle, power) rồi chạy tới khi mọi bi dừng, với cùng bộ
+luật tính điểm của game (rules.GameRules). Kết quả từng cú được ghi ra dạng
+JSON lines; tốc độ (shots/s, shots/s mỗi core) in ra stderr.
+
+Chạy trong thư mục "Billiards Game":
+
+    python -m batch --map 1 --random 1000 --workers 4 -o pool.jsonl
+    python -m batch --map 3 --carom-mode three --shots shots.txt
+
+File --shots: mỗi dòng `angle power` (hoặc `angle,power`, hoặc JSON
+{"angle": ..., "power": ...}); angle tính bằng độ, power trong 0..1.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from levels import CAROM_MODES, MAP_NAMES, load_level
+from physics import POCKET
+from rules import GameRules, shot_velocity
+
+
+def random_shots(count, seed=None, min_power=0.2):
+    rng = random.Random(seed)
+    return [(round(rng.uniform(0.0, 360.0), 3), round(rng.uniform(min_power, 1.0), 3))
+            for _ in range(count)]
+
+
+def read_shots(lines):
+    shots = []
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            data = json.loads(line)
+            shots.append((float(data['angle']), float(data['power'])))
+            continue
+        parts = line.replace(',', ' ').split()
+        if len(parts) != 2:
+            raise ValueError(f"line {n}: expected 'angle power', got {line!r}")
+        shots.append((float(parts[0]), float(parts[1])))
+    return shots
+
+
+def simulate_shot(task):
+    """
+    Run one shot from the map's starting layout. task: (index, map_type,
+    carom_mode, angle, power, backend, mode). Returns (outcome dict, CPU
+    seconds spent on it).
+    """
+    index, map_type, carom_mode, angle, power, backend, mode = task
+    started = time.process_time()
+    sim, cfg = load_level(map_type, carom_mode, backend=backend)
+    rules = GameRules(map_type)
+    rules.sim = sim
+    rules.reset_rules(cfg)
+
+    potted = []
+
+    def on_event(event):
+        if event[0] == POCKET and not sim.balls[event[1]].is_cue:
+            potted.append(sim.balls[event[1]].number)
+        rules.handle_physics_event(event)
+
+    rules.begin_shot()
+    sim.shoot(*shot_velocity(angle, power))
+    frames = sim.run_until_rest(on_event=on_event, mode=mode)
+    rules.finish_shot()
+    outcome = {
+        'shot': index,
+        'map': map_type,
+        'angle': angle,
+        'power': power,
+        'potted': potted,
+        'fouls': [{'kind': kind, 'ball': number} for kind, number in rules.shot_fouls],
+        'points': rules.score,
+        'carom_success': rules.carom_success,
+        'level_complete': rules.level_complete,
+        'frames': frames,
+        'positions': [[round(x, 3), round(y, 3)] for x, y in sim.positions()],
+    }
+    return outcome, time.process_time() - started
+
+
+def run_batch(tasks, workers=1):
+    """Yields (outcome, seconds) in shot order; workers > 1 uses a process pool."""
+    if workers <= 1:
+        for task in tasks:
+            yield simulate_shot(task)
+        return
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(simulate_shot, tasks, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m batch', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--map', type=int, default=1, choices=sorted(MAP_NAMES),
+                        help=', '.join(f"{k} = {name}" for k, name in sorted(MAP_NAMES.items())))
+    parser.add_argument('--carom-mode', default='libre', choices=CAROM_MODES)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--shots', help="file of 'angle power' lines ('-' = stdin)")
+    source.add_argument('--random', type=int, metavar='N', help='generate N random shots (default 100)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    parser.add_argument('--mode', default='step', choices=('step', 'event'),
+                        help="'step' = frame by frame like the game, 'event' = event_solver")
+    parser.add_argument('-o', '--output', help='JSON lines output (default stdout)')
+    args = parser.parse_args(argv)
+
+    if args.shots == '-':
+        shots = read_shots(sys.stdin)
+    elif args.shots:
+        with open(args.shots, encoding='utf-8') as f:
+            shots = read_shots(f)
+    else:
+        shots = random_shots(args.random if args.random is not None else 100, args.seed)
+    tasks = [(i, args.map, args.carom_mode, angle, power, args.backend, args.mode)
+             for i, (angle, power) in enumerate(shots)]
+    workers = max(1, min(args.workers, len(tasks)))
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.perf_counter()
+    busy = 0.0  # CPU seconds summed over workers
+    try:
+        for outcome, seconds in run_batch(tasks, workers):
+            busy += seconds
+            out.write(json.dumps(outcome) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - started
+
+    n = len(tasks)
+    print(f"{n} shots on {MAP_NAMES[args.map]} in {wall:.2f}s with {workers} worker(s): "
+          f"{n / wall if wall else 0:.1f} shots/s, "
+          f"{n / busy if busy else 0:.1f} shots/s per core", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Bộ benchmark cho physics, vẽ và chi phí cả một frame GAME.
+
+Chạy headless (SDL dummy driver, không mở cửa sổ) trên các bàn thật (pool
+break, snooker, carom), các rack tổng hợp 50/200/1000 bi (mọi bi đều đang
+lăn) và bàn stress 1000 bi (maps/map4_stress.py, bi cái đánh vào đám bi). Với mỗi bàn, các hàm được đo lại mỗi frame trong lúc bàn tiếp tục chạy,
+luôn từ cùng một trạng thái ban đầu nên các lần chạy so sánh được:
+
+    Ball.update                 một lượt cập nhật mọi bi
+    Game.check_collisions       thành bàn + bi-bi + lỗ, kèm tính điểm
+    Ball.draw / Table.draw      vẽ mọi bi (Game.draw_balls) / nền bàn
+    _compute_reflected_path     đường ngắm bật thành
+    draw_cue                    gậy + thanh lực + dự đoán điểm chạm
+    frame                       một vòng GAME: physics + draw_game + flip
+
+Thời gian khởi động được đo trong các interpreter mới (--startup-runs lần):
+import physics, import game, Game(), frame đầu tiên và cả process. Kèm theo
+là các module SDL đã init sau Game() - phải rỗng để test và batch worker
+không tốn chi phí mở display hay audio.
+
+Kết quả (microgiây: median, mean, p95, min) được ghi ra JSON; --compare so
+với một file cũ và trả exit code 1 nếu có mục chậm hơn ngưỡng.
+
+    python -m bench -o bench.json
+    python -m bench --layouts pool rack200 --compare bench.json
+    python -m bench --layouts --startup-runs 20      # chỉ đo khởi động
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+LAYOUTS = ('pool', 'snooker', 'carom', 'rack50', 'rack200', 'rack1000', 'stress')
+CASES = ('Ball.update', 'Game.check_collisions', 'Ball.draw', 'Table.draw',
+         '_compute_reflected_path', 'draw_cue', 'frame')
+RACK_SPEED = 8.0  # synthetic racks: every ball starts with up to this speed
+STARTUP_CASES = ('import physics', 'import game', 'Game()', 'first frame', 'process')
+FORMAT_VERSION = 1
+
+# run in a fresh interpreter per sample; prints the timings as JSON
+STARTUP_SCRIPT = '''
+import json, time
+clock = time.perf_counter
+t0 = clock()
+import physics
+t1 = clock()
+import bench
+game_module = bench.load_game_module()
+t2 = clock()
+game = game_module.Game()
+t3 = clock()
+import pygame
+import pygame.mixer
+sdl = [name for name, up in (('display', pygame.display.get_init()), ('font', pygame.font.get_init()),
+                             ('audio', pygame.mixer.get_init())) if up]
+game.map_type = 1
+game.state = "GAME"
+game.start_level()
+game.draw_game()
+pygame.display.flip()
+t4 = clock()
+print(json.dumps({'import physics': t1 - t0, 'import game': t2 - t1, 'Game()': t3 - t2,
+                  'first frame': t4 - t3, 'sdl': sdl}))
+'''
+
+
+def load_game_module():
+    """Import "game bi-a.py" (the file name is not a valid module name) headless."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game bi-a.py')
+    spec = importlib.util.spec_from_file_location('game_bi_a', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rack_balls(table, count, seed=1):
+    """count object balls + a cue ball in a grid over the table, all moving."""
+    from maps.map1_pool import POOL_COLORS
+    from physics import BALL_RADIUS, BallState
+
+    n = count + 1
+    spacing = math.sqrt(table.width * table.height / n)
+    radius = min(BALL_RADIUS, 0.4 * spacing)
+    cols = max(1, int(table.width // spacing))
+    rows = math.ceil(n / cols)
+    rng = random.Random(seed)
+    balls = []
+    for k in range(n):
+        row, col = divmod(k, cols)
+        x = table.x + (col + 0.5) * table.width / cols
+        y = table.y + (row + 0.5) * table.height / rows
+        number = 0 if k == 0 else (k - 1) % 15 + 1
+        color = (255, 255, 255) if k == 0 else POOL_COLORS[number]
+        ball = BallState(x, y, number, color, is_cue=(k == 0), radius=radius)
+        angle = rng.uniform(0.0, 2 * math.pi)
+        speed = rng.uniform(0.0, RACK_SPEED)
+        ball.vx, ball.vy = math.cos(angle) * speed, math.sin(angle) * speed
+        balls.append(ball)
+    return balls
+
+
+class Bench:
+    def __init__(self, game_module, backend='python', frames=120):
+        self.g = game_module
+        self.backend = backend
+        self.frames = frames
+        game_module.PHYSICS_BACKEND = backend
+        self.game = game_module.Game()
+
+    def setup(self, layout):
+        """Put the game on `layout` with the shot already played; returns its snapshot."""
+        from levels import simulation_class
+        from physics import snapshot
+        from rules import shot_velocity
+
+        g, game = self.g, self.game
+        if layout.startswith('rack'):
+            game.map_type = 1
+            game.start_level()
+            game.sim = simulation_class(self.backend)(game.table, rack_balls(game.table, int(layout[4:])),
+                                                       substeps=g.PHYSICS_SUBSTEPS)
+        elif layout == 'stress':
+            game.start_stress()
+            game.sim.shoot(*shot_velocity(0.0, 1.0))
+        else:
+            game.map_type = {'pool': 1, 'snooker': 2, 'carom': 3}[layout]
+            game.start_level()
+            # full power at the nearest object ball (the break, for pool)
+            cue = game.sim.cue_ball
+            target = min((b for b in game.sim.balls if not b.is_cue),
+                         key=lambda b: math.hypot(b.x - cue.x, b.y - cue.y))
+            game.sim.shoot(*shot_velocity(math.degrees(math.atan2(target.y - cue.y, target.x - cue.x)), 1.0))
+        return snapshot(game.sim)
+
+    def restore(self, snap):
+        from levels import simulation_class
+        from physics import from_snapshot
+
+        game = self.game
+        game.sim = from_snapshot(snap, simulation_class(self.backend), substeps=self.g.PHYSICS_SUBSTEPS)
+        game.balls = [self.g.Ball.from_state(state) for state in game.sim.balls]
+        game.timestep.reset()
+        game.prev_positions = game.sim.positions()
+        game.aim_preview.invalidate()
+        game.begin_shot()
+
+    def run(self, layout):
+        """{case: [seconds per call]} for one layout."""
+        import pygame
+
+        game = self.game
+        screen = game.screen
+        snap = self.setup(layout)
+        times = {case: [] for case in CASES}
+        clock = time.perf_counter
+
+        # physics: one Ball.update pass + check_collisions = one physics step
+        self.restore(snap)
+        for _ in range(self.frames):
+            t0 = clock()
+            for ball in game.balls:
+                ball.update()
+            t1 = clock()
+            game.check_collisions()
+            t2 = clock()
+            game.sim.frame += 1
+            times['Ball.update'].append(t1 - t0)
+            times['Game.check_collisions'].append(t2 - t1)
+
+        # drawing, while the table keeps moving (stepping is not timed)
+        self.restore(snap)
+        mouse = pygame.Vector2(pygame.mouse.get_pos())
+        for frame in range(self.frames):
+            cue = game.sim.cue_ball
+            angle = math.radians(frame * 7.0)
+            direction = pygame.Vector2(math.cos(angle), math.sin(angle))
+            t0 = clock()
+            game.table.draw(screen)
+            t1 = clock()
+            game.draw_balls(game.sim.positions())
+            t2 = clock()
+            if cue is not None:
+                game._compute_reflected_path(pygame.Vector2(cue.x, cue.y), direction)
+            t3 = clock()
+            game.aiming = True
+            game.aim_start = mouse + direction * 30
+            game.draw_cue()
+            t4 = clock()
+            game.aiming = False
+            game.step_physics()
+            times['Table.draw'].append(t1 - t0)
+            times['Ball.draw'].append(t2 - t1)
+            times['_compute_reflected_path'].append(t3 - t2)
+            times['draw_cue'].append(t4 - t3)
+        game.aim_start = None
+
+        # one full GAME-state frame: a physics step, scoring, draw_game, flip
+        self.restore(snap)
+        game.frame_seconds = game.timestep.dt
+        for _ in range(self.frames):
+            t0 = clock()
+            game.update_physics()
+            if game.shot_in_progress and not game.sim.is_moving():
+                game.finish_shot()
+            game.draw_game()
+            pygame.display.flip()
+            times['frame'].append(clock() - t0)
+        game.state = "GAME"
+        return times
+
+
+def measure_startup(runs):
+    """({case: [seconds]}, SDL modules initialised by Game()) over `runs` fresh interpreters."""
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = {case: [] for case in STARTUP_CASES}
+    sdl = set()
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        times['process'].append(time.perf_counter() - t0)
+        sample = json.loads(out.strip().splitlines()[-1])
+        sdl.update(sample.pop('sdl'))
+        for case, seconds in sample.items():
+            times[case].append(seconds)
+    return times, sorted(sdl)
+
+
+def summarize(samples):
+    us = sorted(s * 1e6 for s in samples)
+    return {
+        'median': round(statistics.median(us), 2),
+        'mean': round(statistics.fmean(us), 2),
+        'p95': round(us[min(len(us) - 1, int(0.95 * len(us)))], 2),
+        'min': round(us[0], 2),
+        'runs': len(us),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline medians; returns the (layout, case) that regressed."""
+    regressions = []
+    for layout, cases in results.items():
+        for case, stats in cases.items():
+            old = baseline.get('results', {}).get(layout, {}).get(case)
+            if not old or not old['median']:
+                continue
+            ratio = stats['median'] / old['median']
+            flag = ''
+            if ratio > threshold:
+                flag = '  <-- slower'
+                regressions.append((layout, case))
+            print(f"{layout:9} {case:24} {old['median']:>11.1f} -> {stats['median']:>11.1f} us"
+                  f"  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--layouts', nargs='*', default=list(LAYOUTS), choices=LAYOUTS)
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help='fresh interpreters timed for the startup cases (0 = skip)')
+    parser.add_argument('--frames', type=int, default=120, help='frames timed per case and layout')
+    parser.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    parser.add_argument('-o', '--output', default='bench.json', help='JSON results (default bench.json)')
+    parser.add_argument('--compare', metavar='JSON', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.15,
+                        help='median slower than baseline by this factor counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = {}
+    sdl_after_game = None
+    if args.startup_runs > 0:
+        # before anything is imported here, so the cases below do not warm the OS caches
+        times, sdl_after_game = measure_startup(args.startup_runs)
+        results['startup'] = {case: summarize(times[case]) for case in STARTUP_CASES}
+        cells = '  '.join(f"{case} {results['startup'][case]['median'] / 1000:.1f}" for case in STARTUP_CASES)
+        print(f"startup   median ms: {cells}  SDL after Game(): {', '.join(sdl_after_game) or 'none'}",
+              file=sys.stderr)
+
+    game_module = load_game_module()
+    import pygame
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+
+    bench = Bench(game_module, args.backend, args.frames)
+    for layout in args.layouts:
+        times = bench.run(layout)
+        results[layout] = {case: summarize(times[case]) for case in CASES}
+        cells = '  '.join(f"{case} {results[layout][case]['median']:.0f}" for case in CASES)
+        print(f"{layout:9} [{len(bench.game.sim.balls)} balls] median us: {cells}", file=sys.stderr)
+    pygame.quit()
+
+    report = {
+        'version': FORMAT_VERSION,
+        'meta': {
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': numpy_version,
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'frames': args.frames,
+            'render_mode': game_module.RENDER_MODE,
+            'sdl_after_game': sdl_after_game,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
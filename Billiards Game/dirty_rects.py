@@ -0,0 +1,71 @@
+"""
+Dirty-rectangle rendering cho màn hình GAME.
+
+Thay vì vẽ lại toàn bộ 1280x720 rồi flip() mỗi frame, chỉ những vùng đã vẽ ở
+frame trước được khôi phục từ lớp nền cache (Table.layer) rồi vẽ lại, và chỉ
+các rect đó được đẩy lên màn hình bằng pygame.display.update(rects).
+
+Hai nhóm được theo dõi riêng:
+- dynamic: bi, gậy, đường dự đoán - xóa và vẽ lại mỗi frame có thay đổi;
+- overlay: panel HUD và nút (vẽ đè lên trên) - chỉ vẽ lại khi nội dung đổi
+  (overlay_key) hoặc khi lớp dynamic có thể chạm vào chúng.
+Khi không có gì thay đổi (cùng frame key) thì frame bị bỏ qua hoàn toàn.
+"""
+import pygame
+
+
+class DirtyRects:
+    def __init__(self):
+        self.dynamic = []  # rects drawn last frame by the dynamic layer
+        self.overlay = []  # rects drawn by the overlay the last time it was redrawn
+        self.key = None
+        self.overlay_key = None
+        self.full = True
+        self.redraw_overlay = True
+
+    def invalidate(self):
+        """Screen content is unknown (other state drew / flipped): repaint everything."""
+        self.full = True
+        self.key = None
+
+    def unchanged(self, key):
+        """True when nothing visible changed since the last presented frame."""
+        if not self.full and key == self.key:
+            return True
+        self.key = key
+        return False
+
+    def begin(self, screen, background, covered, overlay_key):
+        """
+        Restore last frame's regions from background. covered: rects the
+        dynamic layer may paint this frame. Returns True when the overlay has
+        to be drawn again this frame.
+        """
+        if self.full:
+            screen.blit(background, (0, 0))
+            self.redraw_overlay = True
+        else:
+            for rect in self.dynamic:
+                screen.blit(background, rect, rect)
+            # the overlay sits on top: redraw it if it changed or if anything
+            # underneath it was erased / is about to be painted
+            self.redraw_overlay = overlay_key != self.overlay_key or any(
+                rect.collidelist(self.overlay) != -1 for rect in self.dynamic + covered)
+            if self.redraw_overlay:
+                for rect in self.overlay:
+                    screen.blit(background, rect, rect)
+        self.overlay_key = overlay_key
+        return self.redraw_overlay
+
+    def present(self, dynamic, overlay=None):
+        """Push old and new regions to the display; arguments: rects painted this frame."""
+        rects = self.dynamic + dynamic
+        if self.redraw_overlay:
+            rects += self.overlay + overlay
+            self.overlay = overlay
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        else:
+            pygame.display.update(rects)
+        self.dynamic = dynamic
@@ -1,25 +1,72 @@
+import os
 import pygame
 import random
-import math
 import sys
+import time
 from level_manager import LevelManager
-from maps.map2_snooker import create_snooker_map
-from maps.map3_carom import create_carom_map
-from scoring_system import ScoringSystem
-
-pygame.init()
-
-# Constants
-SCREEN_WIDTH = 1280
-SCREEN_HEIGHT = 720
-BALL_RADIUS = 18
-POCKET_RADIUS = 35
-FRICTION = 0.995        # ma sát tuyến tính (gần thực tế)
-MIN_SPEED = 0.05
-INITIAL_SPEED = 40      # giới hạn tốc độ tối đa của cú đánh
-WALL_BOUNCE_DAMP = 0.9  # mất năng lượng khi bật thành
-BALL_RESTITUTION = 0.98 # độ đàn hồi va chạm giữa 2 bi
-BALL_MASS = 1.0
+from timestep import FixedTimestep, lerp_positions
+from levels import SCREEN_WIDTH, SCREEN_HEIGHT, MAP_NAMES, compile_level, load_level, register_map
+from physics import (BALL_RADIUS, POCKET_RADIUS, INITIAL_SPEED, COAST_CHECK_FRAMES, BallState,
+                     TableGeometry)
+from rules import GameRules, SHOT_SPEED_SCALE, shot_velocity
+from aim import AimPreview, rail_path
+from sprites import BallSpriteCache, LayerCache
+from dirty_rects import DirtyRects
+from hud import Hud
+from replay import Recorder, ReplayFile
+import profiler
+from profiler import FrameProfiler
+
+# Nothing here initialises SDL: the window (display + font modules) opens the
+# first time Game.screen is used and fonts are made on first use, so headless
+# tools can import this module and build a Game for free. Audio is never
+# initialised (the game has no sound).
+
+# 'python' (physics.Simulation) or 'numpy' (physics_numpy.ArraySimulation,
+# faster once there are many balls on the table)
+PHYSICS_BACKEND = 'python'
+
+# Fixed-timestep loop: physics always advances PHYSICS_HZ steps per second of
+# real time (each split into PHYSICS_SUBSTEPS passes), independent of the
+# render frame rate. A slow frame runs at most MAX_CATCHUP_STEPS steps.
+RENDER_FPS = 60
+PHYSICS_HZ = 60
+PHYSICS_SUBSTEPS = 1
+MAX_CATCHUP_STEPS = 5
+
+# Playback speed of a rolling shot (cycle with F): physics steps run per
+# real-time step; 0 = instant, the shot is settled in a single frame. ENTER
+# skips the current shot to its resting state. Either way a shot runs the
+# same steps and events, so scoring is identical at every speed.
+PLAYBACK_SPEEDS = (1, 2, 4, 16, 0)
+MAX_SETTLE_STEPS = 20000
+
+# 'full' redraws and flips the whole screen every frame; 'dirty' restores and
+# pushes only the regions that changed (display.update(rects)), and skips
+# frames where nothing moved - cheaper on slow machines.
+RENDER_MODE = 'full'
+
+# Computer opponent (toggle with C): 'easy', 'normal' or 'hard' = how many
+# shots it tries, searched on a process pool for at most AI_TIME_BUDGET s.
+AI_DIFFICULTY = 'normal'
+AI_TIME_BUDGET = 3.0
+
+# When on, every shot is appended to a replay file (one per session) in
+# REPLAY_DIR, next to this file; play one back with:
+# python "game bi-a.py" --replay FILE
+RECORD_REPLAYS = False
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replays')
+
+# Capture position + velocity of every ball at every physics step to
+# TRAJECTORY_DIR/<session>.npz, next to this file, for analysis (needs numpy;
+# see trajectory.py).
+CAPTURE_TRAJECTORIES = False
+TRAJECTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trajectories')
+
+# Frame profiler (toggle with F3): per-phase timings of GAME frames with an
+# on-screen overlay, written to PROFILE_DIR/<session>.csv (next to this file) on exit.
+PROFILE_FRAMES = False
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
 
 # Colors - Enhanced color palette
 WHITE = (255, 255, 255)
@@ -30,6 +77,9 @@ DARK_GREEN = (22, 101, 22)  # Darker green for table depth
 BROWN = (101, 67, 33)  # Wood brown
 LIGHT_BROWN = (139, 90, 43)  # Lighter wood
 CUE_COLOR = (245, 245, 220)  # Beige cue stick
+PREVIEW_COLOR = (220, 220, 220)  # aim line / ghost ball
+OBJECT_PATH_COLOR = (255, 200, 0)  # predicted object ball direction
+CUE_PATH_COLOR = (150, 200, 255)  # predicted cue ball deflection
 BUTTON_COLOR = (70, 70, 70)
 BUTTON_HOVER_COLOR = (100, 100, 100)
 BUTTON_TEXT_COLOR = (255, 255, 255)
@@ -45,100 +95,86 @@ UI_BG = (40, 40, 50)
 SCORE_COLOR = (255, 255, 200)
 
 class Ball:
+    """Drawable view over a physics.BallState (the simulation owns the state)."""
+    # shared by every ball; call sprites.set_theme() to rebuild after a theme change
+    sprites = BallSpriteCache()
+
     def __init__(self, x, y, number, color, is_cue=False):
-        self.pos = pygame.Vector2(x, y)
-        self.vel = pygame.Vector2(0, 0)
-        self.number = number
-        self.color = color
-        self.in_pocket = False
-        self.is_cue = is_cue
-        self.radius = BALL_RADIUS
-        self.mass = BALL_MASS
+        self.state = BallState(x, y, number, color, is_cue=is_cue)
+
+    @classmethod
+    def from_state(cls, state):
+        ball = cls.__new__(cls)
+        ball.state = state
+        return ball
+
+    @property
+    def pos(self):
+        return pygame.Vector2(self.state.x, self.state.y)
+
+    @pos.setter
+    def pos(self, value):
+        self.state.x, self.state.y = float(value[0]), float(value[1])
+
+    @property
+    def vel(self):
+        return pygame.Vector2(self.state.vx, self.state.vy)
+
+    @vel.setter
+    def vel(self, value):
+        self.state.vx, self.state.vy = float(value[0]), float(value[1])
+
+    number = property(lambda self: self.state.number)
+    color = property(lambda self: self.state.color)
+    is_cue = property(lambda self: self.state.is_cue)
+    radius = property(lambda self: self.state.radius)
+    mass = property(lambda self: self.state.mass)
+    in_pocket = property(lambda self: self.state.in_pocket)
 
     def update(self):
+        self.state.update()
+
+    def draw(self, screen, pos=None):
+        # pos: optional (x, y) to draw at instead of the physics position
+        # (render interpolation between two physics steps)
+        # returns the screen rect painted (None when pocketed)
         if self.in_pocket:
-            return
-        self.pos += self.vel
-        # apply simple rolling friction
-        self.vel *= FRICTION
-        if self.vel.length() < MIN_SPEED:
-            self.vel = pygame.Vector2(0, 0)
+            return None
+        x, y = (self.state.x, self.state.y) if pos is None else pos
+        # shaded/striped/numbered image is built once per (number, color, radius)
+        sprite, anchor = self.sprites.get(self.number, self.color, self.is_cue, self.radius)
+        return screen.blit(sprite, (int(x) - anchor, int(y) - anchor))
 
-    def draw(self, screen):
+    def draw_rect(self, pos):
+        """Screen rect draw(screen, pos) would paint, without drawing."""
         if self.in_pocket:
-            return
-        
-        # Draw shadow first
-        shadow_offset = 2
-        shadow_pos = (int(self.pos.x + shadow_offset), int(self.pos.y + shadow_offset))
-        shadow_surface = pygame.Surface((self.radius * 2, self.radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(shadow_surface, (0, 0, 0, 80), (self.radius, self.radius), self.radius)
-        screen.blit(shadow_surface, (shadow_pos[0] - self.radius, shadow_pos[1] - self.radius))
-        
-        # Draw ball with gradient effect (simulated with highlight)
-        pygame.draw.circle(screen, self.color, (int(self.pos.x), int(self.pos.y)), self.radius)
-        
-        # Draw highlight for 3D effect
-        highlight_pos = (int(self.pos.x - self.radius * 0.3), int(self.pos.y - self.radius * 0.3))
-        highlight_radius = self.radius // 3
-        highlight_surface = pygame.Surface((highlight_radius * 2, highlight_radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(highlight_surface, (255, 255, 255, 150), (highlight_radius, highlight_radius), highlight_radius)
-        screen.blit(highlight_surface, (highlight_pos[0] - highlight_radius, highlight_pos[1] - highlight_radius))
-        
-        # Draw border
-        pygame.draw.circle(screen, (40, 40, 40), (int(self.pos.x), int(self.pos.y)), self.radius, 2)
-        
-        if not self.is_cue:
-            # Draw stripe pattern for pool balls 9-15
-            if 9 <= self.number <= 15:
-                # Draw white stripe band
-                stripe_width = self.radius * 1.2
-                stripe_height = self.radius * 0.4
-                stripe_rect = pygame.Rect(int(self.pos.x - stripe_width//2), 
-                                         int(self.pos.y - stripe_height//2),
-                                         int(stripe_width), int(stripe_height))
-                pygame.draw.ellipse(screen, (255, 255, 255), stripe_rect)
-            
-            # Draw number with better styling
-            font = pygame.font.Font(None, 20)
-            font.set_bold(True)
-            # Text shadow
-            text = font.render(str(self.number), True, (0, 0, 0))
-            text_rect = text.get_rect(center=(int(self.pos.x) + 1, int(self.pos.y) + 1))
-            screen.blit(text, text_rect)
-            # Text main
-            text = font.render(str(self.number), True, WHITE)
-            text_rect = text.get_rect(center=(int(self.pos.x), int(self.pos.y)))
-            screen.blit(text, text_rect)
-        else:
-            # Cue ball with distinct white appearance
-            pygame.draw.circle(screen, WHITE, (int(self.pos.x), int(self.pos.y)), self.radius)
-            # Inner circle for depth
-            pygame.draw.circle(screen, (245, 245, 245), (int(self.pos.x), int(self.pos.y)), self.radius - 2)
+            return None
+        sprite, anchor = self.sprites.get(self.number, self.color, self.is_cue, self.radius)
+        return sprite.get_rect(topleft=(int(pos[0]) - anchor, int(pos[1]) - anchor))
 
-class Table:
+class Table(TableGeometry):
     def __init__(self, map_type):
-        self.width = 1000
-        self.height = 550
-        self.x = (SCREEN_WIDTH - self.width) // 2
-        self.y = (SCREEN_HEIGHT - self.height) // 2
+        # size and pockets come from the map's compiled level (levels.compile_level)
+        x, y, width, height, pockets = compile_level(map_type).table
+        super().__init__(x, y, width, height, pockets)
         self.map_type = map_type
-        self.pockets = self.setup_pockets()
-        
-    def setup_pockets(self):
-        # 4 corners for simplicity (can add middle pockets per map)
-        pockets = [
-            (self.x, self.y),
-            (self.x + self.width, self.y),
-            (self.x, self.y + self.height),
-            (self.x + self.width, self.y + self.height)
-        ]
-        if self.map_type == 2:
-            pockets.insert(2, (self.x + self.width//2, self.y))  # top middle
-            pockets.insert(-2, (self.x + self.width//2, self.y + self.height))  # bottom middle
-        return pockets
+
+    # static background (brown surround, frame, felt, cushions, pockets),
+    # painted once per table geometry and blitted every frame
+    layers = LayerCache()
+
+    def layer_key(self):
+        return (self.x, self.y, self.width, self.height, tuple(self.pockets))
+
+    def layer(self, size):
+        return Table.layers.get('table', self.layer_key(), size, self.paint)
 
     def draw(self, screen):
+        """Draws the table and the brown surround: one blit of the cached layer."""
+        screen.blit(self.layer(screen.get_size()), (0, 0))
+
+    def paint(self, screen):
+        screen.fill(BROWN)
         # Draw outer wood frame with gradient effect
         frame_thickness = 25
         # Outer shadow
@@ -188,384 +224,211 @@ class Table:
             # Inner highlight for depth
             pygame.draw.circle(screen, (30, 30, 30), (pocket[0] - 3, pocket[1] - 3), POCKET_RADIUS - 5)
 
-class Game:
+class Game(GameRules):
     def __init__(self):
         # ...existing code...
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Billiards Game")
+        self._screen = None  # opened by the `screen` property
+        self._fonts = None
+        self._hud = None
         self.clock = pygame.time.Clock()
+        self.timestep = FixedTimestep(PHYSICS_HZ, MAX_CATCHUP_STEPS)
+        self.frame_seconds = self.timestep.dt
+        self.playback = 0  # index into PLAYBACK_SPEEDS
+        self.skip_to_rest = False
+        self.prev_positions = []
         self.state = "MENU"
         self.balls = []
-        self.prediction = ""
-        self.map_type = 1
+        # rule / score state (rules.GameRules), shared with the headless tools
+        super().__init__(map_type=1)
         self.table = Table(self.map_type)
-        self.font = pygame.font.Font(None, 42)
-        self.font_large = pygame.font.Font(None, 56)
-        self.font_small = pygame.font.Font(None, 28)
+        self.layers = LayerCache()  # menu / level-select backgrounds
+        self.dirty = DirtyRects()  # used when RENDER_MODE == 'dirty'
         self.selected_ball = None
         self.aiming = False
         self.aim_start = None
         self.aim_end = None
+        self.aim_preview = AimPreview()  # first-contact prediction, cached per aim angle
+        # computer opponent: players alternate shots, each keeps its own score
+        self.vs_computer = False
+        self.turn = 'player'
+        self.computer = None  # ai.ComputerPlayer, created on its first turn
+        self.computer_score = 0
+        # network opponent (netplay.NetMatch, see start_net): 'remote' takes every other shot
+        self.net = None
+        self.remote_score = 0
+        self.session = time.strftime('%Y%m%d-%H%M%S')
+        self.recorder = None
+        if RECORD_REPLAYS:
+            self.recorder = Recorder(os.path.join(REPLAY_DIR, self.session + '.blr'), PHYSICS_BACKEND,
+                                     PHYSICS_SUBSTEPS)
+        self.trajectory = None
+        if CAPTURE_TRAJECTORIES:
+            # numpy is optional: only imported when capture is switched on
+            from trajectory import TrajectoryWriter
+            self.trajectory = TrajectoryWriter(os.path.join(TRAJECTORY_DIR, self.session + '.npz'))
+        self.profiler = FrameProfiler(target_fps=RENDER_FPS)
+        self.profiler.enabled = PROFILE_FRAMES
+        self.replay = None  # replay.ReplayFile being played back
+        self.replay_index = 0
 
         # Level manager
-        self.level_manager = LevelManager(max_map=3)
+        self.level_manager = LevelManager(max_map=max(MAP_NAMES))
         self.level_options = []
 
-        # Scoring and shot tracking
-        self.score = 0
-        self.last_gain_text = ""
-        self.shot_in_progress = False
-        self.shot_pocketed_count = 0
-        self.shot_score = 0
-
         # per-map config
         self.map_cfg = None
         # scoring callback
         self.score_ball = lambda number: 10 + number
 
-        # carom-specific state
-        self.carom_mode = None
-        self.carom_first_contact_bounces = None
-        self.carom_contacts = set()  # Track unique ball contacts in current shot
-        self.shot_in_progress = False
-
-        # Scoring system
-        self.scoring = ScoringSystem()
-
         self.buttons = {
             'back': pygame.Rect(10, 60, 100, 35),
             'reset': pygame.Rect(120, 60, 100, 35)
         }
-        
-        # Pool 8-ball game state tracking
-        self.pool_player_group = None  # 'solid' or 'stripe', None = not assigned yet
-        self.pool_solids_pocketed = 0
-        self.pool_stripes_pocketed = 0
-        
-        # Snooker game state tracking
-        self.snooker_expecting_red = True  # True = expect red, False = expect color
-        self.snooker_color_respot_positions = {}  # Track where colors should respot
+
+    def open_display(self):
+        """The window; the display and font modules are initialised on the first call."""
+        if self._screen is None:
+            pygame.display.init()
+            pygame.font.init()
+            self._screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Billiards Game")
+        return self._screen
+
+    screen = property(open_display)
+
+    @property
+    def fonts(self):
+        """(font, font_large, font_small), created on first use."""
+        if self._fonts is None:
+            pygame.font.init()
+            self._fonts = (pygame.font.Font(None, 42), pygame.font.Font(None, 56), pygame.font.Font(None, 28))
+        return self._fonts
+
+    font = property(lambda self: self.fonts[0])
+    font_large = property(lambda self: self.fonts[1])
+    font_small = property(lambda self: self.fonts[2])
+
+    @property
+    def hud(self):
+        if self._hud is None:
+            self._hud = Hud(self.font_small, self.font_large)
+        return self._hud
 
     def start_level(self):
         """
         Bắt đầu level theo self.map_type.
-        Lấy cấu hình từ các factory map và spawn các Ball.
+        Lấy level đã dựng sẵn từ bảng map (qua levels.load_level) và tạo Simulation;
+        self.balls chỉ là view để vẽ lên trạng thái của simulation.
         """
-        # default Table centered; we'll override width/height from cfg
-        self.balls = []
-        self.prediction = ""
-        self.map_cfg = None
-        # choose map config
-        if self.map_type == 2:
-            cfg = create_snooker_map()
-        elif self.map_type == 3:
-            # default carom mode = 'libre' (người dùng có thể thay đổi nếu muốn)
-            cfg = create_carom_map(mode='libre')
-        else:
-            # map1 default behavior: use previous simple rack (existing)
-            cfg = None
-
-        if cfg is not None:
-            self.map_cfg = cfg
-            # set table size and pockets based on relative coords
-            self.table.width = cfg.get('width', self.table.width)
-            self.table.height = cfg.get('height', self.table.height)
-            # center table on screen
-            self.table.x = (SCREEN_WIDTH - self.table.width) // 2
-            self.table.y = (SCREEN_HEIGHT - self.table.height) // 2
-            # compute absolute pocket positions
-            pockets = []
-            for rx, ry in cfg.get('pockets', []):
-                pockets.append((int(self.table.x + rx * self.table.width), int(self.table.y + ry * self.table.height)))
-            self.table.pockets = pockets
-
-            # spawn balls
-            for b in cfg.get('balls', []):
-                x = int(self.table.x + b['rx'] * self.table.width)
-                y = int(self.table.y + b['ry'] * self.table.height)
-                self.balls.append(Ball(x, y, b.get('number', 0), b.get('color', (200,200,200)), is_cue=b.get('is_cue', False)))
-
-            # set scoring callback
-            self.score_ball = cfg.get('scoring', lambda n: 10 + (n or 0))
-
-            # carom mode
-            if cfg.get('mode') == 'libre' or cfg.get('mode') == 'one' or cfg.get('mode') == 'three' or cfg.get('mode') == 'carom':
-                # if map 3 uses 'mode' key it will be 'libre'/'one'/'three'
-                self.carom_mode = cfg.get('mode', 'libre')
-            elif cfg.get('mode') == 'snooker':
-                self.carom_mode = None
-        else:
-            # fallback: original map1 rack (unchanged)
-            self.table = Table(self.map_type)
-            # Cue ball position (near left quarter center)
-            cue_x = self.table.x + int(self.table.width * 0.25)
-            cue_y = self.table.y + self.table.height // 2
-            cue = Ball(cue_x, cue_y, 0, WHITE, is_cue=True)
-            self.balls.append(cue)
-            # Rack triangle (15 balls) with proper pool colors
-            rows = 5
-            start_x = self.table.x + int(self.table.width * 0.70)
-            start_y = self.table.y + self.table.height // 2
-            offset = BALL_RADIUS * 2 + 0.5
-            
-            # Standard pool ball colors: 1-7 solid, 8 black, 9-15 stripe
-            pool_colors = {
-                1: (255, 255, 0),    # Yellow
-                2: (0, 0, 255),      # Blue
-                3: (255, 0, 0),      # Red
-                4: (128, 0, 128),    # Purple
-                5: (255, 165, 0),    # Orange
-                6: (0, 255, 0),      # Green
-                7: (128, 0, 0),      # Maroon
-                8: (0, 0, 0),        # Black
-                9: (255, 255, 0),    # Yellow stripe
-                10: (0, 0, 255),     # Blue stripe
-                11: (255, 0, 0),     # Red stripe
-                12: (128, 0, 128),   # Purple stripe
-                13: (255, 165, 0),   # Orange stripe
-                14: (0, 255, 0),     # Green stripe
-                15: (128, 0, 0),     # Maroon stripe
-            }
-            
-            number = 1
-            for r in range(rows):
-                row_len = r + 1
-                x = start_x + r * (BALL_RADIUS * 2 * 0.87)
-                y = start_y - (row_len-1) * offset / 2
-                for c in range(row_len):
-                    col_y = y + c * offset
-                    # Use proper color, fallback to random if needed
-                    color = pool_colors.get(number, (random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
-                    self.balls.append(Ball(x, col_y, number, color))
-                    number += 1
-            self.score_ball = lambda b: 10 + (b.number or 0)
-            self.carom_mode = None
-
-        # reset shot/carom trackers
-        self.shot_in_progress = False
-        self.carom_contacts = set()
-        self.carom_bounce_count = 0
-        self.carom_first_contact_bounces = None
-        self.last_gain_text = ""
-        
-        # Reset game mode specific state
-        if self.map_type == 1:
-            self.pool_player_group = None
-            self.pool_solids_pocketed = 0
-            self.pool_stripes_pocketed = 0
-        elif self.map_type == 2:
-            self.snooker_expecting_red = True
-            self.scoring.red_count = 15
-            self.scoring.last_red = False
+        self.stop_replay()
+        self.table = Table(self.map_type)
+        self.sim, cfg = load_level(self.map_type, table=self.table, backend=PHYSICS_BACKEND,
+                                   substeps=PHYSICS_SUBSTEPS)
+        self.map_cfg = cfg
+        self.balls = [Ball.from_state(state) for state in self.sim.balls]
+        self.timestep.reset()
+        self.prev_positions = self.sim.positions()
+        self.dirty.invalidate()
+        # set scoring callback
+        self.score_ball = cfg.get('scoring', lambda n: 10 + (n or 0))
+        self.reset_rules(cfg)
+        self.turn = 'player'
+        self.computer_score = 0
+        if self.computer:
+            self.computer.cancel()
+        if self.net is not None:
+            # a new rack: both sides start from the same layout
+            self.net.begin(self.sim)
+            self.turn = self.net_turn()
 
     def check_collisions(self):
         """
-        Mở rộng: 
-        - gọi score_ball(ball) khi bi rơi (snooker sử dụng callback khác).
+        Chạy phần va chạm của simulation (thành bàn, bi-bi, lỗ) rồi xử lý event:
+        - tính điểm khi bi rơi (pool/snooker).
         - Track bounces cho Carom và detect carom contact sequence.
         """
-        # Ball-Wall collisions
-        for ball in self.balls:
-            if ball.in_pocket:
-                continue
-            # left wall
-            if ball.pos.x - ball.radius < self.table.x:
-                ball.pos.x = self.table.x + ball.radius
-                ball.vel.x = -ball.vel.x * WALL_BOUNCE_DAMP
-                # count bounce for carom only when cue ball bounces while shot in progress
-                if self.carom_mode and self.shot_in_progress and ball.is_cue:
-                    self.carom_bounce_count += 1
-            # right wall
-            if ball.pos.x + ball.radius > self.table.x + self.table.width:
-                ball.pos.x = self.table.x + self.table.width - ball.radius
-                ball.vel.x = -ball.vel.x * WALL_BOUNCE_DAMP
-                if self.carom_mode and self.shot_in_progress and ball.is_cue:
-                    self.carom_bounce_count += 1
-            # top
-            if ball.pos.y - ball.radius < self.table.y:
-                ball.pos.y = self.table.y + ball.radius
-                ball.vel.y = -ball.vel.y * WALL_BOUNCE_DAMP
-                if self.carom_mode and self.shot_in_progress and ball.is_cue:
-                    self.carom_bounce_count += 1
-            # bottom
-            if ball.pos.y + ball.radius > self.table.y + self.table.height:
-                ball.pos.y = self.table.y + self.table.height - ball.radius
-                ball.vel.y = -ball.vel.y * WALL_BOUNCE_DAMP
-                if self.carom_mode and self.shot_in_progress and ball.is_cue:
-                    self.carom_bounce_count += 1
-
-        # Ball-Ball collisions with Carom tracking
-        for i in range(len(self.balls)):
-            for j in range(i+1, len(self.balls)):
-                a = self.balls[i]
-                b = self.balls[j]
-                if a.in_pocket or b.in_pocket:
-                    continue
-                    
-                delta = b.pos - a.pos
-                dist = delta.length()
-                if dist < a.radius + b.radius:
-                    # Track Carom contacts when cue ball hits others
-                    # Store tuple (ball_number, bounce_count_at_contact) for proper tracking
-                    if self.map_type == 3 and self.shot_in_progress:
-                        if a.is_cue:
-                            self.carom_contacts.add((b.number, self.carom_bounce_count))
-                        elif b.is_cue:
-                            self.carom_contacts.add((a.number, self.carom_bounce_count))
-                    
-                    # Regular collision physics
-                    overlap = a.radius + b.radius - dist
-                    direction = delta.normalize()
-                    a.pos -= direction * (overlap * 0.5)
-                    b.pos += direction * (overlap * 0.5)
-
-                    # relative velocity
-                    rv = b.vel - a.vel
-                    vel_along_normal = rv.dot(direction)
-                    if vel_along_normal > 0:
-                        continue
-                    # impulse scalar
-                    e = BALL_RESTITUTION
-                    j = -(1 + e) * vel_along_normal
-                    j /= (1 / a.mass + 1 / b.mass)
-                    impulse = direction * j
-                    a.vel -= impulse * (1 / a.mass)
-                    b.vel += impulse * (1 / b.mass)
-
-        # Ball-Pocket check with realistic scoring
-        for ball in self.balls:
-            if ball.in_pocket:
+        for event in self.sim.collide():
+            self.handle_physics_event(event)
+
+    def step_physics(self):
+        """Advance the simulation one physics step and apply scoring for its events."""
+        self.prev_positions = self.sim.positions()
+        for event in self.sim.step():
+            self.handle_physics_event(event)
+        if self.net is not None and self.net.rolling:
+            self.net.after_step()
+        if self.trajectory is not None:
+            self.trajectory.capture(self.sim)
+
+    def update_physics(self):
+        """Run the physics steps owed for the last frame's real time, times the playback speed."""
+        steps = self.timestep.advance(self.frame_seconds)
+        speed = PLAYBACK_SPEEDS[self.playback]
+        if self.shot_in_progress and (speed == 0 or self.skip_to_rest):
+            self.settle_shot()
+            return
+        for _ in range(steps * speed):
+            self.step_physics()
+            if self.shot_in_progress and not self.sim.is_moving():
+                # a shot ends on the step its balls stop, whatever the speed
+                break
+
+    def settle_shot(self):
+        """Play the rest of the current shot in one go, with the same steps and events."""
+        # netplay and trajectory capture need every step; otherwise the tail
+        # of the shot where nothing can be hit any more is coasted through
+        coast = self.net is None and self.trajectory is None
+        for steps in range(1, MAX_SETTLE_STEPS + 1):
+            self.step_physics()
+            if not self.sim.is_moving():
+                break
+            if coast and steps % COAST_CHECK_FRAMES == 0 and \
+                    self.sim.coast_to_rest(MAX_SETTLE_STEPS - steps):
+                break
+        # nothing to interpolate: show the resting state
+        self.prev_positions = self.sim.positions()
+        self.timestep.reset()
+        self.skip_to_rest = False
+
+    @property
+    def playback_label(self):
+        speed = PLAYBACK_SPEEDS[self.playback]
+        return f"{speed}x" if speed else "instant"
+
+    def draw_positions(self):
+        # between the last two physics states so motion stays smooth
+        # when render and physics rates differ
+        alpha = self.timestep.alpha
+        return lerp_positions(self.prev_positions, self.sim.positions(), alpha, INITIAL_SPEED * 2)
+
+    def draw_balls(self, positions=None):
+        """Draws every ball on the table; returns the rects painted."""
+        if positions is None:
+            positions = self.draw_positions()
+        # same sprites as Ball.draw, handed to pygame in one blits() call so
+        # a table of a thousand balls is not a thousand Python-level blits
+        sprite_for = Ball.sprites.get
+        batch = []
+        for ball, pos in zip(self.balls, positions):
+            state = ball.state
+            if state.in_pocket:
                 continue
-                
-            for pocket in self.table.pockets:
-                dx = ball.pos.x - pocket[0]
-                dy = ball.pos.y - pocket[1]
-                if math.hypot(dx, dy) < POCKET_RADIUS:
-                    ball.in_pocket = True
-                    ball.vel = pygame.Vector2(0, 0)
-                    ball.pos = pygame.Vector2(pocket[0], pocket[1])
-                    
-                    if not ball.is_cue:
-                        pts = 0
-                        valid_shot = True
-                        
-                        if self.map_type == 1:
-                            # Pool 8-ball scoring with proper rules
-                            pts, valid_shot = self.score_pool_ball(ball.number)
-                        elif self.map_type == 2:
-                            # Snooker scoring with proper rules
-                            pts, valid_shot = self.score_snooker_ball(ball.number)
-                            
-                        if valid_shot and pts > 0:
-                            self.score += pts
-                            self.shot_score += pts
-                            self.shot_pocketed_count += 1
-                            self.last_gain_text = f"+{pts} pts"
-                            self.prediction = f"Ball {ball.number} pocketed!"
-                        elif not valid_shot:
-                            self.prediction = "Invalid shot!"
-                            self.last_gain_text = "No points - wrong ball"
-                            
-                    elif ball.is_cue:
-                        # Respawn cue ball
-                        ball.in_pocket = False
-                        ball.pos = pygame.Vector2(
-                            self.table.x + int(self.table.width * 0.25),
-                            self.table.y + self.table.height // 2
-                        )
-                        ball.vel = pygame.Vector2(0, 0)
-                        self.prediction = "Cue ball in pocket!"
-                        
-        # Check for Carom shot completion (handled in main loop)
-    
-    def score_pool_ball(self, ball_number):
-        """
-        Score Pool 8-ball ball with proper rules:
-        - First ball determines player's group (solid 1-7 or stripe 9-15)
-        - Must clear all balls of your group before shooting 8-ball
-        - 8-ball is worth 20 points
-        Returns: (points, valid_shot)
-        """
-        if ball_number == 8:
-            # Check if player can shoot 8-ball
-            if self.pool_player_group is None:
-                return 0, False  # Can't shoot 8-ball first
-            
-            if self.pool_player_group == 'solid':
-                if self.pool_solids_pocketed < 7:
-                    return 0, False  # Must clear all solids first
-            elif self.pool_player_group == 'stripe':
-                if self.pool_stripes_pocketed < 7:
-                    return 0, False  # Must clear all stripes first
-            
-            return 20, True
-        
-        elif 1 <= ball_number <= 7:  # Solids
-            if self.pool_player_group is None:
-                # First ball determines group
-                self.pool_player_group = 'solid'
-                self.pool_solids_pocketed = 1
-                return 10, True
-            elif self.pool_player_group == 'solid':
-                self.pool_solids_pocketed += 1
-                return 10, True
-            else:
-                return 0, False  # Wrong group
-        
-        elif 9 <= ball_number <= 15:  # Stripes
-            if self.pool_player_group is None:
-                # First ball determines group
-                self.pool_player_group = 'stripe'
-                self.pool_stripes_pocketed = 1
-                return 15, True
-            elif self.pool_player_group == 'stripe':
-                self.pool_stripes_pocketed += 1
-                return 15, True
-            else:
-                return 0, False  # Wrong group
-        
-        return 0, False
-    
-    def score_snooker_ball(self, ball_number):
-        """
-        Score Snooker ball with proper rules:
-        - Must alternate: red -> color -> red -> color
-        - Red balls: 1 point each
-        - Color balls: respot after potting (not fully implemented)
-        Returns: (points, valid_shot)
-        """
-        if ball_number == 1:  # Red ball
-            if not self.snooker_expecting_red:
-                return 0, False  # Must pot red first
-            self.snooker_expecting_red = False
-            self.scoring.last_red = True
-            self.scoring.red_count -= 1
-            return 1, True
-        
-        elif 2 <= ball_number <= 7:  # Color balls
-            if self.snooker_expecting_red:
-                if self.scoring.red_count > 0:
-                    return 0, False  # Must pot red first if reds remain
-            # Valid color shot
-            self.snooker_expecting_red = True  # After color, expect red again
-            self.scoring.last_red = False
-            # Note: In real snooker, color would respot, but we'll just continue
-            return ball_number, True
-        
-        return 0, False
+            sprite, anchor = sprite_for(state.number, state.color, state.is_cue, state.radius)
+            batch.append((sprite, (int(pos[0]) - anchor, int(pos[1]) - anchor)))
+        return self.screen.blits(batch)
 
-    def draw_menu(self):
+    def paint_menu_background(self, screen):
         # Enhanced gradient background with animated feel
         for y in range(SCREEN_HEIGHT):
             ratio = y / SCREEN_HEIGHT
             r = int(20 + ratio * 25)
             g = int(20 + ratio * 25)
             b = int(35 + ratio * 15)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+            pygame.draw.line(screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
         
         # Decorative lines at top and bottom
-        pygame.draw.line(self.screen, GOLD, (0, 0), (SCREEN_WIDTH, 0), 3)
-        pygame.draw.line(self.screen, GOLD, (0, SCREEN_HEIGHT-1), (SCREEN_WIDTH, SCREEN_HEIGHT-1), 3)
+        pygame.draw.line(screen, GOLD, (0, 0), (SCREEN_WIDTH, 0), 3)
+        pygame.draw.line(screen, GOLD, (0, SCREEN_HEIGHT-1), (SCREEN_WIDTH, SCREEN_HEIGHT-1), 3)
         
         # Title with enhanced shadow effect
         title_text = "🎱 BILLIARDS GAME"
@@ -575,8 +438,13 @@ class Game:
         title_y = 50
         # Multiple shadow layers for depth
         for offset in [(3, 3), (2, 2), (1, 1)]:
-            self.screen.blit(title_shadow, (title_x + offset[0], title_y + offset[1]))
-        self.screen.blit(title, (title_x, title_y))
+            screen.blit(title_shadow, (title_x + offset[0], title_y + offset[1]))
+        screen.blit(title, (title_x, title_y))
+
+    def draw_menu(self):
+        # gradient, border lines and title never change: cached layer
+        self.screen.blit(self.layers.get('menu', None, self.screen.get_size(),
+                                         self.paint_menu_background), (0, 0))
         
         # Map selection cards with descriptions
         map_info = [
@@ -668,14 +536,14 @@ class Game:
         inst_text = self.font_small.render(instructions, True, (150, 150, 150))
         self.screen.blit(inst_text, (SCREEN_WIDTH//2 - inst_text.get_width()//2, SCREEN_HEIGHT - 30))
 
-    def draw_level_select(self):
+    def paint_level_select_background(self, screen):
         # Draw gradient background
         for y in range(SCREEN_HEIGHT):
             ratio = y / SCREEN_HEIGHT
             r = int(25 + ratio * 30)
             g = int(25 + ratio * 30)
             b = int(40 + ratio * 20)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+            pygame.draw.line(screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
         
         # Title with shadow
         title_text = "LEVEL COMPLETE!"
@@ -683,11 +551,15 @@ class Game:
         title = self.font_large.render(title_text, True, GOLD)
         title_shadow = self.font_large.render(title_text, True, (0, 0, 0))
         title_x = SCREEN_WIDTH//2 - title.get_width()//2
-        self.screen.blit(title_shadow, (title_x + 2, 82))
-        self.screen.blit(title, (title_x, 80))
+        screen.blit(title_shadow, (title_x + 2, 82))
+        screen.blit(title, (title_x, 80))
         
         subtitle = self.font.render(subtitle_text, True, WHITE)
-        self.screen.blit(subtitle, (SCREEN_WIDTH//2 - subtitle.get_width()//2, 140))
+        screen.blit(subtitle, (SCREEN_WIDTH//2 - subtitle.get_width()//2, 140))
+
+    def draw_level_select(self):
+        self.screen.blit(self.layers.get('level_select', None, self.screen.get_size(),
+                                         self.paint_level_select_background), (0, 0))
         
         # Level buttons with modern design
         start_x = SCREEN_WIDTH//2 - (120 * len(self.level_options))//2
@@ -724,100 +596,82 @@ class Game:
 
     def _compute_reflected_path(self, origin, direction, max_segments=4, max_length=1200):
         # returns list of points [origin, p1, p2, ...] for drawing projected trajectory with reflections
-        pts = [origin.copy()]
-        p = origin.copy()
-        dirv = direction.normalize()
-        remaining = max_length
-        left = self.table.x + BALL_RADIUS
-        right = self.table.x + self.table.width - BALL_RADIUS
-        top = self.table.y + BALL_RADIUS
-        bottom = self.table.y + self.table.height - BALL_RADIUS
-
-        for _ in range(max_segments):
-            if remaining <= 0:
-                break
-            tx = float('inf')
-            ty = float('inf')
-            if abs(dirv.x) > 1e-6:
-                if dirv.x > 0:
-                    tx = (right - p.x) / dirv.x
-                else:
-                    tx = (left - p.x) / dirv.x
-            if abs(dirv.y) > 1e-6:
-                if dirv.y > 0:
-                    ty = (bottom - p.y) / dirv.y
-                else:
-                    ty = (top - p.y) / dirv.y
-            # choose nearest positive
-            t = min([t for t in (tx, ty) if t > 1e-6], default=None)
-            if t is None:
-                # goes nowhere (parallel), extend by remaining
-                next_p = p + dirv * remaining
-                pts.append(next_p)
-                break
-            travel = min(t, remaining)
-            next_p = p + dirv * travel
-            pts.append(next_p)
-            remaining -= travel
-            p = next_p
-            # reflect
-            # if tx is chosen (vertical wall), reflect x component
-            # compare which t matched (within small epsilon)
-            if abs(t - tx) < 1e-4:
-                dirv.x = -dirv.x
-            elif abs(t - ty) < 1e-4:
-                dirv.y = -dirv.y
-            else:
-                break
-        return pts
+        bounds = (self.table.x + BALL_RADIUS, self.table.y + BALL_RADIUS,
+                  self.table.x + self.table.width - BALL_RADIUS, self.table.y + self.table.height - BALL_RADIUS)
+        return [pygame.Vector2(p) for p in rail_path(origin, direction, bounds, max_segments, max_length)]
 
     def draw_cue(self):
         # draw cue stick and power bar when aiming + trajectory preview
+        # returns the rects painted
+        rects = []
         cue_ball = next((b for b in self.balls if b.is_cue), None)
         if not cue_ball:
-            return
+            return rects
         if self.aiming:
             mouse = pygame.Vector2(pygame.mouse.get_pos())
             # direction from cue ball to mouse (drag direction)
             dirv = (self.aim_start - mouse)
             if dirv.length() == 0:
-                return
+                return rects
             direction = dirv.normalize()
             # cue stick length proportional to power
             power = min(dirv.length(), INITIAL_SPEED)
             stick_len = 120 + power
             start = cue_ball.pos - direction * 8  # gap
             end = cue_ball.pos - direction * stick_len
-            pygame.draw.line(self.screen, CUE_COLOR, (int(start.x), int(start.y)), (int(end.x), int(end.y)), 6)
+            rects.append(pygame.draw.line(self.screen, CUE_COLOR, (int(start.x), int(start.y)), (int(end.x), int(end.y)), 6))
             # power bar
             bar_w = 200
             bar_h = 12
             bar_x = 30
             bar_y = SCREEN_HEIGHT - 50
-            pygame.draw.rect(self.screen, (80,80,80), (bar_x, bar_y, bar_w, bar_h))
+            rects.append(pygame.draw.rect(self.screen, (80,80,80), (bar_x, bar_y, bar_w, bar_h)))
             p = power / INITIAL_SPEED
-            pygame.draw.rect(self.screen, (200,50,50), (bar_x, bar_y, int(bar_w * p), bar_h))
+            rects.append(pygame.draw.rect(self.screen, (200,50,50), (bar_x, bar_y, int(bar_w * p), bar_h)))
 
-            # trajectory preview (reflecting)
-            preview_dir = direction
-            pts = self._compute_reflected_path(cue_ball.pos, preview_dir, max_segments=5, max_length=800 + int(power*6))
+            # trajectory preview: reflects off rails, stops at the first ball hit
+            cue_index = self.balls.index(cue_ball)
+            pts, contact = self.aim_preview.get(self.sim, cue_index, direction)
+            max_length = 800 + int(power*6)
+            remaining = max_length
             # draw dotted segments
             for i in range(len(pts)-1):
-                a = pts[i]
-                b = pts[i+1]
+                if remaining <= 0:
+                    break
+                a = pygame.Vector2(pts[i])
+                b = pygame.Vector2(pts[i+1])
                 # draw dashed line
                 seg_v = b - a
-                seg_len = seg_v.length()
+                seg_len = min(seg_v.length(), remaining)
                 if seg_len == 0:
                     continue
+                remaining -= seg_len
                 seg_dir = seg_v.normalize()
                 dash = 12
                 drawn = 0
                 while drawn < seg_len:
                     s = a + seg_dir * drawn
                     e = a + seg_dir * min(drawn + dash*0.6, seg_len)
-                    pygame.draw.line(self.screen, (220,220,220), (int(s.x), int(s.y)), (int(e.x), int(e.y)), 2)
+                    rects.append(pygame.draw.line(self.screen, PREVIEW_COLOR, (int(s.x), int(s.y)), (int(e.x), int(e.y)), 2))
                     drawn += dash
+            if contact is not None and contact.distance <= max_length:
+                rects += self.draw_contact_preview(contact, cue_ball.radius)
+        return rects
+
+    def draw_contact_preview(self, contact, radius):
+        """Ghost ball at impact, object ball direction and cue ball deflection."""
+        rects = []
+        gx, gy = contact.ghost
+        rects.append(pygame.draw.circle(self.screen, PREVIEW_COLOR, (int(gx), int(gy)), int(radius), 1))
+        target = self.balls[contact.index].pos
+        tip = target + pygame.Vector2(contact.object_dir) * (40 + 80 * contact.object_speed)
+        rects.append(pygame.draw.line(self.screen, OBJECT_PATH_COLOR, (int(target.x), int(target.y)),
+                                      (int(tip.x), int(tip.y)), 2))
+        if contact.cue_dir is not None:
+            tip = pygame.Vector2(contact.ghost) + pygame.Vector2(contact.cue_dir) * (80 * contact.cue_speed)
+            rects.append(pygame.draw.line(self.screen, CUE_PATH_COLOR, (int(gx), int(gy)),
+                                          (int(tip.x), int(tip.y)), 2))
+        return rects
 
     def draw_buttons(self):
         mouse_pos = pygame.mouse.get_pos()
@@ -841,10 +695,258 @@ class Game:
         reset_text = self.font_small.render("Reset", True, BUTTON_TEXT_COLOR)
         reset_rect = reset_text.get_rect(center=self.buttons['reset'].center)
         self.screen.blit(reset_text, reset_rect)
+        return list(self.buttons.values())
+
+    def add_points(self, points):
+        if self.vs_computer and self.turn == 'computer':
+            self.computer_score += points
+        elif self.net is not None and self.turn == 'remote':
+            self.remote_score += points
+        else:
+            super().add_points(points)
+
+    def begin_shot(self):
+        super().begin_shot()
+        self.skip_to_rest = False
+        if self.trajectory is not None:
+            self.trajectory.begin_shot(self.sim)
+
+    def finish_shot(self):
+        if self.trajectory is not None:
+            self.trajectory.end_shot()
+        complete = super().finish_shot()
+        if self.replay is not None:
+            self.replay_index += 1
+            if self.replay_index < len(self.replay):
+                self.play_replay_shot()
+            else:
+                self.prediction = f"Replay finished ({len(self.replay)} shots)"
+        elif self.net is not None:
+            # the guest waits for the host's final table before the turn passes
+            self.handle_net_events(self.net.settled(self.score, self.remote_score))
+        elif complete:
+            self.level_options = self.level_manager.get_progression(self.table.map_type)
+            self.state = "LEVEL_SELECT"
+        elif self.vs_computer:
+            self.turn = 'player' if self.turn == 'computer' else 'computer'
+
+    def update_computer(self):
+        """On the computer's turn: start a shot search, then play it once found (never blocks)."""
+        if self.shot_in_progress or self.sim.is_moving():
+            return
+        if self.computer is None:
+            # the process pool machinery is only imported once the computer plays
+            from ai import ComputerPlayer
+            self.computer = ComputerPlayer(AI_DIFFICULTY, AI_TIME_BUDGET, backend=PHYSICS_BACKEND,
+                                           substeps=PHYSICS_SUBSTEPS)
+        if not self.computer.searching:
+            self.computer.start(self.sim, self)
+            self.prediction = "Computer is thinking..."
+            return
+        shot = self.computer.poll()
+        if shot is not None:
+            self.prediction = ""
+            vx, vy = shot_velocity(*shot)
+            self.record_shot(vx, vy)
+            self.sim.shoot(vx, vy)
+            self.begin_shot()
+
+    def start_net(self, match):
+        """Two players over the network (netplay.NetMatch); the host picks the table and breaks."""
+        self.net = match
+        self.remote_score = 0
+        self.vs_computer = False
+        self.state = "GAME"
+        # the guest gets the host's table once connected
+        self.start_level()
+        self.prediction = "Waiting for the other player..."
+
+    def stop_net(self):
+        if self.net is not None:
+            self.net.close()
+            self.net = None
+            self.turn = 'player'
+
+    def net_turn(self):
+        return 'player' if self.net.shooter(self.net.shot) == self.net.role else 'remote'
+
+    def update_net(self):
+        """Apply what the other player sent: shots, the host's corrections and final tables (never blocks)."""
+        self.handle_net_events(self.net.poll())
+
+    def handle_net_events(self, events):
+        for event in events:
+            kind = event[0]
+            if kind == 'start':
+                self.prediction = "Other player connected"
+                if self.net.role == 'guest':
+                    self.map_type = event[1]
+                    self.start_level()
+            elif kind == 'shot':
+                self.record_shot(event[1], event[2])
+                self.sim.shoot(event[1], event[2])
+                self.begin_shot()
+            elif kind == 'final':
+                self.score, self.remote_score = event[1], event[2]
+                if self.level_complete:
+                    # next rack on the same table, the scores carry over
+                    self.start_level()
+            elif kind == 'closed':
+                self.prediction = f"Network game over: {event[1]}"
+                self.stop_net()
+                return
+            self.turn = self.net_turn()
+
+    def record_shot(self, vx, vy):
+        """Append the table as it is now plus the cue velocity about to be applied."""
+        if self.recorder is not None and self.replay is None:
+            self.recorder.record(self.sim, self, vx, vy)
+
+    def start_stress(self, count=None, layout='random'):
+        """Straight into the stress sandbox (maps/map4_stress.py): `count` small balls, no scoring."""
+        from maps.map4_stress import STRESS_BALLS, STRESS_MAP_TYPE, create_stress_map
+        register_map(STRESS_MAP_TYPE, create_stress_map(int(count or STRESS_BALLS), layout))
+        self.map_type = STRESS_MAP_TYPE
+        self.state = "GAME"
+        self.start_level()
+
+    def start_replay(self, path):
+        """Play a replay file back on screen, shot after shot."""
+        self.start_level()
+        self.replay = ReplayFile(path)
+        self.replay_index = 0
+        self.state = "GAME"
+        if len(self.replay):
+            self.play_replay_shot()
+        else:
+            self.prediction = "Replay is empty"
+
+    def play_replay_shot(self):
+        shot = self.replay[self.replay_index]
+        self.map_type = shot.map_type
+        self.table = Table(self.map_type)
+        x, y, width, height, pockets = shot.snapshot[0]
+        self.table.x, self.table.y, self.table.width, self.table.height = x, y, width, height
+        self.table.pockets = [tuple(p) for p in pockets]
+        self.sim = shot.simulation()
+        self.balls = [Ball.from_state(state) for state in self.sim.balls]
+        self.timestep.reset()
+        self.prev_positions = self.sim.positions()
+        self.dirty.invalidate()
+        self.reset_rules({'mode': shot.rules_state['carom_mode']})
+        self.set_rules_state(shot.rules_state)
+        self.score = shot.score
+        self.prediction = f"Replay: shot {self.replay_index + 1}/{len(self.replay)}"
+        self.sim.shoot(*shot.velocity)
+        self.begin_shot()
+
+    def stop_replay(self):
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+
+    def draw_hud(self):
+        """Score, mode and prediction panels; returns the rects painted."""
+        title, lines = self.hud_mode_lines()
+        return self.hud.draw(self.screen, self.table, self.score, self.last_gain_text,
+                             title, lines, self.prediction)
+
+    def hud_mode_lines(self):
+        """Mode panel title and its (slot, text, color, min_panel_height) rows."""
+        title = f"Mode: {MAP_NAMES[self.map_type]}"
+        if PLAYBACK_SPEEDS[self.playback] != 1:
+            title += f"  [{self.playback_label}]"
+        lines = []
+        rule_set = self.rule_set
+        if rule_set == 'pool':
+            if self.pool_player_group:
+                lines.append((1, f"Group: {self.pool_player_group.upper()}", SCORE_COLOR, 0))
+                remaining = 7 - (self.pool_solids_pocketed if self.pool_player_group == 'solid' else self.pool_stripes_pocketed)
+                lines.append((2, f"Remaining: {remaining}", (200, 200, 200), 60))
+        elif rule_set == 'snooker':
+            lines.append((1, f"Reds left: {self.scoring.red_count}", RED, 60))
+            expect_text = "Expect: RED" if self.snooker_expecting_red else "Expect: COLOR"
+            lines.append((2, expect_text, SCORE_COLOR, 60))
+        elif rule_set == 'carom':
+            mode_text_carom = f"Mode: {self.carom_mode.upper()}" if self.carom_mode else "Mode: LIBRE"
+            lines.append((1, mode_text_carom, SCORE_COLOR, 50))
+        if self.vs_computer:
+            lines.append((3, f"Computer: {self.computer_score:,}", SILVER, 80))
+        elif self.net is not None:
+            lines.append((3, f"Opponent: {self.remote_score:,}", SILVER, 80))
+        return title, lines
+
+    def draw_game(self, prof=None):
+        # prof: the FrameProfiler while it is on (each phase is charged to it)
+        self.table.draw(self.screen)
+        if prof:
+            prof.mark(profiler.TABLE)
+        self.draw_balls()
+        if prof:
+            prof.mark(profiler.BALLS)
+        self.draw_cue()
+        if prof:
+            prof.mark(profiler.CUE)
+        self.draw_buttons()
+        self.draw_hud()
+        if prof:
+            prof.mark(profiler.HUD)
+            prof.draw(self.screen)
+            prof.mark(profiler.OVERLAY)
+
+    def draw_game_dirty(self, prof=None):
+        """
+        Dirty-rectangle version of draw_game; presents the frame itself
+        (display.update on the changed rects only).
+        """
+        positions = self.draw_positions()
+        mouse = pygame.mouse.get_pos()
+        hover = tuple(rect.collidepoint(mouse) for rect in self.buttons.values())
+        overlay_key = (hover, self.hud_state())
+        key = ([(int(x), int(y)) for x, y in positions], [b.in_pocket for b in self.balls],
+               mouse if self.aiming else None, overlay_key)
+        if self.dirty.unchanged(key) and not prof:
+            return
+        if self.aiming:
+            # cue stick / trajectory can reach anywhere on screen
+            covered = [self.screen.get_rect()]
+        else:
+            covered = [r for r in (b.draw_rect(p) for b, p in zip(self.balls, positions)) if r]
+        redraw_overlay = self.dirty.begin(self.screen, self.table.layer(self.screen.get_size()),
+                                          covered, overlay_key)
+        if prof:
+            prof.mark(profiler.TABLE)
+        dynamic = self.draw_balls(positions)
+        if prof:
+            prof.mark(profiler.BALLS)
+        dynamic += self.draw_cue()
+        if prof:
+            prof.mark(profiler.CUE)
+        overlay = None
+        if redraw_overlay:
+            overlay = self.draw_buttons()
+            overlay += self.draw_hud()
+        if prof:
+            prof.mark(profiler.HUD)
+            # redrawn every frame, so it belongs to the dynamic layer
+            dynamic.append(prof.draw(self.screen))
+            prof.mark(profiler.OVERLAY)
+        self.dirty.present(dynamic, overlay)
+        if prof:
+            prof.mark(profiler.FLIP)
+
+    def hud_state(self):
+        # everything draw_hud() shows, to tell whether the HUD changed
+        return (self.score, self.last_gain_text, self.prediction, self.hud_mode_lines())
 
     def run(self):
+        self.open_display()
         running = True
         while running:
+            # None unless the profiler is on: the only cost when it is off
+            prof = self.profiler if self.profiler.enabled else None
+            if prof:
+                prof.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
@@ -855,9 +957,10 @@ class Game:
                     # Handle button clicks during GAME state
                     if self.state == "GAME":
                         if self.buttons['back'].collidepoint(mouse_pos):
+                            self.stop_net()
                             self.state = "MENU"
                             continue
-                        elif self.buttons['reset'].collidepoint(mouse_pos):
+                        elif self.buttons['reset'].collidepoint(mouse_pos) and self.net is None:
                             self.start_level()  # Reset current map
                             continue
 
@@ -889,7 +992,8 @@ class Game:
                             self.state = "GAME"
                             self.start_level()
 
-                    elif self.state == "GAME":
+                    elif self.state == "GAME" and self.turn == 'player' and self.replay is None \
+                            and (self.net is None or self.net.my_turn):
                         # Start aiming if cue ball is stationary: allow click anywhere when stationary (easier)
                         cue_ball = next((b for b in self.balls if b.is_cue), None)
                         if cue_ball and not cue_ball.in_pocket:
@@ -919,316 +1023,123 @@ class Game:
                         cue_ball = next((b for b in self.balls if b.is_cue), None)
                         dirv = self.aim_start - self.aim_end
                         if cue_ball and dirv.length() > 0:
-                            # Start new shot tracking
-                            self.shot_in_progress = True
-                            self.carom_contacts.clear()
-                            
                             power = min(dirv.length(), INITIAL_SPEED)
                             # stronger power scaling to make it easier
-                            vel = dirv.normalize() * (power * 0.8)
+                            vel = dirv.normalize() * (power * SHOT_SPEED_SCALE)
+                            self.record_shot(vel.x, vel.y)
+                            if self.net is not None:
+                                self.net.local_shot(vel.x, vel.y)
                             cue_ball.vel = vel
-                            # mark shot started for combo tracking
-                            self.shot_in_progress = True
-                            self.shot_pocketed_count = 0
-                            self.shot_score = 0
-                            self.last_gain_text = ""
-                            # carom trackers reset at shot start
-                            if self.carom_mode:
-                                self.carom_bounce_count = 0
-                                self.carom_contacts = set()
-                                self.carom_first_contact_bounces = None
+                            # Start new shot tracking (combo / carom trackers)
+                            self.begin_shot()
                         self.aiming = False
                         self.aim_start = None
                         self.aim_end = None
 
                 if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:
+                        self.profiler.toggle()
+                        self.dirty.invalidate()
                     if event.key == pygame.K_ESCAPE:
                         if self.state == "GAME":
+                            self.stop_net()
                             self.state = "MENU"
                         else:
                             running = False
-                    if event.key == pygame.K_SPACE and self.state == "GAME":
+                    if event.key == pygame.K_SPACE and self.state == "GAME" and self.net is None:
                         # small debug: nudge all balls slightly
                         for ball in self.balls:
                             if not ball.in_pocket:
                                 ball.vel += pygame.Vector2(random.uniform(-1,1), random.uniform(-1,1))
+                    if event.key == pygame.K_f and self.state == "GAME":
+                        self.playback = (self.playback + 1) % len(PLAYBACK_SPEEDS)
+                        self.prediction = f"Playback speed: {self.playback_label}"
+                    if event.key == pygame.K_RETURN and self.state == "GAME" and self.shot_in_progress:
+                        self.skip_to_rest = True
+                    if event.key == pygame.K_c and self.state == "GAME" and not self.shot_in_progress \
+                            and self.replay is None and self.net is None:
+                        # play against the computer (it takes every other shot)
+                        self.vs_computer = not self.vs_computer
+                        self.turn = 'player'
+                        if self.computer:
+                            self.computer.cancel()
+                        self.prediction = "Playing vs computer" if self.vs_computer else "Computer off"
+
+            if prof:
+                prof.mark(profiler.EVENTS)
 
             # --- update/draw cycles (use your existing code) ---
+            presented = False
             if self.state == "MENU":
                 self.draw_menu()
 
             elif self.state == "GAME":
-                self.screen.fill(BROWN)
-                self.table.draw(self.screen)
-
-                # Update and draw balls
-                for ball in self.balls:
-                    ball.update()
-
-                self.check_collisions()
-
-                for ball in self.balls:
-                    ball.draw(self.screen)
-
-                # Draw cue if needed
-                self.draw_cue()
-
-                # Draw UI buttons on top
-                self.draw_buttons()
+                if self.net is not None:
+                    self.update_net()
+                self.update_physics()
+                # all balls stopped -> finalize shot combo / bonus OR carom success
+                if self.shot_in_progress and not self.sim.is_moving():
+                    self.finish_shot()
+                if self.vs_computer and self.turn == 'computer' and self.state == "GAME":
+                    self.update_computer()
+                if prof:
+                    prof.mark(profiler.PHYSICS)
 
-                # check if all balls stopped -> finalize shot combo / bonus OR carom success
-                any_moving = any((not b.in_pocket) and (b.vel.length() > 0.01) for b in self.balls)
-                if not any_moving and self.shot_in_progress:
-                    # If carom map, evaluate contacts
-                    if self.carom_mode:
-                        # contacts list holds tuples (ball_number, bounce_count_at_contact)
-                        # Convert set to list to access elements
-                        contacts_list = list(self.carom_contacts)
-                        
-                        if len(contacts_list) >= 2:
-                            # Sort by bounce count to get order of contact
-                            contacts_list.sort(key=lambda x: x[1])
-                            first_contact = contacts_list[0]
-                            second_contact = contacts_list[1]
-                            
-                            # Get unique ball numbers contacted
-                            unique_balls = set(c[0] for c in contacts_list)
-                            
-                            # Success requires both other balls (not cue) contacted
-                            target_balls = set(b.number for b in self.balls if not b.is_cue and not b.in_pocket)
-                            
-                            if len(unique_balls) >= 2 and unique_balls >= target_balls:
-                                # Check bounce requirements
-                                bounces_before_second = second_contact[1] - first_contact[1]
-                                ok = False
-                                
-                                if self.carom_mode == 'libre':
-                                    ok = True  # No bounce requirement
-                                elif self.carom_mode == 'one':
-                                    ok = (bounces_before_second >= 1)  # At least 1 bounce between contacts
-                                elif self.carom_mode == 'three':
-                                    ok = (bounces_before_second >= 3)  # At least 3 bounces between contacts
-                                
-                                if ok:
-                                    # Calculate points based on mode
-                                    if self.carom_mode == 'libre':
-                                        points = 1
-                                    elif self.carom_mode == 'one':
-                                        points = 20
-                                    elif self.carom_mode == 'three':
-                                        points = 50
-                                    else:
-                                        points = 1
-                                    
-                                    self.score += points
-                                    self.last_gain_text = f"Carom Success +{points}"
-                                    # mark level complete immediately
-                                    self.level_options = self.level_manager.get_progression(self.table.map_type)
-                                    self.state = "LEVEL_SELECT"
-                                else:
-                                    self.last_gain_text = f"Carom Failed - Need {3 if self.carom_mode == 'three' else 1} bounce(s)"
-                            else:
-                                self.last_gain_text = "Carom Failed - Must hit both balls"
-                        else:
-                            self.last_gain_text = "Carom Failed - Must hit both balls"
-                    else:
-                        # finish shot: give combo bonus if >1 ball pocketed this shot
-                        if self.shot_pocketed_count > 1:
-                            bonus = self.shot_pocketed_count * 5
-                            self.score += bonus
-                            self.last_gain_text = f"Combo x{self.shot_pocketed_count} +{bonus} pts"
-                        elif self.shot_pocketed_count == 1:
-                            # keep last_gain_text from pocketing
-                            pass
-                        # check level complete: all non-cue balls pocketed
-                        noncue = [b for b in self.balls if not b.is_cue]
-                        if noncue and all(b.in_pocket for b in noncue):
-                            self.level_options = self.level_manager.get_progression(self.table.map_type)
-                            self.state = "LEVEL_SELECT"
-
-                    # reset shot tracking
-                    self.shot_in_progress = False
-                    self.shot_pocketed_count = 0
-                    self.shot_score = 0
-                    # reset carom trackers
-                    self.carom_contacts = set()
-                    self.carom_bounce_count = 0
-                    self.carom_first_contact_bounces = None
-
-                # Enhanced UI panels with modern design
-                # Calculate safe zones (avoid buttons and table)
-                button_bottom = 60 + 35  # Buttons end at y=95
-                table_top = self.table.y  # Table starts here (felt area, excluding frame)
-                table_bottom = self.table.y + self.table.height  # Table ends here
-                score_panel_height = 130
-                margin = 20  # Generous margin from table to avoid any overlap
-                
-                # Score panel (right side) - positioned to avoid table completely
-                # Strategy: Try top, if not enough space, use bottom
-                
-                # Check space above table
-                space_above = table_top - 10  # From screen top to table top
-                
-                if space_above >= score_panel_height + margin:
-                    # Enough space above - place at top-right
-                    score_panel_y = 10
-                    # Double-check: panel bottom must be above table top with margin
-                    panel_bottom = score_panel_y + score_panel_height
-                    if panel_bottom > table_top - margin:
-                        score_panel_y = table_top - score_panel_height - margin
-                        score_panel_y = max(10, score_panel_y)  # Don't go above screen
-                else:
-                    # Not enough space above - place below table
-                    # Priority: Must be below table with margin, then fit on screen
-                    min_y_below_table = table_bottom + margin  # Minimum y to be below table
-                    
-                    # Check if we can fit below table
-                    available_space_below = SCREEN_HEIGHT - min_y_below_table - 10
-                    
-                    if available_space_below >= score_panel_height:
-                        # Enough space below table - place with margin
-                        score_panel_y = min_y_below_table
-                    elif available_space_below >= 80:
-                        # Limited space - reduce panel height but keep it below table
-                        score_panel_y = min_y_below_table
-                        score_panel_height = available_space_below
-                    else:
-                        # Very limited space - place as far right as possible
-                        # Place panel at edge, but ensure it's still below table
-                        score_panel_y = max(min_y_below_table, SCREEN_HEIGHT - score_panel_height - 10)
-                        # Final check: if still overlapping table, reduce height
-                        if score_panel_y < table_bottom + margin:
-                            score_panel_y = table_bottom + margin
-                            score_panel_height = min(score_panel_height, SCREEN_HEIGHT - score_panel_y - 10)
-                
-                # Final verification: ensure panel doesn't overlap table
-                panel_top = score_panel_y
-                panel_bottom = score_panel_y + score_panel_height
-                # Panel must be either completely above or completely below table
-                if panel_bottom > table_top - margin and panel_top < table_bottom + margin:
-                    # Panel overlaps table - force it below
-                    score_panel_y = table_bottom + margin
-                    # Recalculate panel bottom
-                    panel_bottom = score_panel_y + score_panel_height
-                    # If doesn't fit, reduce height
-                    if panel_bottom > SCREEN_HEIGHT - 10:
-                        score_panel_height = max(80, SCREEN_HEIGHT - score_panel_y - 10)
-                
-                # Ensure score_panel_height is at least minimum usable size
-                score_panel_height = max(80, min(130, score_panel_height))
-                
-                # Create panel with final calculated dimensions
-                score_panel = pygame.Surface((220, score_panel_height), pygame.SRCALPHA)
-                score_panel.fill((0, 0, 0, 200))
-                # Add border
-                pygame.draw.rect(score_panel, GOLD, (0, 0, 220, score_panel_height), 2)
-                self.screen.blit(score_panel, (SCREEN_WIDTH - 230, score_panel_y))
-                
-                # Score label with icon
-                score_label = self.font_small.render("⭐ SCORE", True, SILVER)
-                self.screen.blit(score_label, (SCREEN_WIDTH - 220, score_panel_y + 10))
-                
-                # Score value with formatting
-                score_text = self.font_large.render(f"{self.score:,}", True, GOLD)
-                self.screen.blit(score_text, (SCREEN_WIDTH - 220, score_panel_y + 30))
-                
-                # Last gain text with animation effect
-                if self.last_gain_text:
-                    lg = self.font_small.render(self.last_gain_text, True, (255, 240, 100))
-                    # Add background for better visibility
-                    lg_bg = pygame.Surface((lg.get_width() + 10, lg.get_height() + 4), pygame.SRCALPHA)
-                    lg_bg.fill((0, 0, 0, 150))
-                    self.screen.blit(lg_bg, (SCREEN_WIDTH - 220 - 5, score_panel_y + 85))
-                    self.screen.blit(lg, (SCREEN_WIDTH - 220, score_panel_y + 87))
-                
-                # Game mode panel - positioned to avoid table overlap
-                # Check if space below buttons is safe
-                mode_panel_height = 80
-                mode_panel_width = 250
-                margin = 15
-                
-                # Try to place below buttons first
-                preferred_y = button_bottom + 10
-                preferred_bottom = preferred_y + mode_panel_height
-                
-                # Check if panel would overlap with table
-                if preferred_bottom > table_top - margin:
-                    # Panel would overlap table - move to bottom left
-                    mode_panel_y = table_bottom + margin
-                    # Ensure it fits on screen
-                    if mode_panel_y + mode_panel_height > SCREEN_HEIGHT - 10:
-                        mode_panel_y = SCREEN_HEIGHT - mode_panel_height - 10
+                if RENDER_MODE == 'dirty':
+                    self.draw_game_dirty(prof)
+                    presented = True
                 else:
-                    # Safe to place below buttons
-                    mode_panel_y = preferred_y
-                
-                # Final check: ensure no overlap with table
-                panel_top = mode_panel_y
-                panel_bottom = mode_panel_y + mode_panel_height
-                if panel_bottom > table_top - margin and panel_top < table_bottom + margin:
-                    # Still overlapping - force to bottom
-                    mode_panel_y = table_bottom + margin
-                    if mode_panel_y + mode_panel_height > SCREEN_HEIGHT - 10:
-                        mode_panel_height = SCREEN_HEIGHT - mode_panel_y - 10
-                
-                mode_panel = pygame.Surface((mode_panel_width, mode_panel_height), pygame.SRCALPHA)
-                mode_panel.fill((0, 0, 0, 200))
-                pygame.draw.rect(mode_panel, SELECTED_COLOR, (0, 0, mode_panel_width, mode_panel_height), 2)
-                self.screen.blit(mode_panel, (10, mode_panel_y))
-                
-                mode_names = ["Pool 8-Ball", "Snooker", "Carom"]
-                mode_text = self.font_small.render(f"Mode: {mode_names[self.map_type-1]}", True, WHITE)
-                self.screen.blit(mode_text, (20, mode_panel_y + 10))
-                
-                # Game mode specific stats (adjust position based on panel height)
-                # Use proportional spacing that adapts to panel height
-                text_spacing = max(20, mode_panel_height // 4)
-                line1_y = mode_panel_y + text_spacing
-                line2_y = mode_panel_y + text_spacing * 2
-                
-                if self.map_type == 1:  # Pool
-                    if self.pool_player_group:
-                        group_text = f"Group: {self.pool_player_group.upper()}"
-                        group_label = self.font_small.render(group_text, True, SCORE_COLOR)
-                        self.screen.blit(group_label, (20, line1_y))
-                        
-                        if mode_panel_height >= 60:  # Only show if enough space
-                            remaining = 7 - (self.pool_solids_pocketed if self.pool_player_group == 'solid' else self.pool_stripes_pocketed)
-                            remaining_text = self.font_small.render(f"Remaining: {remaining}", True, (200, 200, 200))
-                            self.screen.blit(remaining_text, (20, line2_y))
-                elif self.map_type == 2:  # Snooker
-                    if mode_panel_height >= 60:  # Only show if enough space
-                        reds_text = self.font_small.render(f"Reds left: {self.scoring.red_count}", True, RED)
-                        self.screen.blit(reds_text, (20, line1_y))
-                        
-                        expect_text = "Expect: RED" if self.snooker_expecting_red else "Expect: COLOR"
-                        expect_label = self.font_small.render(expect_text, True, SCORE_COLOR)
-                        self.screen.blit(expect_label, (20, line2_y))
-                elif self.map_type == 3:  # Carom
-                    if mode_panel_height >= 50:  # Only show if enough space
-                        mode_text_carom = f"Mode: {self.carom_mode.upper()}" if self.carom_mode else "Mode: LIBRE"
-                        mode_label = self.font_small.render(mode_text_carom, True, SCORE_COLOR)
-                        self.screen.blit(mode_label, (20, line1_y))
-                
-                # Prediction/Status panel (bottom left)
-                if self.prediction:
-                    pred_panel = pygame.Surface((max(300, self.font_small.size(self.prediction)[0] + 20), 50), pygame.SRCALPHA)
-                    pred_panel.fill((0, 0, 0, 200))
-                    pygame.draw.rect(pred_panel, (100, 255, 100), (0, 0, pred_panel.get_width(), 50), 2)
-                    self.screen.blit(pred_panel, (10, SCREEN_HEIGHT - 60))
-                    
-                    pred_text = self.font_small.render(self.prediction, True, (200, 255, 200))
-                    self.screen.blit(pred_text, (20, SCREEN_HEIGHT - 45))
+                    self.draw_game(prof)
 
             elif self.state == "LEVEL_SELECT":
                 self.draw_level_select()
 
-            pygame.display.flip()
-            self.clock.tick(60)
+            if not presented:
+                pygame.display.flip()
+                # the screen no longer matches what dirty mode last drew
+                self.dirty.invalidate()
+            if prof:
+                prof.mark(profiler.FLIP)
+            # real time of this frame drives the physics accumulator next frame
+            self.frame_seconds = self.clock.tick(RENDER_FPS) / 1000.0
+            if prof:
+                prof.mark(profiler.WAIT)
+                # only GAME frames are kept (menus have no phases)
+                prof.end_frame(keep=self.state == "GAME")
 
+        Ball.sprites.clear()
+        Table.layers.clear()
+        self.layers.clear()
+        if self.computer:
+            self.computer.close()
+        self.stop_net()
+        if self.recorder:
+            self.recorder.close()
+        if self.trajectory:
+            self.trajectory.close()
+        if self.profiler.rows:
+            self.profiler.export_csv(os.path.join(PROFILE_DIR, self.session + '.csv'))
+        self.stop_replay()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
     game = Game()
+    if len(sys.argv) > 2 and sys.argv[1] == '--replay':
+        game.start_replay(sys.argv[2])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--stress':
+        # --stress [count] [random|packed]
+        game.start_stress(*sys.argv[2:4])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--host':
+        # --host [map] [port] [bind]: wait for a --join from another window, or
+        # from another machine when bind is e.g. 0.0.0.0 (default: this machine only)
+        from netplay import DEFAULT_PORT, NetMatch
+        game.map_type = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+        game.start_net(NetMatch.host(int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_PORT, game.map_type,
+                                     backend=PHYSICS_BACKEND, substeps=PHYSICS_SUBSTEPS,
+                                     bind=sys.argv[4] if len(sys.argv) > 4 else '127.0.0.1'))
+    elif len(sys.argv) > 2 and sys.argv[1] == '--join':
+        # --join host[:port]
+        from netplay import NetMatch
+        game.start_net(NetMatch.join(sys.argv[2], backend=PHYSICS_BACKEND, substeps=PHYSICS_SUBSTEPS))
     game.run()
\ No newline at end of file
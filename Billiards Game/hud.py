@@ -0,0 +1,162 @@
+"""
+HUD giữ lại (retained) cho màn hình GAME: panel điểm, panel chế độ chơi và
+panel dự đoán.
+
+Vị trí các panel chỉ phụ thuộc vào kích thước bàn nên được tính một lần cho
+mỗi hình học bàn (HudLayout). Nội dung mỗi panel (Surface nền + chữ đã
+render) được cache theo giá trị đang hiển thị và chỉ dựng lại khi giá trị đó
+đổi; mỗi frame chỉ còn blit các Surface có sẵn theo đúng thứ tự cũ.
+"""
+import pygame
+
+from levels import SCREEN_WIDTH, SCREEN_HEIGHT
+
+GOLD = (255, 215, 0)
+SILVER = (192, 192, 192)
+WHITE = (255, 255, 255)
+SELECTED_COLOR = (255, 200, 0)
+GAIN_COLOR = (255, 240, 100)
+PREDICTION_BORDER = (100, 255, 100)
+PREDICTION_COLOR = (200, 255, 200)
+
+BUTTON_BOTTOM = 60 + 35  # Menu/Reset buttons end at y=95
+
+
+class HudLayout:
+    """Panel positions for one table geometry (avoid the buttons and the table)."""
+
+    def __init__(self, table):
+        table_top = table.y  # felt area, excluding frame
+        table_bottom = table.y + table.height
+
+        # Score panel (right side): try above the table, else below it
+        score_panel_height = 130
+        margin = 20  # Generous margin from table to avoid any overlap
+        space_above = table_top - 10  # From screen top to table top
+
+        if space_above >= score_panel_height + margin:
+            score_panel_y = 10
+            # panel bottom must be above table top with margin
+            if score_panel_y + score_panel_height > table_top - margin:
+                score_panel_y = max(10, table_top - score_panel_height - margin)
+        else:
+            min_y_below_table = table_bottom + margin
+            available_space_below = SCREEN_HEIGHT - min_y_below_table - 10
+            if available_space_below >= score_panel_height:
+                score_panel_y = min_y_below_table
+            elif available_space_below >= 80:
+                # Limited space - reduce panel height but keep it below table
+                score_panel_y = min_y_below_table
+                score_panel_height = available_space_below
+            else:
+                score_panel_y = max(min_y_below_table, SCREEN_HEIGHT - score_panel_height - 10)
+                if score_panel_y < table_bottom + margin:
+                    score_panel_y = table_bottom + margin
+                    score_panel_height = min(score_panel_height, SCREEN_HEIGHT - score_panel_y - 10)
+
+        # Panel must be either completely above or completely below table
+        if score_panel_y + score_panel_height > table_top - margin and score_panel_y < table_bottom + margin:
+            score_panel_y = table_bottom + margin
+            if score_panel_y + score_panel_height > SCREEN_HEIGHT - 10:
+                score_panel_height = max(80, SCREEN_HEIGHT - score_panel_y - 10)
+
+        self.score_y = score_panel_y
+        self.score_height = max(80, min(130, score_panel_height))
+
+        # Game mode panel (left side): below the buttons unless that overlaps the table
+        mode_panel_height = 80
+        margin = 15
+        preferred_y = BUTTON_BOTTOM + 10
+        if preferred_y + mode_panel_height > table_top - margin:
+            mode_panel_y = table_bottom + margin
+            if mode_panel_y + mode_panel_height > SCREEN_HEIGHT - 10:
+                mode_panel_y = SCREEN_HEIGHT - mode_panel_height - 10
+        else:
+            mode_panel_y = preferred_y
+        if mode_panel_y + mode_panel_height > table_top - margin and mode_panel_y < table_bottom + margin:
+            # Still overlapping - force to bottom
+            mode_panel_y = table_bottom + margin
+            if mode_panel_y + mode_panel_height > SCREEN_HEIGHT - 10:
+                mode_panel_height = SCREEN_HEIGHT - mode_panel_y - 10
+
+        self.mode_y = mode_panel_y
+        self.mode_width = 250
+        self.mode_height = mode_panel_height
+        # proportional line spacing that adapts to panel height
+        self.mode_spacing = max(20, mode_panel_height // 4)
+
+
+class Hud:
+    def __init__(self, font_small, font_large):
+        self.font_small = font_small
+        self.font_large = font_large
+        self.layout = None
+        self._layout_key = None
+        self.panels = {}  # name -> (value key, [(surface, pos), ...])
+
+    def layout_for(self, table):
+        key = (table.x, table.y, table.width, table.height)
+        if key != self._layout_key:
+            self.layout = HudLayout(table)
+            self._layout_key = key
+            self.panels.clear()
+        return self.layout
+
+    def draw(self, screen, table, score, last_gain_text, mode_title, mode_lines, prediction):
+        """
+        mode_lines: (slot, text, color, min_panel_height) rows of the mode panel.
+        Returns the rects painted.
+        """
+        layout = self.layout_for(table)
+        rects = []
+        for name, key, build in (
+                ('score', (score, last_gain_text), self._build_score),
+                ('mode', (mode_title, tuple(mode_lines)), self._build_mode),
+                ('prediction', prediction, self._build_prediction)):
+            cached = self.panels.get(name)
+            if cached is None or cached[0] != key:
+                cached = self.panels[name] = (key, build(layout, key))
+            for surface, pos in cached[1]:
+                rects.append(screen.blit(surface, pos))
+        return rects
+
+    def _build_score(self, layout, key):
+        score, last_gain_text = key
+        x, y, h = SCREEN_WIDTH - 230, layout.score_y, layout.score_height
+        panel = pygame.Surface((220, h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 200))
+        pygame.draw.rect(panel, GOLD, (0, 0, 220, h), 2)
+        pieces = [(panel, (x, y)),
+                  (self.font_small.render("⭐ SCORE", True, SILVER), (x + 10, y + 10)),
+                  (self.font_large.render(f"{score:,}", True, GOLD), (x + 10, y + 30))]
+        if last_gain_text:
+            lg = self.font_small.render(last_gain_text, True, GAIN_COLOR)
+            # background for better visibility
+            lg_bg = pygame.Surface((lg.get_width() + 10, lg.get_height() + 4), pygame.SRCALPHA)
+            lg_bg.fill((0, 0, 0, 150))
+            pieces += [(lg_bg, (x + 5, y + 85)), (lg, (x + 10, y + 87))]
+        return pieces
+
+    def _build_mode(self, layout, key):
+        mode_title, mode_lines = key
+        y, w, h = layout.mode_y, layout.mode_width, layout.mode_height
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 200))
+        pygame.draw.rect(panel, SELECTED_COLOR, (0, 0, w, h), 2)
+        pieces = [(panel, (10, y)),
+                  (self.font_small.render(mode_title, True, WHITE), (20, y + 10))]
+        for slot, text, color, min_height in mode_lines:
+            if h >= min_height:  # Only show if enough space
+                pieces.append((self.font_small.render(text, True, color),
+                               (20, y + layout.mode_spacing * slot)))
+        return pieces
+
+    def _build_prediction(self, layout, prediction):
+        # Prediction/Status panel (bottom left)
+        if not prediction:
+            return []
+        panel = pygame.Surface((max(300, self.font_small.size(prediction)[0] + 20), 50), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 200))
+        pygame.draw.rect(panel, PREDICTION_BORDER, (0, 0, panel.get_width(), 50), 2)
+        return [(panel, (10, SCREEN_HEIGHT - 60)),
+                (self.font_small.render(prediction, True, PREDICTION_COLOR), (20, SCREEN_HEIGHT - 45))]
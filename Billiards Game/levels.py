@@ -0,0 +1,134 @@
+"""
+Dựng level (bàn + bi) từ bảng map trong maps/ (maps.MAPS) mà không cần pygame.
+
+Mỗi map là dữ liệu (kích thước bàn, lỗ, bi, bộ luật); compile_level() dựng
+nó một lần thành hình học tuyệt đối trên màn, danh sách bi và PocketGrid rồi
+giữ trong cache, nên chọn lại hay reset level chỉ copy trạng thái có sẵn.
+Game.start_level() và mọi công cụ headless (batch, AI, replay...) đều đi qua
+đây nên cùng một map luôn cho ra cùng một trạng thái ban đầu.
+"""
+from broadphase import PocketGrid
+from maps import MAPS
+from physics import BALL_RADIUS, POCKET_RADIUS, BallState, Simulation, TableGeometry
+
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 720
+
+MAP_NAMES = {map_type: spec['name'] for map_type, spec in MAPS.items()}
+CAROM_MODES = ('libre', 'one', 'three')
+
+_compiled = {}  # (map_type, carom_mode, screen_size) -> CompiledLevel
+
+
+def register_map(map_type, spec):
+    """Add or replace a map: spec has name, rules, width, height, pockets, balls (see maps/)."""
+    MAPS[map_type] = spec
+    MAP_NAMES[map_type] = spec['name']
+    for key in [key for key in _compiled if key[0] == map_type]:
+        del _compiled[key]
+
+
+def rule_set_of(map_type):
+    """'pool', 'snooker' or 'carom': which rules.GameRules scoring applies to a map."""
+    spec = MAPS.get(map_type)
+    return spec['rules'] if spec else None
+
+
+def map_config(map_type, carom_mode='libre'):
+    # unknown map types fall back to pool, like the game always did
+    spec = MAPS.get(map_type, MAPS[1])
+    cfg = dict(spec)
+    # default carom mode = 'libre' (người dùng có thể thay đổi nếu muốn)
+    cfg['mode'] = carom_mode if spec['rules'] == 'carom' else spec['rules']
+    return cfg
+
+
+def layout_table(table, cfg, screen_size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+    """Resize `table` from cfg, center it on screen and set absolute pockets."""
+    table.width = cfg.get('width', table.width)
+    table.height = cfg.get('height', table.height)
+    table.x = (screen_size[0] - table.width) // 2
+    table.y = (screen_size[1] - table.height) // 2
+    table.pockets = [(int(table.x + rx * table.width), int(table.y + ry * table.height))
+                     for rx, ry in cfg.get('pockets', [])]
+    return table
+
+
+def spawn_balls(cfg, table):
+    """
+    Ball entries use either (rx,ry) relative to the table size, snapped to
+    whole pixels, or (x,y) pixel offsets from the table's top-left corner;
+    'radius' is optional (BALL_RADIUS).
+    """
+    balls = []
+    for b in cfg.get('balls', []):
+        if 'x' in b:
+            x = table.x + b['x']
+            y = table.y + b['y']
+        else:
+            x = int(table.x + b['rx'] * table.width)
+            y = int(table.y + b['ry'] * table.height)
+        balls.append(BallState(x, y, b.get('number', 0), b.get('color', (200, 200, 200)),
+                               is_cue=b.get('is_cue', False), radius=b.get('radius', BALL_RADIUS)))
+    return balls
+
+
+class CompiledLevel:
+    """A map laid out once: absolute table geometry, initial balls and pocket grid."""
+
+    def __init__(self, cfg, screen_size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        self.cfg = cfg
+        table = layout_table(TableGeometry(0, 0, cfg['width'], cfg['height']), cfg, screen_size)
+        self.table = (table.x, table.y, table.width, table.height, tuple(table.pockets))
+        self.balls = tuple((b.x, b.y, b.number, b.color, b.is_cue, b.radius) for b in spawn_balls(cfg, table))
+        self.pocket_grid = PocketGrid(table.pockets, POCKET_RADIUS)
+
+    def apply(self, table):
+        """Give `table` this level's geometry."""
+        table.x, table.y, table.width, table.height, pockets = self.table
+        table.pockets = list(pockets)
+        return table
+
+    def spawn(self):
+        """Fresh BallStates in the starting position."""
+        return [BallState(x, y, number, color, is_cue, radius) for x, y, number, color, is_cue, radius in self.balls]
+
+
+def compile_level(map_type, carom_mode='libre', screen_size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+    """CompiledLevel for a map, built on first use and cached."""
+    key = (map_type, carom_mode, tuple(screen_size))
+    level = _compiled.get(key)
+    if level is None:
+        level = _compiled[key] = CompiledLevel(map_config(map_type, carom_mode), screen_size)
+    return level
+
+
+def carom_mode_of(cfg):
+    mode = cfg.get('mode')
+    if mode in CAROM_MODES or mode == 'carom':
+        return mode
+    return None
+
+
+def simulation_class(backend='python'):
+    """'python' -> physics.Simulation, 'numpy' -> physics_numpy.ArraySimulation."""
+    if backend == 'numpy':
+        # numpy is optional: only imported when the array backend is requested
+        from physics_numpy import ArraySimulation
+        return ArraySimulation
+    if backend != 'python':
+        raise ValueError(f"unknown physics backend: {backend!r}")
+    return Simulation
+
+
+def load_level(map_type, carom_mode='libre', table=None, backend='python', substeps=1):
+    """
+    Returns (simulation, cfg) for map_type. Pass `table` to lay out an
+    existing table object in place (the game passes its drawable Table).
+    """
+    level = compile_level(map_type, carom_mode)
+    table = level.apply(table if table is not None else TableGeometry(0, 0, 0, 0))
+    sim = simulation_class(backend)(table, level.spawn(), substeps=substeps)
+    # the pockets are those the grid was built for: no rebuild on first step
+    sim.pocket_grid = level.pocket_grid
+    return sim, level.cfg
@@ -1,3 +1,11 @@
-# Trả về các factory cho từng map
-from .map2_snooker import create_snooker_map
-from .map3_carom import create_carom_map
\ No newline at end of file
+# Bảng map: map_type -> khai báo dữ liệu (kích thước bàn, lỗ, bi, bộ luật).
+# levels.compile_level() dựng mỗi map một lần rồi giữ lại trong cache.
+from .map1_pool import POOL_MAP, create_pool_map
+from .map2_snooker import SNOOKER_MAP, create_snooker_map
+from .map3_carom import CAROM_MAP, create_carom_map
+
+MAPS = {
+    1: POOL_MAP,
+    2: SNOOKER_MAP,
+    3: CAROM_MAP,
+}
@@ -0,0 +1,84 @@
+import random
+
+# kích thước gốc của bàn pool (đơn vị pixel, giống Table mặc định)
+POOL_WIDTH = 1000
+POOL_HEIGHT = 550
+POOL_BALL_RADIUS = 18
+
+# Standard pool ball colors: 1-7 solid, 8 black, 9-15 stripe
+POOL_COLORS = {
+    1: (255, 255, 0),    # Yellow
+    2: (0, 0, 255),      # Blue
+    3: (255, 0, 0),      # Red
+    4: (128, 0, 128),    # Purple
+    5: (255, 165, 0),    # Orange
+    6: (0, 255, 0),      # Green
+    7: (128, 0, 0),      # Maroon
+    8: (0, 0, 0),        # Black
+    9: (255, 255, 0),    # Yellow stripe
+    10: (0, 0, 255),     # Blue stripe
+    11: (255, 0, 0),     # Red stripe
+    12: (128, 0, 128),   # Purple stripe
+    13: (255, 165, 0),   # Orange stripe
+    14: (0, 255, 0),     # Green stripe
+    15: (128, 0, 0),     # Maroon stripe
+}
+
+
+def pool_rack():
+    """
+    Cue ball + rack tam giác 15 bi. Bi dùng (x,y) là offset pixel tính từ góc
+    trên-trái của bàn: rack xếp khít theo BALL_RADIUS nên không làm tròn về
+    tọa độ tương đối.
+    """
+    balls = []
+    # Cue ball position (near left quarter center)
+    balls.append({'x': int(POOL_WIDTH * 0.25), 'y': POOL_HEIGHT // 2,
+                  'number': 0, 'color': (255, 255, 255), 'is_cue': True})
+    # Rack triangle (15 balls)
+    rows = 5
+    start_x = int(POOL_WIDTH * 0.70)
+    start_y = POOL_HEIGHT // 2
+    offset = POOL_BALL_RADIUS * 2 + 0.5
+    number = 1
+    for r in range(rows):
+        row_len = r + 1
+        x = start_x + r * (POOL_BALL_RADIUS * 2 * 0.87)
+        y = start_y - (row_len-1) * offset / 2
+        for c in range(row_len):
+            col_y = y + c * offset
+            # Use proper color, fallback to random if needed
+            color = POOL_COLORS.get(number, (random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
+            balls.append({'x': x, 'y': col_y,
+                          'number': number, 'color': color, 'is_cue': False})
+            number += 1
+    return balls
+
+
+def pool_points(number):
+    return 10 + (number or 0)
+
+
+# Khai báo map 1 (xem maps.MAPS / levels.compile_level)
+POOL_MAP = {
+    'name': "Pool 8-Ball",
+    'rules': 'pool',
+    'width': POOL_WIDTH,
+    'height': POOL_HEIGHT,
+    # 4 corners for simplicity
+    'pockets': [
+        (0.0, 0.0),
+        (1.0, 0.0),
+        (0.0, 1.0),
+        (1.0, 1.0)
+    ],
+    'balls': pool_rack(),
+    'scoring': pool_points,
+}
+
+
+def create_pool_map():
+    """Trả về cấu hình cho bàn Pool 8-ball (map 1), cùng định dạng với create_snooker_map()."""
+    cfg = dict(POOL_MAP)
+    cfg['mode'] = 'pool'
+    return cfg
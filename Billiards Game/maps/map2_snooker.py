@@ -1,31 +1,11 @@
-def create_snooker_map():
-    """
-    Trả về cấu hình cho bàn Snooker.
-    - width,height: kích thước bàn (game sẽ đặt Table.x/y dựa trên kích thước màn)
-    - pockets: list các vị trí tương đối (rx,ry) trong [0..1] theo table width/height
-    - balls: danh sách quả bi với tọa độ tương đối (rx,ry), number, color, is_cue
-    - scoring: function(ball_number) -> points
-    """
-    cfg = {}
-    cfg['width'] = 760
-    cfg['height'] = 460
-    # pockets: 6 lỗ (4 góc + 2 giữa cạnh trên/dưới)
-    cfg['pockets'] = [
-        (0.0, 0.0),   # top-left
-        (1.0, 0.0),   # top-right
-        (0.0, 1.0),   # bottom-left
-        (1.0, 1.0),   # bottom-right
-        (0.5, 0.0),   # top-middle
-        (0.5, 1.0)    # bottom-middle
-    ]
+def snooker_rack():
+    """Cue ball, 15 bi đỏ xếp tam giác ở cuối bàn và 6 bi màu; tọa độ tương đối (rx,ry)."""
     balls = []
     # cue ball
     balls.append({'rx': 0.20, 'ry': 0.50, 'number': 0, 'color': (255,255,255), 'is_cue': True})
     # 15 red balls (number 1) in triangle near far end
     base_x = 0.72
     base_y = 0.50
-    offset = 2 * 15 / 100.0  # scaled minor offset
-    num = 1
     # triangle packing approx
     rows = 5
     for r in range(rows):
@@ -33,7 +13,6 @@ def create_snooker_map():
             rx = base_x + r * 0.025
             ry = base_y + (c - r/2) * (0.035)
             balls.append({'rx': rx, 'ry': ry, 'number': 1, 'color': (180, 20, 20), 'is_cue': False})
-            num += 1
     # 6 colors: yellow, green, brown, blue, pink, black with points 2..7
     color_defs = [
         (2, (255, 235, 59), 0.35, 0.18),  # yellow
@@ -45,16 +24,44 @@ def create_snooker_map():
     ]
     for num, col, rx, ry in color_defs:
         balls.append({'rx': rx, 'ry': ry, 'number': num, 'color': col, 'is_cue': False})
+    return balls
+
 
-    cfg['balls'] = balls
+def snooker_points(number):
+    # snooker: red=1, yellow=2,...black=7, cue=0 -> no points
+    if number == 0:
+        return 0
+    # reds were placed with number==1 already
+    return int(number)  # treat ball.number as snooker points
 
-    def scoring(number):
-        # snooker: red=1, yellow=2,...black=7, cue=0 -> no points
-        if number == 0:
-            return 0
-        # reds were placed with number==1 already
-        return int(number)  # treat ball.number as snooker points
 
-    cfg['scoring'] = scoring
+# Khai báo map 2:
+# - width,height: kích thước bàn (vị trí bàn trên màn do levels.layout_table đặt)
+# - pockets: list các vị trí tương đối (rx,ry) trong [0..1] theo table width/height
+# - balls: danh sách quả bi với tọa độ tương đối (rx,ry), number, color, is_cue
+# - rules: bộ luật (rules.GameRules) - 'pool' | 'snooker' | 'carom'
+# - scoring: function(ball_number) -> points
+SNOOKER_MAP = {
+    'name': "Snooker",
+    'rules': 'snooker',
+    'width': 760,
+    'height': 460,
+    # pockets: 6 lỗ (4 góc + 2 giữa cạnh trên/dưới)
+    'pockets': [
+        (0.0, 0.0),   # top-left
+        (1.0, 0.0),   # top-right
+        (0.0, 1.0),   # bottom-left
+        (1.0, 1.0),   # bottom-right
+        (0.5, 0.0),   # top-middle
+        (0.5, 1.0)    # bottom-middle
+    ],
+    'balls': snooker_rack(),
+    'scoring': snooker_points,
+}
+
+
+def create_snooker_map():
+    """Trả về cấu hình cho bàn Snooker (bản sao của SNOOKER_MAP, kèm 'mode')."""
+    cfg = dict(SNOOKER_MAP)
     cfg['mode'] = 'snooker'
-    return cfg
\ No newline at end of file
+    return cfg
@@ -0,0 +1,105 @@
+"""
+Bàn "stress": N bi nhỏ (mặc định 1000) trên một bàn pool 6 lỗ, để thử physics
+và phần vẽ ở quy mô lớn. Không tính điểm (bộ luật 'sandbox').
+
+- layout='random': mỗi bi một ô của lưới đều, lệch ngẫu nhiên trong ô nên
+  không bi nào chồng nhau.
+- layout='packed': xếp lục giác khít từ cuối bàn lại, chừa chỗ cho bi cái.
+
+Bán kính được thu nhỏ theo N để mọi bi vừa bàn (không lớn hơn bi thường).
+
+Với 1000 bi (đo bằng driver dummy, ngân sách 16.7 ms/frame ở 60 fps): layout
+'random' giữ được 60 fps (trung vị ~10 ms/frame, 1-8% frame vượt ngân sách);
+layout 'packed' có trung vị ~9-10 ms nhưng vài giây đầu sau cú phá, khi gần như
+mọi bi đang chạm nhau, p95 ~24 ms và 12-15% frame bị trễ.
+Map này không nằm trong MAPS mặc định; Game đăng ký nó khi chạy với --stress:
+
+    levels.register_map(STRESS_MAP_TYPE, create_stress_map(2000, 'packed'))
+"""
+import math
+import random
+
+from .map1_pool import POOL_COLORS
+
+STRESS_MAP_TYPE = 4
+STRESS_WIDTH = 1000
+STRESS_HEIGHT = 550
+STRESS_BALLS = 1000
+STRESS_LAYOUTS = ('random', 'packed')
+MAX_RADIUS = 18
+MIN_RADIUS = 2
+
+
+def _ball(x, y, k, radius):
+    number = (k - 1) % 15 + 1
+    return {'x': x, 'y': y, 'number': number, 'color': POOL_COLORS[number],
+            'is_cue': False, 'radius': radius}
+
+
+def random_layout(count, width, height, rng):
+    """count positions, one per cell of a jittered grid; returns (positions, radius)."""
+    cols = max(1, math.ceil(math.sqrt(count * width / height)))
+    rows = max(1, math.ceil(count / cols))
+    cell_w, cell_h = width / cols, height / rows
+    radius = max(MIN_RADIUS, min(MAX_RADIUS, int(min(cell_w, cell_h) / 2.5)))
+    cells = rng.sample(range(cols * rows), count)
+    positions = []
+    for cell in cells:
+        row, col = divmod(cell, cols)
+        slack_x = max(0.0, cell_w / 2 - radius)
+        slack_y = max(0.0, cell_h / 2 - radius)
+        positions.append(((col + 0.5) * cell_w + rng.uniform(-slack_x, slack_x),
+                          (row + 0.5) * cell_h + rng.uniform(-slack_y, slack_y)))
+    return positions, radius
+
+
+def packed_layout(count, width, height, keep_clear):
+    """
+    count positions in hexagonal rows filling the table from the far end,
+    leaving x < keep_clear free; returns (positions, radius).
+    """
+    radius = MAX_RADIUS
+    while True:
+        gap = 0.5
+        dx = 2 * radius + gap
+        dy = dx * math.sqrt(3) / 2
+        positions = []
+        x = width - radius - 1
+        column = 0
+        while x - radius >= keep_clear and len(positions) < count:
+            y = radius + 1 + (dx / 2 if column % 2 else 0.0)
+            while y + radius < height and len(positions) < count:
+                positions.append((x, y))
+                y += dx
+            x -= dy
+            column += 1
+        if len(positions) >= count or radius <= MIN_RADIUS:
+            return positions, radius
+        radius -= 1
+
+
+def create_stress_map(count=STRESS_BALLS, layout='random', seed=1):
+    """Declaration (see maps.MAPS) of a table with `count` object balls plus the cue ball."""
+    if layout not in STRESS_LAYOUTS:
+        raise ValueError(f"unknown stress layout: {layout!r}")
+    width, height = STRESS_WIDTH, STRESS_HEIGHT
+    cue = (int(width * 0.25), height // 2)
+    if layout == 'packed':
+        positions, radius = packed_layout(count, width, height, keep_clear=cue[0] + 4 * MAX_RADIUS)
+    else:
+        # a few spare cells: the ones next to the cue ball are dropped
+        positions, radius = random_layout(count + 8, width, height, random.Random(seed))
+        positions = [(x, y) for x, y in positions
+                     if math.hypot(x - cue[0], y - cue[1]) > 2 * radius + 1][:count]
+    balls = [{'x': cue[0], 'y': cue[1], 'number': 0, 'color': (255, 255, 255),
+              'is_cue': True, 'radius': radius}]
+    balls += [_ball(x, y, k + 1, radius) for k, (x, y) in enumerate(positions)]
+    return {
+        'name': f"Stress ({len(balls) - 1} balls)",
+        'rules': 'sandbox',
+        'width': width,
+        'height': height,
+        'pockets': [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (1.0, 1.0), (0.5, 0.0), (0.5, 1.0)],
+        'balls': balls,
+        'scoring': lambda number: 0,
+    }
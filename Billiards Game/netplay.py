@@ -0,0 +1,661 @@
+"""
+Chơi hai người qua mạng (TCP, loopback hoặc LAN) với physics tất định.
+
+Người đánh chỉ gửi vận tốc bi cái (SHOT); cả hai bên tự chạy cùng cú đánh với
+cùng physics (so physics.fingerprint(), backend và số substep lúc bắt tay) nên
+bình thường kết quả giống hệt nhau. Host là bên có thẩm quyền và gửi thêm hai loại sửa lỗi:
+
+- CORRECTION, mỗi CORRECTION_INTERVAL bước của cú đánh: trạng thái đã lượng
+  tử hóa (vị trí 1/POSITION_SCALE px, vận tốc 1/VELOCITY_SCALE px/frame) của
+  những bi thay đổi so với lần gửi trước, dưới dạng hiệu số varint zigzag.
+  Guest so với trạng thái của chính nó ở cùng bước và chỉ sửa những bi lệch.
+- FINAL, khi bi đã dừng: vị trí (float64, chính xác) của các bi đã di chuyển
+  trong cú đánh và điểm của hai người. Guest nhận đúng trạng thái đó, nên cú
+  tiếp theo của hai bên bắt đầu từ cùng một bàn.
+
+Một cú đánh tốn khoảng 1-4 KB. Host đánh trước, sau đó hai bên luân phiên.
+
+Gói tin (little-endian): u32 độ dài nội dung, u8 loại, nội dung. Socket
+non-blocking: poll() mỗi frame không bao giờ chặn vòng lặp game. Gói tin hỏng
+hoặc không khớp bàn (chỉ số bi ngoài phạm vi, thiếu byte) được coi là lệch
+trạng thái: kết nối bị đóng kèm lý do thay vì ném exception vào vòng lặp game.
+Giao thức không xác thực nên host mặc định chỉ nghe trên 127.0.0.1; muốn chơi
+qua LAN phải truyền địa chỉ nghe một cách tường minh.
+
+    python "game bi-a.py" --host [map] [port] [địa chỉ nghe, vd. 0.0.0.0]
+    python "game bi-a.py" --join 127.0.0.1[:port]
+    python -m netplay --shots 20 --map 2          # tự kiểm tra qua loopback
+"""
+import argparse
+import math
+import random
+import socket
+import struct
+import sys
+from collections import deque
+
+from levels import CAROM_MODES, MAP_NAMES, load_level
+from physics import fingerprint, snapshot
+from rules import GameRules, shot_velocity
+
+DEFAULT_PORT = 8766
+CORRECTION_INTERVAL = 30  # physics steps of a shot between two corrections from the host
+POSITION_SCALE = 16.0  # quantum of a corrected position: 1/16 px
+VELOCITY_SCALE = 256.0  # quantum of a corrected velocity: 1/256 px per frame
+
+HEADER = struct.Struct('<IB')  # payload size, kind
+HELLO = struct.Struct('<8sBBBB')  # physics fingerprint, map, carom mode, backend, substeps
+SHOT = struct.Struct('<I2d')  # shot number, cue velocity
+CORRECTION = struct.Struct('<II')  # shot number, step; then varint-coded balls
+FINAL = struct.Struct('<IIii')  # shot number, steps, host score, guest score; then balls
+POINT = struct.Struct('<2d')
+
+HELLO_KIND, SHOT_KIND, CORRECTION_KIND, FINAL_KIND = range(1, 5)
+BACKENDS = ('python', 'numpy')  # HELLO sends the index
+# FINAL ball flags, in the low bits of the varint key (index << 2)
+POCKETED = 1
+MOVING = 2
+
+
+def write_varint(out, n):
+    """Append unsigned n to bytearray out, 7 bits per byte."""
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(buf, offset):
+    """(n, new offset)."""
+    n = shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, offset
+        shift += 7
+
+
+def zigzag(n):
+    # small negative numbers become small unsigned ones: 0, -1, 1, -2 -> 0, 1, 2, 3
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+
+def quantize(ball):
+    """(x, y, vx, vy) of a ball in correction quanta; None once it is pocketed."""
+    if ball.in_pocket:
+        return None
+    return (round(ball.x * POSITION_SCALE), round(ball.y * POSITION_SCALE),
+            round(ball.vx * VELOCITY_SCALE), round(ball.vy * VELOCITY_SCALE))
+
+
+def encode_correction(shot, step, balls, baseline):
+    """
+    CORRECTION payload with the balls whose quantized state differs from
+    `baseline` (updated in place); None when none does.
+    """
+    body = bytearray()
+    count = 0
+    for i, ball in enumerate(balls):
+        q = quantize(ball)
+        old = baseline[i]
+        if q == old:
+            continue
+        count += 1
+        baseline[i] = q
+        if q is None:
+            write_varint(body, i * 2 + 1)
+            continue
+        write_varint(body, i * 2)
+        for value, base in zip(q, old or (0, 0, 0, 0)):
+            write_varint(body, zigzag(value - base))
+    if not count:
+        return None
+    out = bytearray(CORRECTION.pack(shot, step))
+    write_varint(out, count)
+    return bytes(out + body)
+
+
+def decode_correction(payload, baseline):
+    """
+    Apply a CORRECTION to `baseline` in place; returns (shot, step).
+    ValueError (baseline untouched) if the payload is cut short or names a
+    ball `baseline` does not have.
+    """
+    table = list(baseline)
+    try:
+        shot, step = CORRECTION.unpack_from(payload)
+        count, offset = read_varint(payload, CORRECTION.size)
+        for _ in range(count):
+            key, offset = read_varint(payload, offset)
+            i = _ball_index(key >> 1, len(table))
+            if key & 1:
+                table[i] = None
+                continue
+            values = []
+            for base in table[i] or (0, 0, 0, 0):
+                delta, offset = read_varint(payload, offset)
+                values.append(base + unzigzag(delta))
+            table[i] = tuple(values)
+    except (IndexError, struct.error) as exc:
+        raise ValueError(f"truncated CORRECTION ({exc})") from None
+    baseline[:] = table
+    return shot, step
+
+
+def encode_final(shot, steps, host_score, guest_score, balls, before):
+    """FINAL payload: exact state of every ball not where it was at the start of the shot (`before`)."""
+    body = bytearray()
+    count = 0
+    for i, ball in enumerate(balls):
+        moving = ball.vx != 0.0 or ball.vy != 0.0
+        if (ball.x, ball.y, ball.in_pocket) == before[i] and not moving:
+            continue
+        count += 1
+        write_varint(body, i << 2 | (POCKETED if ball.in_pocket else 0) | (MOVING if moving else 0))
+        body += POINT.pack(ball.x, ball.y)
+        if moving:
+            body += POINT.pack(ball.vx, ball.vy)
+    out = bytearray(FINAL.pack(shot, steps, host_score, guest_score))
+    write_varint(out, count)
+    return bytes(out + body)
+
+
+def decode_final(payload, ball_count):
+    """
+    (shot, steps, host score, guest score, [(index, in_pocket, x, y, vx, vy)]);
+    ValueError if the payload is cut short or does not fit a table of
+    `ball_count` balls.
+    """
+    try:
+        shot, steps, host_score, guest_score = FINAL.unpack_from(payload)
+        count, offset = read_varint(payload, FINAL.size)
+        balls = []
+        for _ in range(count):
+            key, offset = read_varint(payload, offset)
+            x, y = POINT.unpack_from(payload, offset)
+            offset += POINT.size
+            vx = vy = 0.0
+            if key & MOVING:
+                vx, vy = POINT.unpack_from(payload, offset)
+                offset += POINT.size
+            if not all(math.isfinite(v) for v in (x, y, vx, vy)):
+                raise ValueError(f"FINAL: non-finite state for ball {key >> 2}")
+            balls.append((_ball_index(key >> 2, ball_count), bool(key & POCKETED), x, y, vx, vy))
+    except (IndexError, struct.error) as exc:
+        raise ValueError(f"truncated FINAL ({exc})") from None
+    return shot, steps, host_score, guest_score, balls
+
+
+def _ball_index(i, count):
+    if i >= count:
+        raise ValueError(f"ball {i} on a table of {count}")
+    return i
+
+
+class NetPeer:
+    """Framed messages over one non-blocking TCP connection; nothing here ever blocks after connect()."""
+
+    def __init__(self, sock=None, listener=None):
+        self.sock = None
+        self.listener = listener
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.sent = 0  # bytes on the wire, both directions
+        self.received = 0
+        self.closed = None  # why the connection is gone
+        if sock is not None:
+            self._adopt(sock)
+
+    @classmethod
+    def listen(cls, port=DEFAULT_PORT, host='127.0.0.1'):
+        """Wait for one connection; pass host='' or '0.0.0.0' to accept players from other machines."""
+        listener = socket.create_server((host, port))
+        listener.setblocking(False)
+        return cls(listener=listener)
+
+    @classmethod
+    def connect(cls, host, port=DEFAULT_PORT, timeout=5.0):
+        return cls(socket.create_connection((host, port), timeout))
+
+    @property
+    def port(self):
+        sock = self.listener or self.sock
+        return sock.getsockname()[1]
+
+    def _adopt(self, sock):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+
+    def send(self, kind, payload=b''):
+        self.outbox += HEADER.pack(len(payload), kind)
+        self.outbox += payload
+        self.flush()
+
+    def flush(self):
+        if self.sock is None or self.closed or not self.outbox:
+            return
+        try:
+            n = self.sock.send(self.outbox)
+        except BlockingIOError:
+            return
+        except OSError as exc:
+            self.close(str(exc))
+            return
+        self.sent += n
+        del self.outbox[:n]
+
+    def poll(self):
+        """Accept, send and receive whatever is ready; returns the complete messages as [(kind, payload)]."""
+        if self.sock is None and self.listener is not None:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                return []
+            self.listener.close()
+            self.listener = None
+            self._adopt(sock)
+        if self.sock is None or self.closed:
+            return []
+        self.flush()
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError as exc:
+                self.close(str(exc))
+                break
+            if not data:
+                self.close("the other player left")
+                break
+            self.received += len(data)
+            self.inbox += data
+        messages = []
+        offset = 0
+        while len(self.inbox) - offset >= HEADER.size:
+            size, kind = HEADER.unpack_from(self.inbox, offset)
+            start = offset + HEADER.size
+            if len(self.inbox) - start < size:
+                break
+            messages.append((kind, bytes(self.inbox[start:start + size])))
+            offset = start + size
+        del self.inbox[:offset]
+        return messages
+
+    def close(self, reason="connection closed"):
+        if self.closed is None:
+            self.closed = reason
+        for sock in (self.sock, self.listener):
+            if sock is not None:
+                sock.close()
+        self.listener = None
+
+
+class NetMatch:
+    """
+    One side of a two-player game. The owner (Game, or the self-test) drives it:
+    poll() once per frame and handle the events it returns, local_shot() when
+    the local player shoots, after_step() after every physics step of a shot
+    and settled(my_score, their_score) once the shot's balls have stopped.
+
+    Events: ('start', map_type, carom_mode) when both sides are connected,
+    ('shot', vx, vy) for a shot of the other player, ('final', my_score,
+    their_score) once a shot is over on both sides (the table may have been
+    corrected), ('closed', reason). A message that does not fit this side's
+    table ends the match with ('closed', reason) as well.
+    """
+
+    def __init__(self, peer, role, map_type=1, carom_mode='libre', backend='python', substeps=1):
+        self.peer = peer
+        self.role = role  # 'host' (authoritative, shoots first) or 'guest'
+        self.map_type = map_type
+        self.carom_mode = carom_mode
+        # both sides must step the same way: checked in the handshake
+        self.backend = backend
+        self.substeps = substeps
+        self.sim = None
+        self.started = False
+        self.said_hello = False
+        self.reported_close = False
+        self.shot = 0  # number of the rolling (or next) shot
+        self.rolling = False
+        self.awaiting_final = False  # guest: our balls stopped, the host's FINAL is not in yet
+        self.step = 0  # physics steps of the rolling shot
+        self.baseline = []  # host's last corrected table, quantized (both sides keep it)
+        self.before = []  # (x, y, in_pocket) per ball when the shot started
+        self.host_states = {}  # guest: host's quantized table for steps we have not reached
+        self.own_states = {}  # guest: our quantized table at correction steps
+        self.final = None  # guest: decoded FINAL waiting for our balls to stop
+        self.backlog = deque()  # received messages of a later shot
+        self.shot_bytes = []  # bytes on the wire per finished shot
+        self.wire_at_shot = 0
+        self.corrected = 0  # balls the guest had to correct mid-shot
+        self.repaired = 0  # balls FINAL had to move on the guest
+
+    @classmethod
+    def host(cls, port=DEFAULT_PORT, map_type=1, carom_mode='libre', backend='python', substeps=1,
+             bind='127.0.0.1'):
+        """Wait for a guest; only on this machine unless `bind` says otherwise (no authentication)."""
+        return cls(NetPeer.listen(port, bind), 'host', map_type, carom_mode, backend, substeps)
+
+    @classmethod
+    def join(cls, address, backend='python', substeps=1):
+        host, _, port = address.partition(':')
+        return cls(NetPeer.connect(host or '127.0.0.1', int(port or DEFAULT_PORT)), 'guest',
+                   backend=backend, substeps=substeps)
+
+    @staticmethod
+    def shooter(shot):
+        return 'host' if shot % 2 == 0 else 'guest'
+
+    @property
+    def my_turn(self):
+        return (self.started and not self.rolling and not self.awaiting_final
+                and self.shooter(self.shot) == self.role)
+
+    @property
+    def wire_bytes(self):
+        return self.peer.sent + self.peer.received
+
+    def begin(self, sim):
+        """Play on `sim` from here (a new rack: the same layout on both sides)."""
+        self.sim = sim
+        self.baseline = [quantize(b) for b in sim.balls]
+        self.rolling = False
+        self.awaiting_final = False
+        self.final = None
+
+    def poll(self):
+        events = []
+        messages = self.peer.poll()
+        if self.role == 'host' and not self.said_hello and self.peer.sock is not None:
+            self.said_hello = True
+            self._hello(self.map_type, CAROM_MODES.index(self.carom_mode))
+        self.backlog.extend(messages)
+        while self.backlog and not self.peer.closed:
+            kind, payload = self.backlog[0]
+            try:
+                if kind in (SHOT_KIND, CORRECTION_KIND, FINAL_KIND) and \
+                        struct.unpack_from('<I', payload)[0] != self.shot:
+                    break  # belongs to the next shot: ours is not over yet
+                if kind == SHOT_KIND and (self.rolling or self.awaiting_final):
+                    break
+                self.backlog.popleft()
+                events += self._receive(kind, payload)
+            except (ValueError, struct.error) as exc:
+                # the tables can no longer be trusted to agree
+                self.peer.close(f"bad message from the other player ({exc})")
+        if self.peer.closed and not self.reported_close:
+            self.reported_close = True
+            events.append(('closed', self.peer.closed))
+        return events
+
+    def _hello(self, map_type, carom):
+        self.peer.send(HELLO_KIND, HELLO.pack(fingerprint(), map_type, carom,
+                                              BACKENDS.index(self.backend), self.substeps))
+
+    def _receive(self, kind, payload):
+        if kind == HELLO_KIND:
+            digest, map_type, carom, backend, substeps = HELLO.unpack(payload)
+            if digest != fingerprint():
+                self.peer.close("the other player runs different physics constants")
+                return []
+            if backend >= len(BACKENDS) or (BACKENDS[backend], substeps) != (self.backend, self.substeps):
+                self.peer.close(f"the other player steps physics differently "
+                                f"(backend #{backend}, {substeps} substep(s))")
+                return []
+            if map_type not in MAP_NAMES or carom >= len(CAROM_MODES):
+                raise ValueError(f"HELLO: unknown map {map_type} or carom mode {carom}")
+            if self.role == 'guest':
+                self.map_type, self.carom_mode = map_type, CAROM_MODES[carom]
+                self._hello(map_type, carom)
+            self.started = True
+            return [('start', self.map_type, self.carom_mode)]
+        if not self.started:
+            raise ValueError("game message before the handshake")
+        if kind == SHOT_KIND:
+            _, vx, vy = SHOT.unpack(payload)
+            if not (math.isfinite(vx) and math.isfinite(vy)):
+                raise ValueError("SHOT: non-finite cue velocity")
+            self._begin_shot()
+            return [('shot', vx, vy)]
+        if kind == CORRECTION_KIND and self.role == 'guest':
+            self._correction(payload)
+        elif kind == FINAL_KIND and self.role == 'guest':
+            self.final = decode_final(payload, len(self.sim.balls))
+            if self.awaiting_final:
+                return self._apply_final()
+        return []
+
+    def local_shot(self, vx, vy):
+        """Tell the other side about our shot; the caller applies it to its own table."""
+        self.peer.send(SHOT_KIND, SHOT.pack(self.shot, vx, vy))
+        self._begin_shot()
+
+    def _begin_shot(self):
+        self.rolling = True
+        self.step = 0
+        self.before = [(b.x, b.y, b.in_pocket) for b in self.sim.balls]
+        self.host_states.clear()
+        self.own_states.clear()
+
+    def after_step(self):
+        """After every physics step of the rolling shot."""
+        self.step += 1
+        step = self.step
+        if self.role == 'host':
+            if step % CORRECTION_INTERVAL == 0:
+                payload = encode_correction(self.shot, step, self.sim.balls, self.baseline)
+                if payload is not None:
+                    self.peer.send(CORRECTION_KIND, payload)
+            return
+        host = self.host_states.pop(step, None)
+        if host is not None:
+            self._fix(host)
+        elif step % CORRECTION_INTERVAL == 0:
+            self.own_states[step] = [quantize(b) for b in self.sim.balls]
+
+    def _correction(self, payload):
+        _, step = decode_correction(payload, self.baseline)
+        own = self.own_states.pop(step, None)
+        if own is None:
+            # we are not there yet
+            self.host_states[step] = list(self.baseline)
+        elif own != self.baseline and step == self.step:
+            self._fix(self.baseline)
+        # a correction for a step already behind us is left to FINAL
+
+    def _fix(self, host):
+        """Put the balls whose quantized state differs from the host's where the host has them."""
+        balls = self.sim.balls
+        wrong = [i for i, ball in enumerate(balls) if quantize(ball) != host[i]]
+        for i in wrong:
+            ball, q = balls[i], host[i]
+            ball.in_pocket = q is None
+            if q is not None:
+                ball.x, ball.y = q[0] / POSITION_SCALE, q[1] / POSITION_SCALE
+                ball.vx, ball.vy = q[2] / VELOCITY_SCALE, q[3] / VELOCITY_SCALE
+        if wrong:
+            self.corrected += len(wrong)
+            self.sim.wake_all()
+
+    def settled(self, my_score, their_score):
+        """The rolling shot's balls have stopped (and its scoring is done); returns events."""
+        self.rolling = False
+        if self.role == 'host':
+            self.peer.send(FINAL_KIND, encode_final(self.shot, self.step, my_score, their_score,
+                                                    self.sim.balls, self.before))
+            self.baseline = [quantize(b) for b in self.sim.balls]
+            self._next_shot()
+            return [('final', my_score, their_score)]
+        if self.final is None:
+            self.awaiting_final = True
+            return []
+        return self._apply_final()
+
+    def _apply_final(self):
+        _, steps, host_score, guest_score, moved = self.final
+        balls = self.sim.balls
+        exact = {i: (in_pocket, x, y, vx, vy) for i, in_pocket, x, y, vx, vy in moved}
+        for i, ball in enumerate(balls):
+            state = exact.get(i)
+            if state is None:
+                x, y, in_pocket = self.before[i]
+                state = (in_pocket, x, y, 0.0, 0.0)
+            if (ball.in_pocket, ball.x, ball.y, ball.vx, ball.vy) != state:
+                self.repaired += 1
+                ball.in_pocket, ball.x, ball.y, ball.vx, ball.vy = state
+        self.sim.wake_all()
+        self.baseline = [quantize(b) for b in balls]
+        self.final = None
+        self.awaiting_final = False
+        self._next_shot()
+        return [('final', guest_score, host_score)]
+
+    def _next_shot(self):
+        self.shot += 1
+        self.shot_bytes.append(self.wire_bytes - self.wire_at_shot)
+        self.wire_at_shot = self.wire_bytes
+
+    def close(self):
+        self.peer.close("closed")
+
+
+class TwoPlayerRules(GameRules):
+    """GameRules keeping the other player's points apart (like Game against the computer)."""
+
+    def __init__(self, map_type=1):
+        super().__init__(map_type)
+        self.turn = 'player'
+        self.remote_score = 0
+
+    def add_points(self, points):
+        if self.turn == 'remote':
+            self.remote_score += points
+        else:
+            super().add_points(points)
+
+
+class LoopbackPlayer:
+    """One side of the self-test: a NetMatch with its own simulation and rules, playing random shots."""
+
+    def __init__(self, match, shots, rng, backend='python'):
+        self.match = match
+        self.shots_left = shots
+        self.rng = rng
+        self.backend = backend
+        self.sim = None
+        self.rules = None
+        self.finals = []  # (table snapshot, my score, their score) after every shot
+        if match.role == 'host':
+            self.rack()
+
+    def rack(self):
+        """New rack on the match's map; the scores carry over."""
+        self.sim, cfg = load_level(self.match.map_type, self.match.carom_mode, backend=self.backend)
+        if self.rules is None:
+            self.rules = TwoPlayerRules(self.match.map_type)
+        self.rules.sim = self.sim
+        self.rules.reset_rules(cfg)
+        self.match.begin(self.sim)
+
+    def update(self, steps, drift=0.0):
+        for event in self.match.poll():
+            self.handle(event)
+        if self.match.my_turn and self.shots_left > 0:
+            self.shots_left -= 1
+            angle, power = self.rng.uniform(0.0, 360.0), self.rng.uniform(0.3, 1.0)
+            vx, vy = shot_velocity(angle, power)
+            self.match.local_shot(vx, vy)
+            self.rules.turn = 'player'
+            self.rules.begin_shot()
+            self.sim.shoot(vx, vy)
+        if self.match.rolling:
+            for _ in range(steps):
+                for event in self.sim.step():
+                    self.rules.handle_physics_event(event)
+                if drift and self.match.step == 10:
+                    # pretend this side's floating point went its own way
+                    self.sim.cue_ball.x += drift
+                self.match.after_step()
+                if not self.sim.is_moving():
+                    self.rules.finish_shot()
+                    for event in self.match.settled(self.rules.score, self.rules.remote_score):
+                        self.handle(event)
+                    break
+
+    def handle(self, event):
+        kind = event[0]
+        if kind == 'start' and self.sim is None:
+            self.rack()
+        elif kind == 'shot':
+            self.rules.turn = 'remote'
+            self.rules.begin_shot()
+            self.sim.shoot(event[1], event[2])
+        elif kind == 'final':
+            self.rules.score, self.rules.remote_score = event[1], event[2]
+            self.finals.append((snapshot(self.sim), event[1], event[2]))
+            if self.rules.level_complete:
+                self.rack()
+        elif kind == 'closed':
+            raise ConnectionError(event[1])
+
+
+def run_loopback(shots, map_type=1, carom_mode='libre', seed=None, backend='python',
+                 host_steps=7, guest_steps=3, drift=0.0):
+    """
+    Self-test: a host and a guest in this process over a loopback socket,
+    stepping at different speeds, play `shots` shots each. Returns
+    (host, guest) LoopbackPlayers.
+    """
+    rng = random.Random(seed)
+    host = LoopbackPlayer(NetMatch.host(0, map_type, carom_mode, backend), shots,
+                          random.Random(rng.random()), backend)
+    guest = LoopbackPlayer(NetMatch.join(f'127.0.0.1:{host.match.peer.port}', backend), shots,
+                           random.Random(rng.random()), backend)
+    try:
+        while len(host.finals) < 2 * shots or len(guest.finals) < 2 * shots:
+            host.update(host_steps)
+            guest.update(guest_steps, drift)
+    finally:
+        host.match.close()
+        guest.match.close()
+    return host, guest
+
+
+def tables_agree(host, guest):
+    """True if after every shot both LoopbackPlayers had the same table and the same scores (seen from each side)."""
+    return len(host.finals) == len(guest.finals) and \
+        all(h[0] == g[0] and h[1:] == g[:0:-1] for h, g in zip(host.finals, guest.finals))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m netplay', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shots', type=int, default=10, help='shots per player')
+    parser.add_argument('--map', type=int, default=1, choices=sorted(MAP_NAMES))
+    parser.add_argument('--carom-mode', default='libre', choices=CAROM_MODES)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    parser.add_argument('--drift', type=float, default=0.0,
+                        help='nudge the guest cue ball this many px into every shot, to exercise corrections')
+    args = parser.parse_args(argv)
+
+    host, guest = run_loopback(args.shots, args.map, args.carom_mode, args.seed, args.backend, drift=args.drift)
+    same = tables_agree(host, guest)
+    sizes = host.match.shot_bytes
+    print(f"{len(sizes)} shots on {MAP_NAMES[args.map]}: {sum(sizes) / len(sizes):.0f} bytes/shot on average, "
+          f"{max(sizes)} at most; guest corrected {guest.match.corrected} ball(s) mid-shot, "
+          f"{guest.match.repaired} at rest; tables identical after every shot: {'yes' if same else 'NO'}",
+          file=sys.stderr)
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
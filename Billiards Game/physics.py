@@ -0,0 +1,652 @@
+"""
+Headless billiards physics.
+
+Module này không import pygame: toàn bộ trạng thái bi là float thuần nên có thể
+chạy mô phỏng trong test, batch job hoặc process worker mà không cần cửa sổ
+hay SDL video. Game chỉ đọc trạng thái ở đây để vẽ.
+"""
+import bisect
+import hashlib
+import heapq
+import math
+import struct
+
+from broadphase import PairCounter, PocketGrid, SpatialHash
+
+# Physics constants
+BALL_RADIUS = 18
+POCKET_RADIUS = 35
+FRICTION = 0.995        # ma sát tuyến tính (gần thực tế)
+MIN_SPEED = 0.05
+INITIAL_SPEED = 40      # giới hạn tốc độ tối đa của cú đánh
+WALL_BOUNCE_DAMP = 0.9  # mất năng lượng khi bật thành
+BALL_RESTITUTION = 0.98 # độ đàn hồi va chạm giữa 2 bi
+BALL_MASS = 1.0
+REST_SPEED = 0.01       # dưới ngưỡng này bi được coi là đã dừng (kết thúc cú đánh)
+BROADPHASE_MIN_BALLS = 32  # từ số bi này trở lên dùng SpatialHash thay cho thử mọi cặp
+COAST_MAX_BALLS = 16     # coast_to_rest() chỉ thử khi số bi đang lăn không quá mức này
+COAST_CHECK_FRAMES = 16  # run_until_rest() / game thử coast_to_rest() mỗi chừng này frame
+COAST_MARGIN = 2 * MIN_SPEED  # khoảng trống (px) quanh đường lăn, rộng hơn một frame lăn cuối
+
+# Event kinds returned by Simulation.step() / Simulation.collide()
+#   (CUSHION, ball_index, side)       side in 'left' | 'right' | 'top' | 'bottom'
+#   (CONTACT, index_a, index_b)       index_a < index_b
+#   (POCKET, ball_index, pocket_index)
+CUSHION = 'cushion'
+CONTACT = 'contact'
+POCKET = 'pocket'
+
+_LN_FRICTION = math.log(FRICTION)
+# squared-distance pre-filter of the broad phase: keeps every pair the exact
+# sqrt test in _resolve_pair could find overlapping, rounding included
+_REACH_MARGIN = 1.0 + 1e-9
+
+
+# Closed-form free rolling. update(dt) multiplies the velocity by FRICTION**dt
+# each call, so after k calls the velocity is v0 * FRICTION**(k*dt) and the
+# displacement a geometric series, v0 * travel(k*dt, dt). Evaluating it
+# directly advances a ball by any time in O(1); it matches stepping up to
+# float rounding (not bit for bit), and ignores cushions and other balls.
+# Simulation.coast_to_rest() uses the resting point to see that nothing is
+# left in a ball's way, then integrates it there exactly.
+
+def travel(t, dt=1.0):
+    """
+    Displacement factor after t frames of update(dt) calls: the ball has
+    moved v0 * travel(t, dt). Between multiples of dt it is the smooth curve
+    through those points.
+    """
+    if dt == 1.0:
+        return -math.expm1(t * _LN_FRICTION) / (1.0 - FRICTION)
+    return dt * math.expm1(t * _LN_FRICTION) / math.expm1(dt * _LN_FRICTION)
+
+
+def stop_frames(speed, dt=1.0):
+    """Frames (a multiple of dt) after which update(dt) has snapped a ball at `speed` to rest."""
+    if speed == 0.0:
+        return 0.0
+    if speed < MIN_SPEED:
+        return dt
+    # first call k with speed * FRICTION**(k*dt) < MIN_SPEED
+    return (math.floor(math.log(MIN_SPEED / speed) / (dt * _LN_FRICTION)) + 1) * dt
+
+
+def free_roll(x, y, vx, vy, t, dt=1.0):
+    """(x, y, vx, vy) of a ball t frames later, rolling with nothing in the way."""
+    stop = stop_frames(math.sqrt(vx * vx + vy * vy), dt)
+    if t >= stop:
+        g = travel(stop, dt)
+        return x + vx * g, y + vy * g, 0.0, 0.0
+    g = travel(t, dt)
+    decay = math.exp(t * _LN_FRICTION)
+    return x + vx * g, y + vy * g, vx * decay, vy * decay
+
+
+def point_segment_distance(px, py, x0, y0, x1, y1):
+    """Distance from point (px, py) to the segment (x0, y0)-(x1, y1)."""
+    dx = x1 - x0
+    dy = y1 - y0
+    length2 = dx * dx + dy * dy
+    t = 0.0
+    if length2 > 0.0:
+        t = max(0.0, min(1.0, ((px - x0) * dx + (py - y0) * dy) / length2))
+    return math.hypot(px - (x0 + t * dx), py - (y0 + t * dy))
+
+
+def segment_distance(a, b):
+    """Smallest distance between segments a and b, each (x0, y0, x1, y1)."""
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+
+    def side(px, py, qx, qy, rx, ry):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+    if side(ax0, ay0, ax1, ay1, bx0, by0) * side(ax0, ay0, ax1, ay1, bx1, by1) < 0.0 and \
+            side(bx0, by0, bx1, by1, ax0, ay0) * side(bx0, by0, bx1, by1, ax1, ay1) < 0.0:
+        return 0.0  # they cross
+    return min(point_segment_distance(bx0, by0, *a), point_segment_distance(bx1, by1, *a),
+               point_segment_distance(ax0, ay0, *b), point_segment_distance(ax1, ay1, *b))
+
+
+def paths_clear(table, paths, balls, margin=COAST_MARGIN):
+    """
+    True if no ball can meet anything while rolling to rest: every path in
+    `paths` (ball index -> (x0, y0, x1, y1), the straight free_roll() path
+    of a moving ball) stays `margin` away from the cushions, the pockets
+    and the other balls. `balls` lists (x, y, radius) per ball index, None
+    for pocketed balls; balls without a path stand still. Paths of two
+    moving balls must not come close at all, whenever each gets there.
+    """
+    left = table.x
+    right = table.x + table.width
+    top = table.y
+    bottom = table.y + table.height
+    pockets = table.pockets
+    pocket_reach = POCKET_RADIUS + margin
+    for i, path in paths.items():
+        x0, y0, x1, y1 = path
+        r = balls[i][2]
+        lo_x, hi_x = min(x0, x1), max(x0, x1)
+        lo_y, hi_y = min(y0, y1), max(y0, y1)
+        if lo_x - r - margin < left or hi_x + r + margin > right or \
+                lo_y - r - margin < top or hi_y + r + margin > bottom:
+            return False
+        for px, py in pockets:
+            if point_segment_distance(px, py, x0, y0, x1, y1) < pocket_reach:
+                return False
+        for j, other in enumerate(balls):
+            if other is None or j == i:
+                continue
+            ox, oy, radius = other
+            reach = r + radius + margin
+            other_path = paths.get(j)
+            if other_path is not None:
+                if i < j and segment_distance(path, other_path) < reach:
+                    return False
+            elif lo_x - reach < ox < hi_x + reach and lo_y - reach < oy < hi_y + reach and \
+                    point_segment_distance(ox, oy, x0, y0, x1, y1) < reach:
+                return False
+    return True
+
+
+class BallState:
+    """Position/velocity of one ball in table (screen) coordinates."""
+    __slots__ = ('x', 'y', 'vx', 'vy', 'number', 'color', 'is_cue',
+                 'in_pocket', 'radius', 'mass')
+
+    def __init__(self, x, y, number=0, color=(255, 255, 255), is_cue=False,
+                 radius=BALL_RADIUS, mass=BALL_MASS):
+        self.x = float(x)
+        self.y = float(y)
+        self.vx = 0.0
+        self.vy = 0.0
+        self.number = number
+        self.color = color
+        self.is_cue = is_cue
+        self.in_pocket = False
+        self.radius = radius
+        self.mass = mass
+
+    def speed(self):
+        return math.sqrt(self.vx * self.vx + self.vy * self.vy)
+
+    def update(self, dt=1.0):
+        # dt in frames; < 1 when the simulation runs substeps
+        if self.in_pocket:
+            return
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        # apply simple rolling friction
+        friction = FRICTION if dt == 1.0 else FRICTION ** dt
+        self.vx *= friction
+        self.vy *= friction
+        if self.speed() < MIN_SPEED:
+            self.vx = 0.0
+            self.vy = 0.0
+
+    def advance(self, t, dt=1.0):
+        """Jump t frames ahead as if update(dt) ran t / dt times with nothing in the way."""
+        if not self.in_pocket:
+            self.x, self.y, self.vx, self.vy = free_roll(self.x, self.y, self.vx, self.vy, t, dt)
+
+    def frames_to_rest(self, dt=1.0):
+        """Frames until update(dt) stops this ball, if nothing is in the way."""
+        return 0.0 if self.in_pocket else stop_frames(self.speed(), dt)
+
+
+class TableGeometry:
+    """Playing surface rectangle plus absolute pocket centres."""
+
+    def __init__(self, x, y, width, height, pockets=()):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.pockets = list(pockets)
+
+    def cue_spot(self):
+        # where the cue ball respawns after a scratch
+        return (self.x + int(self.width * 0.25), self.y + self.height // 2)
+
+
+class Simulation:
+    """
+    Fixed-step simulation of the balls on one table.
+
+    step() advances exactly one frame of the original game loop (integrate,
+    cushions, ball-ball, pockets) and returns the events that happened in
+    that frame, in order. Nothing here knows about scoring: callers turn
+    events into points.
+
+    Sleeping balls: a ball that ended a whole step at rest without touching
+    a cushion, another ball or a pocket is marked asleep and skipped by
+    integrate, the cushion and pocket tests and the pair tests against other
+    sleeping balls; nothing can change it until a moving ball reaches it,
+    so the results are exactly those of testing everything. A contact wakes
+    it; so does a velocity set from outside (shoot(), Ball.vel). After
+    moving balls by hand call wake_all().
+    """
+
+    def __init__(self, table, balls=None, broadphase='auto', substeps=1):
+        self.table = table
+        self.balls = list(balls) if balls else []
+        self.frame = 0
+        # each step() is one frame split into `substeps` integrate+collide passes
+        self.substeps = substeps
+        # 'auto': grid broad phase once there are BROADPHASE_MIN_BALLS balls,
+        # True/False to force it on/off
+        self.broadphase = broadphase
+        self.pair_stats = PairCounter()
+        self.pocket_grid = None  # built from table.pockets on first use
+        self.wake_all()
+
+    def add_ball(self, x, y, number=0, color=(255, 255, 255), is_cue=False, **kwargs):
+        ball = BallState(x, y, number, color, is_cue=is_cue, **kwargs)
+        self.balls.append(ball)
+        self.asleep.append(False)
+        self.awake.append(len(self.balls) - 1)
+        self.grid = None
+        return ball
+
+    def wake(self, i):
+        if self.asleep[i]:
+            self.asleep[i] = False
+            bisect.insort(self.awake, i)
+
+    def wake_all(self):
+        """Wake every ball on the table (after changing positions from outside)."""
+        self.asleep = [False] * len(self.balls)
+        # indices of the balls being simulated, ascending
+        self.awake = [i for i, b in enumerate(self.balls) if not b.in_pocket]
+        self.touched = set()
+        # persistent broad phase grid, kept up to date by moving awake balls
+        self.grid = None
+
+    @property
+    def cue_ball(self):
+        return next((b for b in self.balls if b.is_cue), None)
+
+    def shoot(self, vx, vy):
+        cue = self.cue_ball
+        if cue is not None:
+            cue.vx = float(vx)
+            cue.vy = float(vy)
+
+    def is_moving(self):
+        self._wake_moved()
+        balls = self.balls
+        return any((not balls[i].in_pocket) and balls[i].speed() > REST_SPEED for i in self.awake)
+
+    def integrate(self, dt=1.0):
+        balls = self.balls
+        for i in self.awake:
+            balls[i].update(dt)
+
+    def collide(self):
+        events = []
+        if not self.awake:
+            return events
+        self._collide_walls(events)
+        self._collide_balls(events)
+        self._collide_pockets(events)
+        return events
+
+    def step(self):
+        self._wake_moved()
+        if not self.awake:
+            # everything asleep: nothing can happen this frame
+            self.frame += 1
+            return []
+        self.touched.clear()
+        if self.substeps == 1:
+            self.integrate()
+            events = self.collide()
+        else:
+            events = []
+            dt = 1.0 / self.substeps
+            for _ in range(self.substeps):
+                self.integrate(dt)
+                events.extend(self.collide())
+        self._settle()
+        self.frame += 1
+        return events
+
+    def _wake_moved(self):
+        if len(self.asleep) != len(self.balls):
+            # balls added or removed behind our back
+            self.wake_all()
+            return
+        balls = self.balls
+        asleep = self.asleep
+        for i in [i for i, b in enumerate(balls) if (b.vx or b.vy) and asleep[i]]:
+            self.wake(i)
+
+    def _settle(self):
+        # A ball at rest that touched nothing during the whole step has
+        # passed every test at the position it stays at: put it to sleep.
+        # Pocketed balls leave the awake list for good.
+        balls = self.balls
+        touched = self.touched
+        awake = []
+        for i in self.awake:
+            ball = balls[i]
+            if ball.in_pocket:
+                continue
+            if ball.vx == 0.0 and ball.vy == 0.0 and i not in touched:
+                self.asleep[i] = True
+            else:
+                awake.append(i)
+        self.awake = awake
+
+    def _touch(self, i, j):
+        self.touched.add(i)
+        self.touched.add(j)
+        if self.asleep[i]:
+            self.wake(i)
+        if self.asleep[j]:
+            self.wake(j)
+
+    def positions(self):
+        """Snapshot of (x, y) per ball, e.g. for render interpolation."""
+        return [(b.x, b.y) for b in self.balls]
+
+    def frames_to_rest(self):
+        """
+        Whole frames (step() calls) until every ball has stopped, predicted in
+        closed form from the current velocities. Cushions and collisions are
+        not foreseen (they usually end a shot sooner), so it is exact only
+        while the moving balls roll freely.
+        """
+        self._wake_moved()
+        dt = 1.0 / self.substeps
+        balls = self.balls
+        return math.ceil(max((balls[i].frames_to_rest(dt) for i in self.awake), default=0.0) - 1e-9)
+
+    def coast_to_rest(self, max_frames=20000):
+        """
+        Finish the shot without collision tests once nothing is left to hit:
+        if the closed-form (free_roll) path of every awake ball to its resting
+        point stays clear of the cushions, pockets and other balls, the balls
+        are integrated to rest exactly as step() would, so positions, frame
+        count and events (none) are those of stepping. Returns the frames run
+        (at most max_frames), 0 when something is in the way or more than
+        COAST_MAX_BALLS balls are awake.
+        """
+        self._wake_moved()
+        if not self.awake or len(self.awake) > COAST_MAX_BALLS:
+            return 0
+        dt = 1.0 / self.substeps
+        balls = self.balls
+        paths = {}
+        for i in self.awake:
+            ball = balls[i]
+            if ball.in_pocket:
+                continue
+            x, y, _, _ = free_roll(ball.x, ball.y, ball.vx, ball.vy, ball.frames_to_rest(dt), dt)
+            paths[i] = (ball.x, ball.y, x, y)
+        # sleeping balls passed every test where they are; awake ones at rest
+        # are checked as zero-length paths
+        if not paths_clear(self.table, paths,
+                           [None if b.in_pocket else (b.x, b.y, b.radius) for b in balls]):
+            return 0
+        frames = 0
+        while frames < max_frames and self.is_moving():
+            self.touched.clear()
+            for _ in range(self.substeps):
+                self.integrate(dt)
+            self._settle()
+            self.frame += 1
+            frames += 1
+        # the awake balls moved without the broad phase grid: rebuild it
+        self.grid = None
+        return frames
+
+    def run_until_rest(self, max_frames=20000, on_event=None, mode='step', on_step=None):
+        """
+        Step until every ball has stopped. Returns the number of frames run.
+        mode='event' uses event_solver instead: exact time-of-impact, no
+        tunneling, cost per event rather than per frame (returns float frames).
+        on_step(sim) is called after every step (step mode only); without it
+        the tail of the shot is skipped through coast_to_rest() when possible.
+        """
+        if mode == 'event':
+            import event_solver
+            return event_solver.run_until_rest(self, on_event)
+        frames = 0
+        while frames < max_frames:
+            events = self.step()
+            frames += 1
+            if on_event is not None:
+                for event in events:
+                    on_event(event)
+            if on_step is not None:
+                on_step(self)
+            if not self.is_moving():
+                break
+            if on_step is None and frames % COAST_CHECK_FRAMES == 0:
+                coasted = self.coast_to_rest(max_frames - frames)
+                if coasted:
+                    frames += coasted
+                    break
+        return frames
+
+    def _collide_walls(self, events):
+        t = self.table
+        left = t.x
+        right = t.x + t.width
+        top = t.y
+        bottom = t.y + t.height
+        balls = self.balls
+        count = len(events)
+        for i in self.awake:
+            ball = balls[i]
+            if ball.in_pocket:
+                continue
+            r = ball.radius
+            if ball.x - r < left:
+                ball.x = left + r
+                ball.vx = -ball.vx * WALL_BOUNCE_DAMP
+                events.append((CUSHION, i, 'left'))
+            if ball.x + r > right:
+                ball.x = right - r
+                ball.vx = -ball.vx * WALL_BOUNCE_DAMP
+                events.append((CUSHION, i, 'right'))
+            if ball.y - r < top:
+                ball.y = top + r
+                ball.vy = -ball.vy * WALL_BOUNCE_DAMP
+                events.append((CUSHION, i, 'top'))
+            if ball.y + r > bottom:
+                ball.y = bottom - r
+                ball.vy = -ball.vy * WALL_BOUNCE_DAMP
+                events.append((CUSHION, i, 'bottom'))
+        self.touched.update(event[1] for event in events[count:])
+
+    def uses_broadphase(self):
+        if self.broadphase == 'auto':
+            return len(self.balls) >= BROADPHASE_MIN_BALLS
+        return bool(self.broadphase)
+
+    def _collide_balls(self, events):
+        if self.uses_broadphase():
+            self._collide_balls_grid(events)
+            return
+        balls = self.balls
+        asleep = self.asleep
+        n = len(balls)
+        active = 0
+        tested = 0
+        for i in range(n):
+            a = balls[i]
+            if a.in_pocket:
+                continue
+            active += 1
+            for j in range(i + 1, n):
+                b = balls[j]
+                # two sleeping balls cannot have come to overlap
+                if b.in_pocket or (asleep[i] and asleep[j]):
+                    continue
+                tested += 1
+                if self._resolve_pair(i, j, a, b, events):
+                    self._touch(i, j)
+        self.pair_stats.add(active, tested)
+
+    def _collide_balls_grid(self, events):
+        balls = self.balls
+        grid = self.grid
+        if grid is None:
+            grid = self.grid = SpatialHash(2 * max(b.radius for b in balls))
+            grid.build(balls)
+        else:
+            # sleeping balls have not moved since they were last indexed
+            for i in self.awake:
+                ball = balls[i]
+                if not ball.in_pocket:
+                    grid.move(i, ball.x, ball.y)
+        # Resolve candidate pairs in the same (i, j) order as the all-pairs
+        # loop. Pushing a pair apart moves two balls, which can create an
+        # overlap with a pair later in that order, so both are re-queried.
+        # Only pairs with an awake ball are candidates; a sleeping ball that
+        # gets pushed is re-queried like any other. Neighbours clearly out of
+        # reach are dropped up front: they cannot touch unless one of them is
+        # pushed first, and a pushed ball is re-queried anyway.
+        queue = set()
+        tested = 0
+        for i in self.awake:
+            a = balls[i]
+            if a.in_pocket:
+                continue
+            ax, ay, ar = a.x, a.y, a.radius
+            for k in grid.neighbors(i):
+                b = balls[k]
+                dx = b.x - ax
+                dy = b.y - ay
+                reach = ar + b.radius
+                tested += 1
+                if dx * dx + dy * dy < reach * reach * _REACH_MARGIN:
+                    queue.add((i, k) if i < k else (k, i))
+        queue = list(queue)
+        heapq.heapify(queue)
+        seen = set(queue)
+        while queue:
+            i, j = heapq.heappop(queue)
+            tested += 1
+            a = balls[i]
+            b = balls[j]
+            if not self._resolve_pair(i, j, a, b, events):
+                continue
+            self._touch(i, j)
+            for moved, ball in ((i, a), (j, b)):
+                grid.move(moved, ball.x, ball.y)
+                for k in grid.neighbors(moved):
+                    pair = (moved, k) if moved < k else (k, moved)
+                    if pair > (i, j) and pair not in seen:
+                        seen.add(pair)
+                        heapq.heappush(queue, pair)
+        self.pair_stats.add(len(grid.cell_of), tested)
+
+    def _resolve_pair(self, i, j, a, b, events):
+        dx = b.x - a.x
+        dy = b.y - a.y
+        dist = math.sqrt(dx * dx + dy * dy)
+        min_dist = a.radius + b.radius
+        if dist >= min_dist:
+            return False
+        events.append((CONTACT, i, j))
+        if dist == 0:
+            # perfectly stacked balls: push apart along x
+            nx, ny = 1.0, 0.0
+        else:
+            nx, ny = dx / dist, dy / dist
+        # separate overlapping balls
+        half = (min_dist - dist) * 0.5
+        a.x -= nx * half
+        a.y -= ny * half
+        b.x += nx * half
+        b.y += ny * half
+
+        # relative velocity
+        vel_along_normal = (b.vx - a.vx) * nx + (b.vy - a.vy) * ny
+        if vel_along_normal > 0:
+            return True
+        # impulse scalar
+        jn = -(1 + BALL_RESTITUTION) * vel_along_normal
+        jn /= (1 / a.mass + 1 / b.mass)
+        a.vx -= nx * jn / a.mass
+        a.vy -= ny * jn / a.mass
+        b.vx += nx * jn / b.mass
+        b.vy += ny * jn / b.mass
+        return True
+
+    def pocket_zones(self):
+        """PocketGrid of the table, rebuilt only when the pockets change."""
+        pockets = self.table.pockets
+        grid = self.pocket_grid
+        if grid is None or len(grid.pockets) != len(pockets) or \
+                any(p != tuple(q) for p, q in zip(grid.pockets, pockets)):
+            grid = self.pocket_grid = PocketGrid(pockets, POCKET_RADIUS)
+        return grid
+
+    def _collide_pockets(self, events):
+        pockets = self.table.pockets
+        if not pockets:
+            return
+        near = self.pocket_zones().near
+        balls = self.balls
+        for i in self.awake:
+            ball = balls[i]
+            if ball.in_pocket:
+                continue
+            # only balls in a cell next to a pocket need the exact test
+            for p in near(ball.x, ball.y):
+                px, py = pockets[p]
+                if math.hypot(ball.x - px, ball.y - py) < POCKET_RADIUS:
+                    self._capture(i, ball, p, px, py, events)
+                    break
+
+    def _capture(self, i, ball, p, px, py, events):
+        ball.vx = 0.0
+        ball.vy = 0.0
+        self.touched.add(i)
+        if ball.is_cue:
+            # scratch: respawn cue ball instead of leaving it in the pocket
+            ball.x, ball.y = (float(c) for c in self.table.cue_spot())
+        else:
+            ball.in_pocket = True
+            ball.x = float(px)
+            ball.y = float(py)
+            if self.grid is not None:
+                self.grid.remove(i)
+        events.append((POCKET, i, p))
+
+
+def snapshot(sim):
+    """
+    Picklable copy of a simulation's table and balls (either backend), e.g.
+    to hand the current position to a worker process.
+    """
+    t = sim.table
+    table = (t.x, t.y, t.width, t.height, tuple(tuple(p) for p in t.pockets))
+    balls = tuple((b.x, b.y, b.vx, b.vy, b.number, b.color, b.is_cue, b.in_pocket, b.radius, b.mass)
+                  for b in sim.balls)
+    return table, balls
+
+
+def fingerprint():
+    """
+    8-byte digest of the constants that decide how a shot plays out; stored in
+    replays so a file recorded with different physics is detected.
+    """
+    constants = (BALL_RADIUS, POCKET_RADIUS, FRICTION, MIN_SPEED, INITIAL_SPEED, WALL_BOUNCE_DAMP,
+                 BALL_RESTITUTION, BALL_MASS, REST_SPEED, BROADPHASE_MIN_BALLS)
+    return hashlib.blake2b(struct.pack(f'<{len(constants)}d', *constants), digest_size=8).digest()
+
+
+def from_snapshot(snap, cls=Simulation, **kwargs):
+    """Rebuild a simulation (physics.Simulation by default) from snapshot()."""
+    (x, y, width, height, pockets), rows = snap
+    balls = []
+    for bx, by, vx, vy, number, color, is_cue, in_pocket, radius, mass in rows:
+        ball = BallState(bx, by, number, color, is_cue, radius, mass)
+        ball.vx, ball.vy, ball.in_pocket = vx, vy, in_pocket
+        balls.append(ball)
+    return cls(TableGeometry(x, y, width, height, pockets), balls, **kwargs)
@@ -0,0 +1,423 @@
+"""
+NumPy backend cho physics.Simulation (structure-of-arrays).
+
+Vị trí, vận tốc, bán kính, khối lượng và cờ in_pocket của mọi bi nằm trong các
+mảng liền nhau; ma sát, bật thành, dò va chạm bi-bi và rơi lỗ đều là phép toán
+trên cả mảng nên chi phí Python mỗi frame không tăng theo số bi. Chỉ các cặp
+bi thật sự chồng nhau mới được xử lý từng cặp (thường chỉ vài cặp mỗi frame).
+
+ArraySimulation có cùng interface với physics.Simulation (balls, step,
+collide, is_moving, run_until_rest, ...); phần tử của `balls` là view trên
+các mảng nên game vẫn vẽ được qua Ball.from_state().
+"""
+import heapq
+import math
+
+import numpy as np
+
+from broadphase import PairCounter, PocketGrid, SpatialHash, sweep_and_prune
+from physics import (FRICTION, MIN_SPEED, WALL_BOUNCE_DAMP, BALL_RESTITUTION,
+                     POCKET_RADIUS, REST_SPEED, CUSHION, CONTACT, POCKET, COAST_MAX_BALLS,
+                     COAST_CHECK_FRAMES, BallState, free_roll, paths_clear, stop_frames)
+
+_SIDES = ('left', 'right', 'top', 'bottom')
+
+
+def _column(array_name, col):
+    # property reading/writing sim.<array_name>[index, col]
+    def fget(self):
+        return float(getattr(self.sim, array_name)[self.index, col])
+
+    def fset(self, value):
+        getattr(self.sim, array_name)[self.index, col] = value
+    return property(fget, fset)
+
+
+class ArrayBall:
+    """View of one row of an ArraySimulation, same attributes as BallState."""
+    __slots__ = ('sim', 'index')
+
+    def __init__(self, sim, index):
+        self.sim = sim
+        self.index = index
+
+    x = _column('pos', 0)
+    y = _column('pos', 1)
+    vx = _column('vel', 0)
+    vy = _column('vel', 1)
+
+    @property
+    def in_pocket(self):
+        return bool(self.sim.in_pocket[self.index])
+
+    @in_pocket.setter
+    def in_pocket(self, value):
+        self.sim.in_pocket[self.index] = value
+
+    @property
+    def radius(self):
+        return float(self.sim.radius[self.index])
+
+    @property
+    def mass(self):
+        return float(self.sim.mass[self.index])
+
+    @property
+    def number(self):
+        return self.sim.numbers[self.index]
+
+    @property
+    def color(self):
+        return self.sim.colors[self.index]
+
+    @property
+    def is_cue(self):
+        return self.sim.is_cue[self.index]
+
+    def speed(self):
+        return float(np.hypot(*self.sim.vel[self.index]))
+
+    def update(self, dt=1.0):
+        self.sim.integrate_ball(self.index, dt)
+
+    def advance(self, t, dt=1.0):
+        if not self.in_pocket:
+            x, y, vx, vy = free_roll(self.x, self.y, self.vx, self.vy, t, dt)
+            self.sim.pos[self.index] = (x, y)
+            self.sim.vel[self.index] = (vx, vy)
+
+    def frames_to_rest(self, dt=1.0):
+        return 0.0 if self.in_pocket else stop_frames(self.speed(), dt)
+
+
+class ArraySimulation:
+    """Drop-in replacement for physics.Simulation backed by NumPy arrays."""
+
+    def __init__(self, table, balls=None, substeps=1):
+        self.table = table
+        self.frame = 0
+        self.substeps = substeps
+        self.pair_stats = PairCounter()
+        # the whole table sleeps once a step ends with nothing moving and no
+        # event; stepping is then free until a velocity is set (see step)
+        self.resting = False
+        self.pocket_grid = None
+        self._pocket_arrays = None
+        self._load(list(balls) if balls else [])
+
+    def _load(self, states):
+        n = len(states)
+        self.pos = np.array([(b.x, b.y) for b in states], dtype=np.float64).reshape(n, 2)
+        self.vel = np.array([(b.vx, b.vy) for b in states], dtype=np.float64).reshape(n, 2)
+        self.radius = np.array([b.radius for b in states], dtype=np.float64)
+        self.mass = np.array([b.mass for b in states], dtype=np.float64)
+        self.in_pocket = np.array([b.in_pocket for b in states], dtype=bool)
+        self.numbers = [b.number for b in states]
+        self.colors = [b.color for b in states]
+        self.is_cue = [b.is_cue for b in states]
+        self.balls = [ArrayBall(self, i) for i in range(n)]
+        self.resting = False
+
+    def wake(self, i):
+        self.resting = False
+
+    def wake_all(self):
+        """Call after changing positions from outside."""
+        self.resting = False
+
+    def add_ball(self, x, y, number=0, color=(255, 255, 255), is_cue=False, **kwargs):
+        states = [_Snapshot(b) for b in self.balls]
+        states.append(BallState(x, y, number, color, is_cue=is_cue, **kwargs))
+        self._load(states)
+        return self.balls[-1]
+
+    @property
+    def cue_ball(self):
+        return next((b for b in self.balls if b.is_cue), None)
+
+    def shoot(self, vx, vy):
+        cue = self.cue_ball
+        if cue is not None:
+            self.vel[cue.index] = (vx, vy)
+
+    def is_moving(self):
+        speed2 = np.einsum('ij,ij->i', self.vel, self.vel)
+        return bool(np.any((speed2 > REST_SPEED * REST_SPEED) & ~self.in_pocket))
+
+    def integrate_ball(self, i, dt=1.0):
+        if self.in_pocket[i]:
+            return
+        self.pos[i] += self.vel[i] * dt
+        self.vel[i] *= FRICTION if dt == 1.0 else FRICTION ** dt
+        if np.hypot(*self.vel[i]) < MIN_SPEED:
+            self.vel[i] = 0.0
+
+    def integrate(self, dt=1.0):
+        # balls in a pocket always have zero velocity, so no mask is needed
+        if dt == 1.0:
+            self.pos += self.vel
+            self.vel *= FRICTION
+        else:
+            self.pos += self.vel * dt
+            self.vel *= FRICTION ** dt
+        slow = np.einsum('ij,ij->i', self.vel, self.vel) < MIN_SPEED * MIN_SPEED
+        self.vel[slow] = 0.0
+
+    def collide(self):
+        events = []
+        self._collide_walls(events)
+        self._collide_balls(events)
+        self._collide_pockets(events)
+        return events
+
+    def step(self):
+        if self.resting and not self.vel.any():
+            self.frame += 1
+            return []
+        if self.substeps == 1:
+            self.integrate()
+            events = self.collide()
+        else:
+            events = []
+            dt = 1.0 / self.substeps
+            for _ in range(self.substeps):
+                self.integrate(dt)
+                events.extend(self.collide())
+        self.resting = not events and not self.vel.any()
+        self.frame += 1
+        return events
+
+    def positions(self):
+        return [tuple(p) for p in self.pos.tolist()]
+
+    def frames_to_rest(self):
+        """Closed-form prediction of the frames until every ball stops (see physics.Simulation)."""
+        speed2 = np.einsum('ij,ij->i', self.vel, self.vel)[~self.in_pocket]
+        fastest = math.sqrt(float(speed2.max())) if len(speed2) else 0.0
+        # the fastest ball is the last to stop
+        return math.ceil(stop_frames(fastest, 1.0 / self.substeps) - 1e-9)
+
+    def coast_to_rest(self, max_frames=20000):
+        """
+        Finish the shot with integrate() alone once nothing is left to hit
+        (see physics.Simulation.coast_to_rest); same results as stepping.
+        """
+        active = ~self.in_pocket
+        moving = np.flatnonzero(self.vel.any(axis=1) & active)
+        if not len(moving) or len(moving) > COAST_MAX_BALLS:
+            return 0
+        # no sleeping here: the balls at rest must pass collide()'s own tests
+        t = self.table
+        x = self.pos[:, 0]
+        y = self.pos[:, 1]
+        r = self.radius
+        if np.any(active & ((x - r < t.x) | (x + r > t.x + t.width) |
+                            (y - r < t.y) | (y + r > t.y + t.height))):
+            return 0
+        on_table = np.flatnonzero(active)
+        if len(sweep_and_prune(self.pos, self.radius, on_table)[0]):
+            return 0
+        if t.pockets:
+            d = self.pos[on_table, None, :] - np.asarray(t.pockets, dtype=np.float64)[None, :, :]
+            if np.any(np.einsum('ijk,ijk->ij', d, d) < POCKET_RADIUS * POCKET_RADIUS):
+                return 0
+        dt = 1.0 / self.substeps
+        paths = {}
+        for i in moving.tolist():
+            bx, by = self.pos[i].tolist()
+            vx, vy = self.vel[i].tolist()
+            ex, ey, _, _ = free_roll(bx, by, vx, vy, stop_frames(math.hypot(vx, vy), dt), dt)
+            paths[i] = (bx, by, ex, ey)
+        balls = [(bx, by, br) if on else None for (bx, by), br, on in
+                 zip(self.pos.tolist(), self.radius.tolist(), active.tolist())]
+        if not paths_clear(t, paths, balls):
+            return 0
+        frames = 0
+        while frames < max_frames and self.is_moving():
+            for _ in range(self.substeps):
+                self.integrate(dt)
+            self.frame += 1
+            frames += 1
+        self.resting = not self.vel.any()
+        return frames
+
+    def run_until_rest(self, max_frames=20000, on_event=None, mode='step', on_step=None):
+        """
+        Step until every ball has stopped. Returns the number of frames run.
+        mode='event' uses event_solver instead: exact time-of-impact, no
+        tunneling, cost per event rather than per frame (returns float frames).
+        on_step(sim) is called after every step (step mode only); without it
+        the tail of the shot is skipped through coast_to_rest() when possible.
+        """
+        if mode == 'event':
+            import event_solver
+            return event_solver.run_until_rest(self, on_event)
+        frames = 0
+        while frames < max_frames:
+            events = self.step()
+            frames += 1
+            if on_event is not None:
+                for event in events:
+                    on_event(event)
+            if on_step is not None:
+                on_step(self)
+            if not self.is_moving():
+                break
+            if on_step is None and frames % COAST_CHECK_FRAMES == 0:
+                coasted = self.coast_to_rest(max_frames - frames)
+                if coasted:
+                    frames += coasted
+                    break
+        return frames
+
+    def _collide_walls(self, events):
+        t = self.table
+        active = ~self.in_pocket
+        x = self.pos[:, 0]
+        y = self.pos[:, 1]
+        r = self.radius
+        hits = []
+        for side, col, mask, limit in (
+                (0, 0, (x - r < t.x) & active, t.x + r),
+                (1, 0, (x + r > t.x + t.width) & active, t.x + t.width - r),
+                (2, 1, (y - r < t.y) & active, t.y + r),
+                (3, 1, (y + r > t.y + t.height) & active, t.y + t.height - r)):
+            if not mask.any():
+                continue
+            self.pos[mask, col] = limit[mask]
+            self.vel[mask, col] *= -WALL_BOUNCE_DAMP
+            hits.extend((int(i), side) for i in np.flatnonzero(mask))
+        # same order as the scalar backend: by ball, then left/right/top/bottom
+        for i, side in sorted(hits):
+            events.append((CUSHION, i, _SIDES[side]))
+
+    def overlapping_pairs(self):
+        """Index arrays (I, J), I < J, of active pairs whose circles overlap."""
+        active = np.flatnonzero(~self.in_pocket)
+        I, J, tested = sweep_and_prune(self.pos, self.radius, active)
+        self.pair_stats.add(len(active), tested)
+        return I, J
+
+    def _collide_balls(self, events):
+        I, J = self.overlapping_pairs()
+        if len(I):
+            self._resolve_pairs(I, J, events)
+
+    def _resolve_pairs(self, I, J, events):
+        # Pairs are resolved in (i, j) order exactly like the scalar backend:
+        # pushing a pair apart can create a new overlap with a pair that comes
+        # later in that order, so the two moved balls are re-queried and any
+        # such pair is queued as well. The work is per contact, so it runs on
+        # Python floats, and the re-query only looks at the 3x3 cells around
+        # a moved ball (SpatialHash) instead of the whole table.
+        x = self.pos[:, 0].tolist()
+        y = self.pos[:, 1].tolist()
+        vx = self.vel[:, 0].tolist()
+        vy = self.vel[:, 1].tolist()
+        radius = self.radius.tolist()
+        mass = self.mass.tolist()
+        queue = list(zip(I.tolist(), J.tolist()))
+        heapq.heapify(queue)
+        seen = set(queue)
+        touched = set()
+        grid = None
+        while queue:
+            i, j = heapq.heappop(queue)
+            if not _resolve_pair(i, j, x, y, vx, vy, radius, mass, events):
+                continue
+            touched.update((i, j))
+            if grid is None:
+                # built on the first contact, from the positions as they are now
+                active = np.flatnonzero(~self.in_pocket)
+                grid = SpatialHash(2.0 * float(self.radius[active].max()))
+                for k in active.tolist():
+                    grid.insert(k, x[k], y[k])
+            for moved in (i, j):
+                grid.move(moved, x[moved], y[moved])
+                for k in grid.neighbors(moved):
+                    pair = (moved, k) if moved < k else (k, moved)
+                    if pair > (i, j) and pair not in seen:
+                        seen.add(pair)
+                        heapq.heappush(queue, pair)
+        if touched:
+            rows = sorted(touched)
+            self.pos[rows] = [(x[k], y[k]) for k in rows]
+            self.vel[rows] = [(vx[k], vy[k]) for k in rows]
+
+    def pocket_zones(self):
+        """PocketGrid of the table, rebuilt only when the pockets change."""
+        pockets = self.table.pockets
+        grid = self.pocket_grid
+        if grid is None or len(grid.pockets) != len(pockets) or \
+                any(p != tuple(q) for p, q in zip(grid.pockets, pockets)):
+            grid = self.pocket_grid = PocketGrid(pockets, POCKET_RADIUS)
+        return grid
+
+    def _collide_pockets(self, events):
+        pockets = self.table.pockets
+        if not pockets:
+            return
+        grid = self.pocket_zones()
+        if self._pocket_arrays is None or self._pocket_arrays[0] is not grid:
+            self._pocket_arrays = (grid, np.asarray(grid.pockets, dtype=np.float64).reshape(-1, 2),
+                                   grid.cell_size) + grid.mask()
+        _, pk, cell, x0, y0, mask = self._pocket_arrays
+        # exact test only for balls in a cell next to a pocket
+        cx = np.floor(self.pos[:, 0] / cell).astype(np.intp) - x0
+        cy = np.floor(self.pos[:, 1] / cell).astype(np.intp) - y0
+        near = (cx >= 0) & (cx < mask.shape[0]) & (cy >= 0) & (cy < mask.shape[1]) & ~self.in_pocket
+        near = np.flatnonzero(near)
+        near = near[mask[cx[near], cy[near]]]
+        if not len(near):
+            return
+        d = self.pos[near, None, :] - pk[None, :, :]
+        inside = (np.einsum('ijk,ijk->ij', d, d) < POCKET_RADIUS * POCKET_RADIUS)
+        hit = inside.any(axis=1)
+        first_pocket = inside.argmax(axis=1)
+        for i, p in zip(near[hit].tolist(), first_pocket[hit].tolist()):
+            self.vel[i] = 0.0
+            if self.is_cue[i]:
+                # scratch: respawn cue ball instead of leaving it in the pocket
+                self.pos[i] = self.table.cue_spot()
+            else:
+                self.in_pocket[i] = True
+                self.pos[i] = pk[p]
+            events.append((POCKET, i, p))
+
+
+def _resolve_pair(i, j, x, y, vx, vy, radius, mass, events):
+    # physics.Simulation._resolve_pair on plain lists (same operations, same results)
+    dx = x[j] - x[i]
+    dy = y[j] - y[i]
+    dist = math.sqrt(dx * dx + dy * dy)
+    min_dist = radius[i] + radius[j]
+    if dist >= min_dist:
+        return False
+    events.append((CONTACT, i, j))
+    if dist == 0:
+        nx, ny = 1.0, 0.0
+    else:
+        nx, ny = dx / dist, dy / dist
+    half = (min_dist - dist) * 0.5
+    x[i] -= nx * half
+    y[i] -= ny * half
+    x[j] += nx * half
+    y[j] += ny * half
+    vel_along_normal = (vx[j] - vx[i]) * nx + (vy[j] - vy[i]) * ny
+    if vel_along_normal <= 0:
+        jn = -(1 + BALL_RESTITUTION) * vel_along_normal
+        jn /= (1 / mass[i] + 1 / mass[j])
+        vx[i] -= nx * jn / mass[i]
+        vy[i] -= ny * jn / mass[i]
+        vx[j] += nx * jn / mass[j]
+        vy[j] += ny * jn / mass[j]
+    return True
+
+
+class _Snapshot:
+    """Plain copy of an ArrayBall's fields, used when the arrays are rebuilt."""
+
+    def __init__(self, ball):
+        for name in ('x', 'y', 'vx', 'vy', 'radius', 'mass', 'in_pocket',
+                     'number', 'color', 'is_cue'):
+            setattr(self, name, getattr(ball, name))
@@ -0,0 +1,176 @@
+"""
+Profiler theo frame cho vòng lặp Game.run.
+
+Mỗi frame GAME được chia thành các pha (PHASES); Game gọi mark(pha) ngay sau
+khi pha đó xong, profiler cộng thời gian từ lần mark trước vào pha đó. Khi
+tắt, Game không gọi gì vào đây (chỉ một phép kiểm tra `enabled` mỗi frame).
+
+Overlay (bật/tắt bằng F3) vẽ đồ thị thời gian frame gần đây và p50/p95/p99
+của từng pha; chữ chỉ được render lại mỗi `refresh` frame. Các frame đã đo
+được xuất ra CSV (mili giây) khi thoát game; bộ nhớ chỉ giữ `max_frames` frame
+gần nhất (vòng đệm), CSV ghi rõ khi các frame cũ hơn đã bị bỏ.
+"""
+import csv
+import os
+import time
+from array import array
+from collections import deque
+
+import pygame
+
+PHASES = ('events', 'physics', 'table', 'balls', 'cue', 'hud', 'overlay', 'flip', 'wait')
+EVENTS, PHYSICS, TABLE, BALLS, CUE, HUD, OVERLAY, FLIP, WAIT = range(len(PHASES))
+PERCENTILES = (50, 95, 99)
+MAX_FRAMES = 36000  # frames kept for the CSV: 10 minutes at 60 fps, about 2.6 MB
+
+PANEL_WIDTH = 330
+GRAPH_HEIGHT = 100
+GRAPH_MS = 50.0  # frame time at the top of the graph
+ROW_HEIGHT = 16
+PANEL_COLOR = (0, 0, 0, 190)
+BORDER_COLOR = (100, 200, 255)
+TEXT_COLOR = (220, 220, 220)
+FRAME_COLOR = (255, 200, 0)  # whole frame, including the wait for the next tick
+WORK_COLOR = (100, 255, 100)  # everything but the wait
+TARGET_COLOR = (200, 60, 60)
+
+
+def percentile(sorted_values, q):
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    k = round(q / 100.0 * (len(sorted_values) - 1))
+    return sorted_values[min(len(sorted_values) - 1, max(0, k))]
+
+
+class FrameProfiler:
+    def __init__(self, history=300, refresh=30, target_fps=60, max_frames=MAX_FRAMES):
+        self.enabled = False
+        self.history = deque(maxlen=history)  # recent frames: seconds per phase
+        # ring buffer of the last max_frames recorded frames, len(PHASES) values each
+        self.rows = array('d')
+        self.max_frames = max_frames
+        self.recorded = 0  # frames recorded in total, overwritten ones included
+        self.refresh = refresh
+        self.target_ms = 1000.0 / target_fps
+        self.row = None
+        self.t = 0.0
+        self.font = None
+        self.panel = None
+        self.frames_since_panel = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.row = None
+        self.panel = None
+
+    def begin_frame(self):
+        self.row = [0.0] * len(PHASES)
+        self.t = time.perf_counter()
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        if self.row is None:
+            # toggled off (F3) halfway through the frame
+            return
+        now = time.perf_counter()
+        self.row[phase] += now - self.t
+        self.t = now
+
+    def end_frame(self, keep=True):
+        if self.row is not None and keep:
+            self.history.append(self.row)
+            n = len(PHASES)
+            if len(self.rows) < self.max_frames * n:
+                self.rows.extend(self.row)
+            else:
+                k = self.recorded % self.max_frames * n
+                self.rows[k:k + n] = array('d', self.row)
+            self.recorded += 1
+        self.row = None
+
+    def stats(self):
+        """{phase: (p50, p95, p99) in ms} over the recent frames, plus 'frame' (total)."""
+        result = {}
+        frames = list(self.history)
+        for i, name in enumerate(PHASES):
+            values = sorted(row[i] * 1000.0 for row in frames)
+            result[name] = tuple(percentile(values, q) for q in PERCENTILES)
+        totals = sorted(sum(row) * 1000.0 for row in frames)
+        result['frame'] = tuple(percentile(totals, q) for q in PERCENTILES)
+        return result
+
+    def draw(self, screen):
+        """Overlay in the bottom right corner; returns the rect painted."""
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        if self.panel is None or self.frames_since_panel >= self.refresh:
+            self.panel = self._build_panel()
+            self.frames_since_panel = 0
+        self.frames_since_panel += 1
+        x = screen.get_width() - self.panel.get_width() - 10
+        y = screen.get_height() - self.panel.get_height() - 10
+        rect = screen.blit(self.panel, (x, y))
+
+        # graph of the recent frames, newest on the right
+        left, bottom = x + 10, y + 24 + GRAPH_HEIGHT
+        scale = GRAPH_HEIGHT / GRAPH_MS
+        width = PANEL_WIDTH - 20
+        target_y = bottom - int(self.target_ms * scale)
+        pygame.draw.line(screen, TARGET_COLOR, (left, target_y), (left + width, target_y), 1)
+        frames = list(self.history)[-width // 2:]
+        if len(frames) > 1:
+            step = width / (len(frames) - 1)
+            for color, skip_wait in ((FRAME_COLOR, False), (WORK_COLOR, True)):
+                points = []
+                for k, row in enumerate(frames):
+                    ms = (sum(row) - (row[WAIT] if skip_wait else 0.0)) * 1000.0
+                    points.append((left + int(k * step), bottom - int(min(ms, GRAPH_MS) * scale)))
+                pygame.draw.lines(screen, color, False, points, 1)
+        return rect
+
+    def _build_panel(self):
+        rows = len(PHASES) + 2  # header + phases + frame total
+        height = 24 + GRAPH_HEIGHT + 8 + rows * ROW_HEIGHT + 6
+        panel = pygame.Surface((PANEL_WIDTH, height), pygame.SRCALPHA)
+        panel.fill(PANEL_COLOR)
+        pygame.draw.rect(panel, BORDER_COLOR, (0, 0, PANEL_WIDTH, height), 1)
+        fps = 0.0
+        if self.history:
+            average = sum(sum(row) for row in self.history) / len(self.history)
+            fps = 1.0 / average if average else 0.0
+        panel.blit(self.font.render(f"Frame profiler (F3)  {fps:.0f} fps", True, TEXT_COLOR), (10, 6))
+        stats = self.stats()
+        y = 24 + GRAPH_HEIGHT + 8
+        columns = (10, 120, 185, 250)
+        for x, text in zip(columns, ('ms', 'p50', 'p95', 'p99')):
+            panel.blit(self.font.render(text, True, BORDER_COLOR), (x, y))
+        for name in PHASES + ('frame',):
+            y += ROW_HEIGHT
+            values = stats[name]
+            for x, text in zip(columns, (name,) + tuple(f"{v:6.2f}" for v in values)):
+                panel.blit(self.font.render(text, True, TEXT_COLOR), (x, y))
+        return panel
+
+    def export_csv(self, path):
+        """
+        Write the kept frames (ms per phase and total), oldest first, to
+        `path`. If older frames were dropped a leading '#' line says so and
+        the frame column still counts from the start of the session.
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        n = len(PHASES)
+        kept = len(self.rows) // n
+        dropped = self.recorded - kept
+        oldest = self.recorded % kept if dropped else 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if dropped:
+                f.write(f"# first {dropped} frames dropped, only the last {kept} were kept\r\n")
+            writer.writerow(('frame',) + PHASES + ('total',))
+            for k in range(kept):
+                slot = (oldest + k) % kept
+                row = self.rows[slot * n:(slot + 1) * n]
+                writer.writerow([dropped + k] + [f"{v * 1000.0:.3f}" for v in row] + [f"{sum(row) * 1000.0:.3f}"])
@@ -0,0 +1,339 @@
+"""
+Ghi và phát lại (replay) từng cú đánh ở dạng nhị phân gọn.
+
+Mỗi cú đánh lưu đủ để mô phỏng lại tất định: map/chế độ, trạng thái luật
+(rules_state + điểm), bàn và mọi bi ngay trước cú đánh, và vận tốc bi cái
+được áp vào lúc thả chuột. Không lưu quỹ đạo: physics tất định nên phát lại
+chính là chạy lại cú đánh (khoảng 0.9 KB mỗi cú pool).
+
+Bố cục file (little-endian):
+    header  magic, version, backend, substeps, physics.fingerprint()
+    shots   mỗi bản ghi mở đầu bằng độ dài của chính nó
+    index   offset (u64) của từng bản ghi + footer (vị trí index, số cú, magic)
+Nhờ index ở cuối, ReplayFile mmap file và nhảy thẳng tới cú thứ N. File chưa
+được đóng (game bị tắt ngang) vẫn đọc được bằng cách dò độ dài từng bản ghi.
+
+Phát lại headless, nhanh nhất có thể (chạy trong thư mục "Billiards Game"):
+
+    python -m replay replays/20261016-201500.blr
+    python -m replay FILE --shot 12 -o shot12.jsonl
+
+Thêm --trajectories OUT.npz để ghi quỹ đạo từng bước (xem trajectory.py).
+Phát lại có vẽ: python "game bi-a.py" --replay FILE
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+from levels import CAROM_MODES, MAP_NAMES, simulation_class
+from physics import POCKET, fingerprint, from_snapshot
+from rules import GameRules
+
+MAGIC = b'BLRPLAY\0'
+INDEX_MAGIC = b'BLRPIDX\0'
+VERSION = 1
+BACKENDS = ('python', 'numpy')
+CAROM = (None,) + CAROM_MODES + ('carom',)
+GROUPS = (None, 'solid', 'stripe')
+
+HEADER = struct.Struct('<8sHBB8s')  # magic, version, backend, substeps, fingerprint
+# size, map, carom mode, pool group, solids, stripes, flags, balls, pockets,
+# reds left, score, cue velocity
+SHOT = struct.Struct('<IBBBBBBHHhi2d')
+TABLE = struct.Struct('<4d')  # x, y, width, height
+POINT = struct.Struct('<2d')  # pocket centre
+BALL = struct.Struct('<4dh3BB2d')  # x, y, vx, vy, number, rgb, flags, radius, mass
+FOOTER = struct.Struct('<QI8s')  # index offset, shot count, magic
+OFFSET = struct.Struct('<Q')
+
+EXPECTING_RED = 1
+LAST_RED = 2
+IS_CUE = 1
+IN_POCKET = 2
+
+
+class Shot:
+    """One recorded shot: everything needed to play it again."""
+
+    def __init__(self, rules_state, score, velocity, snapshot, backend='python', substeps=1):
+        self.rules_state = rules_state
+        self.score = score  # player's score before the shot
+        self.velocity = velocity  # cue ball (vx, vy) applied by the shot
+        self.snapshot = snapshot  # physics.snapshot() of the table before the shot
+        self.backend = backend
+        self.substeps = substeps
+
+    @property
+    def map_type(self):
+        return self.rules_state['map_type']
+
+    def simulation(self):
+        return from_snapshot(self.snapshot, simulation_class(self.backend), substeps=self.substeps)
+
+    def rules(self, sim):
+        rules = GameRules.from_rules_state(self.rules_state, sim)
+        rules.score = self.score
+        return rules
+
+
+def encode_shot(sim, rules, vx, vy):
+    """Bytes of one shot record: table and rules as they are before (vx, vy) is applied."""
+    state = rules.rules_state()
+    t = sim.table
+    flags = (EXPECTING_RED if state['snooker_expecting_red'] else 0) | (LAST_RED if state['last_red'] else 0)
+    parts = [None, TABLE.pack(t.x, t.y, t.width, t.height)]
+    parts += [POINT.pack(px, py) for px, py in t.pockets]
+    for b in sim.balls:
+        r, g, bl = b.color[:3]
+        parts.append(BALL.pack(b.x, b.y, b.vx, b.vy, b.number, r, g, bl,
+                               (IS_CUE if b.is_cue else 0) | (IN_POCKET if b.in_pocket else 0),
+                               b.radius, b.mass))
+    size = SHOT.size + sum(len(p) for p in parts[1:])
+    parts[0] = SHOT.pack(size, state['map_type'], CAROM.index(state['carom_mode']),
+                         GROUPS.index(state['pool_player_group']), state['pool_solids_pocketed'],
+                         state['pool_stripes_pocketed'], flags, len(sim.balls), len(t.pockets),
+                         state['red_count'], rules.score, vx, vy)
+    return b''.join(parts)
+
+
+def decode_shot(buf, offset, backend='python', substeps=1):
+    (_, map_type, carom, group, solids, stripes, flags, n_balls, n_pockets,
+     reds, score, vx, vy) = SHOT.unpack_from(buf, offset)
+    offset += SHOT.size
+    x, y, width, height = TABLE.unpack_from(buf, offset)
+    offset += TABLE.size
+    pockets = []
+    for _ in range(n_pockets):
+        pockets.append(POINT.unpack_from(buf, offset))
+        offset += POINT.size
+    rows = []
+    for _ in range(n_balls):
+        bx, by, bvx, bvy, number, r, g, bl, ball_flags, radius, mass = BALL.unpack_from(buf, offset)
+        offset += BALL.size
+        rows.append((bx, by, bvx, bvy, number, (r, g, bl), bool(ball_flags & IS_CUE),
+                     bool(ball_flags & IN_POCKET), radius, mass))
+    state = {
+        'map_type': map_type,
+        'carom_mode': CAROM[carom],
+        'pool_player_group': GROUPS[group],
+        'pool_solids_pocketed': solids,
+        'pool_stripes_pocketed': stripes,
+        'snooker_expecting_red': bool(flags & EXPECTING_RED),
+        'red_count': reds,
+        'last_red': bool(flags & LAST_RED),
+    }
+    snap = ((x, y, width, height, tuple(pockets)), tuple(rows))
+    return Shot(state, score, (vx, vy), snap, backend, substeps)
+
+
+class Recorder:
+    """
+    Appends shots to a replay file; the file is created on the first shot.
+    An existing file is never overwritten: `path` gets a -2, -3, ... suffix
+    instead (self.path is the file actually written).
+    """
+
+    def __init__(self, path, backend='python', substeps=1):
+        self.path = path
+        self.backend = backend
+        self.substeps = substeps
+        self.file = None
+        self.offsets = []
+
+    def record(self, sim, rules, vx, vy):
+        """Call just before the cue ball gets (vx, vy)."""
+        if self.file is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.file = self._create()
+            self.file.write(HEADER.pack(MAGIC, VERSION, BACKENDS.index(self.backend),
+                                        self.substeps, fingerprint()))
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_shot(sim, rules, vx, vy))
+        # a crash keeps every finished shot (readable without the index)
+        self.file.flush()
+
+    def _create(self):
+        root, ext = os.path.splitext(self.path)
+        n = 1
+        while True:
+            try:
+                return open(self.path, 'xb')
+            except FileExistsError:
+                # another session started in the same second
+                n += 1
+                self.path = f"{root}-{n}{ext}"
+
+    def close(self):
+        """Write the shot index so readers can seek straight to any shot."""
+        if self.file is None:
+            return
+        index_offset = self.file.tell()
+        for offset in self.offsets:
+            self.file.write(OFFSET.pack(offset))
+        self.file.write(FOOTER.pack(index_offset, len(self.offsets), INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class ReplayFile:
+    """Memory-mapped replay file; replay[i] decodes shot i only."""
+
+    def __init__(self, path, check=True):
+        size = os.path.getsize(path)
+        if size < HEADER.size:
+            raise ValueError(f"{path}: not a replay file")
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, backend, self.substeps, self.fingerprint = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a replay file")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: replay version {version} is not supported (expected {VERSION})")
+        if check and self.fingerprint != fingerprint():
+            self.close()
+            raise ValueError(f"{path}: recorded with different physics constants, "
+                             "shots would not play out the same")
+        self.backend = BACKENDS[backend]
+        self.index_offset = None
+        self.offsets = None
+        if size >= HEADER.size + FOOTER.size:
+            index_offset, count, magic = FOOTER.unpack_from(self.data, size - FOOTER.size)
+            if magic == INDEX_MAGIC and index_offset + count * OFFSET.size == size - FOOTER.size:
+                self.index_offset, self.count = index_offset, count
+        if self.index_offset is None:
+            self.offsets = self._scan(size)
+            self.count = len(self.offsets)
+
+    def _scan(self, size):
+        # no index (recording was not closed): walk the length prefixes
+        offsets = []
+        pos = HEADER.size
+        while pos + SHOT.size <= size:
+            length = struct.unpack_from('<I', self.data, pos)[0]
+            if length < SHOT.size or pos + length > size:
+                break  # truncated last record
+            offsets.append(pos)
+            pos += length
+        return offsets
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"shot {i} out of range (0..{self.count - 1})")
+        if self.offsets is not None:
+            offset = self.offsets[i]
+        else:
+            offset = OFFSET.unpack_from(self.data, self.index_offset + i * OFFSET.size)[0]
+        return decode_shot(self.data, offset, self.backend, self.substeps)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def play_shot(shot, mode='step', trajectory=None):
+    """
+    Re-simulate one shot headless. Returns (outcome dict, simulation).
+    trajectory: optional trajectory.TrajectoryWriter fed every step.
+    """
+    sim = shot.simulation()
+    rules = shot.rules(sim)
+    potted = []
+
+    def on_event(event):
+        if event[0] == POCKET and not sim.balls[event[1]].is_cue:
+            potted.append(sim.balls[event[1]].number)
+        rules.handle_physics_event(event)
+
+    rules.begin_shot()
+    sim.shoot(*shot.velocity)
+    if trajectory is not None:
+        trajectory.begin_shot(sim)
+        frames = sim.run_until_rest(on_event=on_event, mode=mode, on_step=trajectory.capture)
+        trajectory.end_shot()
+    else:
+        frames = sim.run_until_rest(on_event=on_event, mode=mode)
+    rules.finish_shot()
+    outcome = {
+        'map': shot.map_type,
+        'velocity': list(shot.velocity),
+        'potted': potted,
+        'fouls': [{'kind': kind, 'ball': number} for kind, number in rules.shot_fouls],
+        'points': rules.score - shot.score,
+        'score': rules.score,
+        'carom_success': rules.carom_success,
+        'level_complete': rules.level_complete,
+        'frames': frames,
+        'positions': [[round(x, 3), round(y, 3)] for x, y in sim.positions()],
+    }
+    return outcome, sim
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m replay', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('file')
+    parser.add_argument('--shot', type=int, action='append',
+                        help='play only this shot (repeatable; default all)')
+    parser.add_argument('--mode', default='step', choices=('step', 'event'),
+                        help="'step' = frame by frame like the game, 'event' = event_solver")
+    parser.add_argument('--no-check', action='store_true',
+                        help='play even if the physics constants changed since recording')
+    parser.add_argument('-o', '--output', help='JSON lines output (default stdout)')
+    parser.add_argument('--trajectories', metavar='NPZ',
+                        help='also write every step of every shot to this .npz (needs numpy, step mode)')
+    args = parser.parse_args(argv)
+    if args.trajectories and args.mode != 'step':
+        parser.error("--trajectories needs --mode step")
+    trajectory = None
+    if args.trajectories:
+        from trajectory import TrajectoryWriter
+        trajectory = TrajectoryWriter(args.trajectories)
+
+    with ReplayFile(args.file, check=not args.no_check) as replay:
+        shots = range(len(replay))
+        if args.shot:
+            for i in args.shot:
+                if not -len(replay) <= i < len(replay):
+                    parser.error(f"--shot {i}: the file has {len(replay)} shots")
+            shots = [i % len(replay) for i in args.shot]
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        maps = set()
+        started = time.perf_counter()
+        try:
+            for i in shots:
+                outcome, _ = play_shot(replay[i], args.mode, trajectory)
+                maps.add(MAP_NAMES.get(outcome['map'], '?'))
+                out.write(json.dumps({'shot': i, **outcome}) + '\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            if trajectory is not None:
+                trajectory.close()
+        wall = time.perf_counter() - started
+        n = len(shots)
+        print(f"{n} shots ({', '.join(sorted(maps))}) replayed in {wall:.2f}s: "
+              f"{n / wall if wall else 0:.1f} shots/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
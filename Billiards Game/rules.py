@@ -0,0 +1,344 @@
+"""
+Luật chơi headless (không cần pygame): tính điểm pool 8-ball, snooker và
+carom từ event của simulation (CUSHION / CONTACT / POCKET).
+
+Game kế thừa GameRules nên chơi trên màn hình và các công cụ headless
+(batch, AI, replay...) dùng chung một bộ luật: chỉ cần gán `sim`, gọi
+reset_rules(cfg), begin_shot(), chuyển mọi event vào handle_physics_event()
+và gọi finish_shot() khi bi dừng hẳn.
+"""
+import math
+
+from levels import carom_mode_of, rule_set_of
+from physics import INITIAL_SPEED, CUSHION, CONTACT, POCKET
+from scoring_system import ScoringSystem
+
+# cue speed = drag length (capped at INITIAL_SPEED) * SHOT_SPEED_SCALE
+SHOT_SPEED_SCALE = 0.8
+
+
+def shot_velocity(angle, power):
+    """
+    Cue ball velocity for a shot: angle in degrees (screen coordinates, 0 =
+    right, 90 = down), power in 0..1 of a full-length drag.
+    """
+    speed = max(0.0, min(power, 1.0)) * INITIAL_SPEED * SHOT_SPEED_SCALE
+    a = math.radians(angle)
+    return math.cos(a) * speed, math.sin(a) * speed
+
+
+class GameRules:
+    def __init__(self, map_type=1):
+        self.map_type = map_type
+        self.sim = None
+        self.prediction = ""
+
+        # Scoring and shot tracking
+        self.score = 0
+        self.last_gain_text = ""
+        self.shot_in_progress = False
+        self.shot_pocketed_count = 0
+        self.shot_score = 0
+        self.shot_fouls = []  # (kind, ball_number): 'scratch' or 'wrong_ball'
+        self.level_complete = False
+
+        # carom-specific state
+        self.carom_mode = None
+        self.carom_bounce_count = 0
+        self.carom_first_contact_bounces = None
+        self.carom_contacts = set()  # Track unique ball contacts in current shot
+        self.carom_success = None  # result of the last carom shot
+
+        # Scoring system
+        self.scoring = ScoringSystem()
+
+        # Pool 8-ball game state tracking
+        self.pool_player_group = None  # 'solid' or 'stripe', None = not assigned yet
+        self.pool_solids_pocketed = 0
+        self.pool_stripes_pocketed = 0
+
+        # Snooker game state tracking
+        self.snooker_expecting_red = True  # True = expect red, False = expect color
+        self.snooker_color_respot_positions = {}  # Track where colors should respot
+
+    def reset_rules(self, cfg):
+        """New level on self.map_type (the score carries over)."""
+        self.prediction = ""
+        self.carom_mode = carom_mode_of(cfg)
+        self.level_complete = False
+
+        # reset shot/carom trackers
+        self.shot_in_progress = False
+        self.shot_fouls = []
+        self.carom_contacts = set()
+        self.carom_bounce_count = 0
+        self.carom_first_contact_bounces = None
+        self.carom_success = None
+        self.last_gain_text = ""
+
+        # Reset game mode specific state
+        rule_set = self.rule_set
+        if rule_set == 'pool':
+            self.pool_player_group = None
+            self.pool_solids_pocketed = 0
+            self.pool_stripes_pocketed = 0
+        elif rule_set == 'snooker':
+            self.snooker_expecting_red = True
+            self.scoring.red_count = 15
+            self.scoring.last_red = False
+
+    def rules_state(self):
+        """Plain dict of the rule state that decides what the next shot scores."""
+        return {
+            'map_type': self.map_type,
+            'carom_mode': self.carom_mode,
+            'pool_player_group': self.pool_player_group,
+            'pool_solids_pocketed': self.pool_solids_pocketed,
+            'pool_stripes_pocketed': self.pool_stripes_pocketed,
+            'snooker_expecting_red': self.snooker_expecting_red,
+            'red_count': self.scoring.red_count,
+            'last_red': self.scoring.last_red,
+        }
+
+    def set_rules_state(self, state):
+        """Restore what rules_state() returned (shot trackers are not touched)."""
+        self.map_type = state['map_type']
+        self.carom_mode = state['carom_mode']
+        self.pool_player_group = state['pool_player_group']
+        self.pool_solids_pocketed = state['pool_solids_pocketed']
+        self.pool_stripes_pocketed = state['pool_stripes_pocketed']
+        self.snooker_expecting_red = state['snooker_expecting_red']
+        self.scoring.red_count = state['red_count']
+        self.scoring.last_red = state['last_red']
+
+    @property
+    def rule_set(self):
+        # 'pool' | 'snooker' | 'carom', declared by the map (maps.MAPS)
+        return rule_set_of(self.map_type)
+
+    @classmethod
+    def from_rules_state(cls, state, sim=None):
+        rules = cls(state['map_type'])
+        rules.sim = sim
+        rules.set_rules_state(state)
+        return rules
+
+    def add_points(self, points):
+        # every score change goes through here (Game credits the player on turn)
+        self.score += points
+
+    def begin_shot(self):
+        """Start tracking a shot (call when the cue ball is struck)."""
+        self.shot_in_progress = True
+        self.shot_pocketed_count = 0
+        self.shot_score = 0
+        self.shot_fouls = []
+        self.last_gain_text = ""
+        self.carom_contacts = set()
+        self.carom_success = None
+        # carom trackers reset at shot start
+        if self.carom_mode:
+            self.carom_bounce_count = 0
+            self.carom_first_contact_bounces = None
+
+    def handle_physics_event(self, event):
+        kind = event[0]
+        if kind == CUSHION:
+            # count bounce for carom only when cue ball bounces while shot in progress
+            if self.carom_mode and self.shot_in_progress and self.sim.balls[event[1]].is_cue:
+                self.carom_bounce_count += 1
+        elif kind == CONTACT:
+            # Track Carom contacts when cue ball hits others
+            # Store tuple (ball_number, bounce_count_at_contact) for proper tracking
+            if self.rule_set == 'carom' and self.shot_in_progress:
+                a = self.sim.balls[event[1]]
+                b = self.sim.balls[event[2]]
+                if a.is_cue:
+                    self.carom_contacts.add((b.number, self.carom_bounce_count))
+                elif b.is_cue:
+                    self.carom_contacts.add((a.number, self.carom_bounce_count))
+        elif kind == POCKET:
+            ball = self.sim.balls[event[1]]
+            if ball.is_cue:
+                # simulation already respawned the cue ball
+                self.prediction = "Cue ball in pocket!"
+                self.shot_fouls.append(('scratch', ball.number))
+                return
+            pts = 0
+            valid_shot = True
+
+            rule_set = self.rule_set
+            if rule_set == 'pool':
+                # Pool 8-ball scoring with proper rules
+                pts, valid_shot = self.score_pool_ball(ball.number)
+            elif rule_set == 'snooker':
+                # Snooker scoring with proper rules
+                pts, valid_shot = self.score_snooker_ball(ball.number)
+
+            if valid_shot and pts > 0:
+                self.add_points(pts)
+                self.shot_score += pts
+                self.shot_pocketed_count += 1
+                self.last_gain_text = f"+{pts} pts"
+                self.prediction = f"Ball {ball.number} pocketed!"
+            elif not valid_shot:
+                self.prediction = "Invalid shot!"
+                self.last_gain_text = "No points - wrong ball"
+                self.shot_fouls.append(('wrong_ball', ball.number))
+
+    def score_pool_ball(self, ball_number):
+        """
+        Score Pool 8-ball ball with proper rules:
+        - First ball determines player's group (solid 1-7 or stripe 9-15)
+        - Must clear all balls of your group before shooting 8-ball
+        - 8-ball is worth 20 points
+        Returns: (points, valid_shot)
+        """
+        if ball_number == 8:
+            # Check if player can shoot 8-ball
+            if self.pool_player_group is None:
+                return 0, False  # Can't shoot 8-ball first
+            
+            if self.pool_player_group == 'solid':
+                if self.pool_solids_pocketed < 7:
+                    return 0, False  # Must clear all solids first
+            elif self.pool_player_group == 'stripe':
+                if self.pool_stripes_pocketed < 7:
+                    return 0, False  # Must clear all stripes first
+            
+            return 20, True
+        
+        elif 1 <= ball_number <= 7:  # Solids
+            if self.pool_player_group is None:
+                # First ball determines group
+                self.pool_player_group = 'solid'
+                self.pool_solids_pocketed = 1
+                return 10, True
+            elif self.pool_player_group == 'solid':
+                self.pool_solids_pocketed += 1
+                return 10, True
+            else:
+                return 0, False  # Wrong group
+        
+        elif 9 <= ball_number <= 15:  # Stripes
+            if self.pool_player_group is None:
+                # First ball determines group
+                self.pool_player_group = 'stripe'
+                self.pool_stripes_pocketed = 1
+                return 15, True
+            elif self.pool_player_group == 'stripe':
+                self.pool_stripes_pocketed += 1
+                return 15, True
+            else:
+                return 0, False  # Wrong group
+        
+        return 0, False
+    
+    def score_snooker_ball(self, ball_number):
+        """
+        Score Snooker ball with proper rules:
+        - Must alternate: red -> color -> red -> color
+        - Red balls: 1 point each
+        - Color balls: respot after potting (not fully implemented)
+        Returns: (points, valid_shot)
+        """
+        if ball_number == 1:  # Red ball
+            if not self.snooker_expecting_red:
+                return 0, False  # Must pot red first
+            self.snooker_expecting_red = False
+            self.scoring.last_red = True
+            self.scoring.red_count -= 1
+            return 1, True
+        
+        elif 2 <= ball_number <= 7:  # Color balls
+            if self.snooker_expecting_red:
+                if self.scoring.red_count > 0:
+                    return 0, False  # Must pot red first if reds remain
+            # Valid color shot
+            self.snooker_expecting_red = True  # After color, expect red again
+            self.scoring.last_red = False
+            # Note: In real snooker, color would respot, but we'll just continue
+            return ball_number, True
+        
+        return 0, False
+
+    def finish_shot(self):
+        """
+        All balls stopped after a shot: combo bonus / carom check. Sets
+        level_complete (and carom_success on carom tables).
+        """
+        # If carom map, evaluate contacts
+        if self.carom_mode:
+            self.carom_success = False
+            # contacts list holds tuples (ball_number, bounce_count_at_contact)
+            # Convert set to list to access elements
+            contacts_list = list(self.carom_contacts)
+            
+            if len(contacts_list) >= 2:
+                # Sort by bounce count to get order of contact
+                contacts_list.sort(key=lambda x: x[1])
+                first_contact = contacts_list[0]
+                second_contact = contacts_list[1]
+                
+                # Get unique ball numbers contacted
+                unique_balls = set(c[0] for c in contacts_list)
+                
+                # Success requires both other balls (not cue) contacted
+                target_balls = set(b.number for b in self.sim.balls if not b.is_cue and not b.in_pocket)
+                
+                if len(unique_balls) >= 2 and unique_balls >= target_balls:
+                    # Check bounce requirements
+                    bounces_before_second = second_contact[1] - first_contact[1]
+                    ok = False
+                    
+                    if self.carom_mode == 'libre':
+                        ok = True  # No bounce requirement
+                    elif self.carom_mode == 'one':
+                        ok = (bounces_before_second >= 1)  # At least 1 bounce between contacts
+                    elif self.carom_mode == 'three':
+                        ok = (bounces_before_second >= 3)  # At least 3 bounces between contacts
+                    
+                    if ok:
+                        # Calculate points based on mode
+                        if self.carom_mode == 'libre':
+                            points = 1
+                        elif self.carom_mode == 'one':
+                            points = 20
+                        elif self.carom_mode == 'three':
+                            points = 50
+                        else:
+                            points = 1
+                        
+                        self.add_points(points)
+                        self.last_gain_text = f"Carom Success +{points}"
+                        self.carom_success = True
+                        self.level_complete = True
+                    else:
+                        self.last_gain_text = f"Carom Failed - Need {3 if self.carom_mode == 'three' else 1} bounce(s)"
+                else:
+                    self.last_gain_text = "Carom Failed - Must hit both balls"
+            else:
+                self.last_gain_text = "Carom Failed - Must hit both balls"
+        else:
+            # finish shot: give combo bonus if >1 ball pocketed this shot
+            if self.shot_pocketed_count > 1:
+                bonus = self.shot_pocketed_count * 5
+                self.add_points(bonus)
+                self.last_gain_text = f"Combo x{self.shot_pocketed_count} +{bonus} pts"
+            elif self.shot_pocketed_count == 1:
+                # keep last_gain_text from pocketing
+                pass
+            # check level complete: all non-cue balls pocketed
+            noncue = [b for b in self.sim.balls if not b.is_cue]
+            if noncue and all(b.in_pocket for b in noncue):
+                self.level_complete = True
+
+        # reset shot tracking
+        self.shot_in_progress = False
+        self.shot_pocketed_count = 0
+        self.shot_score = 0
+        # reset carom trackers
+        self.carom_contacts = set()
+        self.carom_bounce_count = 0
+        self.carom_first_contact_bounces = None
+        return self.level_complete
@@ -0,0 +1,450 @@
+"""
+Server asyncio chạy nhiều bàn headless cùng lúc (giải đấu, bot đấu bot).
+
+Mỗi bàn là một simulation + bộ luật (rules.GameRules) độc lập, dựng từ bất
+kỳ map nào trong levels/maps. Client kết nối qua TCP hoặc Unix socket, gửi
+lệnh dạng JSON lines và nhận trạng thái khi bi đã dừng hẳn:
+
+    {"op": "create", "map": 1}          -> {"type": "created", "table": 3, ...}
+    {"op": "join", "table": 3}          -> {"type": "state", ...}
+    {"op": "shoot", "table": 3, "angle": 12.5, "power": 0.8}
+                                        -> {"type": "accepted", ...}, rồi khi bi dừng
+                                           {"type": "settled", ...} tới mọi client của bàn
+    {"op": "state" | "reset" | "leave", "table": 3}
+    {"op": "stats"}                     -> số bàn, bước/s, cú/s, độ trễ p50/p99
+
+Lệnh có thể kèm "id", được gửi lại trong câu trả lời; lỗi trả về
+{"type": "error", "error": ...}. Bàn không còn client nào thì bị đóng.
+
+Chỉ một coroutine chạy physics: các bàn đang có cú đánh lần lượt chạy
+STEPS_PER_SLICE bước (round-robin nên bàn nào cũng tiến đều), và sau mỗi
+SLICE_BUDGET giây nó nhường event loop để đọc/ghi socket. Một cú đánh chạy
+đúng các bước như game và batch, nên kết quả giống hệt `python -m batch`.
+Mỗi bàn chỉ giữ simulation, bộ luật và tập client (không lưu lịch sử).
+
+Chạy trong thư mục "Billiards Game":
+
+    python -m server --port 8765                 # TCP trên 127.0.0.1
+    python -m server --unix /tmp/billiards.sock
+    python -m server --bots 200 --shots 5        # tự kiểm tra: server + 200 bot cục bộ
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+
+from batch import random_shots
+from levels import CAROM_MODES, MAP_NAMES, load_level
+from physics import POCKET
+from rules import GameRules, shot_velocity
+
+STEPS_PER_SLICE = 30  # physics steps a table runs before the next table's turn
+SLICE_BUDGET = 0.005  # seconds of stepping before the event loop gets to do I/O
+MAX_SHOT_FRAMES = 20000  # same cap as Simulation.run_until_rest
+LATENCY_SAMPLES = 10000  # recent shot latencies kept for the percentiles
+MAX_CLIENT_BUFFER = 1 << 20  # a client that stops reading is dropped past this many bytes
+
+
+def percentile(sorted_values, q):
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    k = round(q / 100.0 * (len(sorted_values) - 1))
+    return sorted_values[min(len(sorted_values) - 1, max(0, k))]
+
+
+def encode(msg):
+    return (json.dumps(msg, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class ServerTable:
+    """One table: its simulation, rules, the clients watching it and the shot rolling on it."""
+    __slots__ = ('id', 'map_type', 'carom_mode', 'sim', 'rules', 'clients',
+                 'shots', 'frames', 'potted', 'received')
+
+    def __init__(self, table_id, map_type, carom_mode='libre', backend='python'):
+        self.id = table_id
+        self.map_type = map_type
+        self.carom_mode = carom_mode
+        self.clients = set()
+        self.reset(backend)
+
+    def reset(self, backend='python'):
+        """Back to the map's starting layout, score 0."""
+        self.sim, cfg = load_level(self.map_type, self.carom_mode, backend=backend)
+        self.rules = GameRules(self.map_type)
+        self.rules.sim = self.sim
+        self.rules.reset_rules(cfg)
+        self.shots = 0
+        self.frames = 0
+        self.potted = []
+        self.received = None  # perf_counter() when the rolling shot came in
+
+    @property
+    def rolling(self):
+        return self.received is not None
+
+    def shoot(self, angle, power):
+        # before any state changes, so a shot that fails leaves the table as it was
+        velocity = shot_velocity(angle, power)
+        self.frames = 0
+        self.potted = []
+        self.received = time.perf_counter()
+        self.rules.begin_shot()
+        self.sim.shoot(*velocity)
+
+    def advance(self, steps):
+        """Run up to `steps` physics steps of the rolling shot; True once every ball has stopped."""
+        sim, rules, potted = self.sim, self.rules, self.potted
+        for _ in range(steps):
+            for event in sim.step():
+                if event[0] == POCKET and not sim.balls[event[1]].is_cue:
+                    potted.append(sim.balls[event[1]].number)
+                rules.handle_physics_event(event)
+            self.frames += 1
+            if not sim.is_moving() or self.frames >= MAX_SHOT_FRAMES:
+                rules.finish_shot()
+                self.shots += 1
+                return True
+        return False
+
+    def state(self):
+        rules = self.rules
+        return {
+            'table': self.id,
+            'map': self.map_type,
+            'shots': self.shots,
+            'score': rules.score,
+            'level_complete': rules.level_complete,
+            'rolling': self.rolling,
+            # [number, x, y] of every ball still on the table
+            'balls': [[b.number, round(b.x, 2), round(b.y, 2)] for b in self.sim.balls if not b.in_pocket],
+        }
+
+
+class TableServer:
+    def __init__(self, backend='python', steps_per_slice=STEPS_PER_SLICE, slice_budget=SLICE_BUDGET):
+        self.backend = backend
+        self.steps_per_slice = steps_per_slice
+        self.slice_budget = slice_budget
+        self.tables = {}
+        self.next_id = 1
+        self.rolling = deque()  # tables with a shot in progress, in turn order
+        self.wakeup = asyncio.Event()
+        self.clients = 0
+        self.started = time.perf_counter()
+        self.steps = 0  # physics steps run, summed over tables
+        self.shots = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # seconds from 'shoot' to 'settled'
+        self.tasks = []
+
+    async def start(self, host='127.0.0.1', port=8765, unix=None, report=0.0):
+        """Listen (TCP, or a Unix socket when `unix` is a path) and start stepping; returns the asyncio server."""
+        if unix:
+            listener = await asyncio.start_unix_server(self.handle_client, unix)
+        else:
+            listener = await asyncio.start_server(self.handle_client, host, port)
+        self.tasks.append(asyncio.create_task(self.run_physics()))
+        if report:
+            self.tasks.append(asyncio.create_task(self.report(report)))
+        return listener
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    async def handle_client(self, reader, writer):
+        self.clients += 1
+        joined = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = {}
+                try:
+                    msg = json.loads(line)
+                    reply = self.dispatch(msg, writer, joined)
+                except (ValueError, TypeError, AttributeError) as exc:
+                    reply = {'type': 'error', 'error': str(exc)}
+                if isinstance(msg, dict) and 'id' in msg:
+                    reply['id'] = msg['id']
+                self.send(writer, reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            for table in joined:
+                self.leave(table, writer)
+            writer.close()
+
+    def dispatch(self, msg, writer, joined):
+        op = msg.get('op')
+        if op == 'create':
+            map_type = int(msg.get('map', 1))
+            carom_mode = msg.get('carom_mode', 'libre')
+            if map_type not in MAP_NAMES:
+                raise ValueError(f"unknown map: {map_type}")
+            if carom_mode not in CAROM_MODES:
+                raise ValueError(f"unknown carom mode: {carom_mode!r}")
+            table = ServerTable(self.next_id, map_type, carom_mode, self.backend)
+            self.next_id += 1
+            self.tables[table.id] = table
+            table.clients.add(writer)
+            joined.add(table)
+            return dict(table.state(), type='created')
+        if op == 'stats':
+            return dict(self.stats(), type='stats')
+
+        table = self.tables.get(msg.get('table'))
+        if table is None:
+            raise ValueError(f"no table {msg.get('table')!r}")
+        if op == 'join':
+            table.clients.add(writer)
+            joined.add(table)
+        elif op == 'leave':
+            joined.discard(table)
+            self.leave(table, writer)
+            return {'type': 'left', 'table': table.id}
+        elif op == 'shoot':
+            if table.rolling:
+                raise ValueError(f"table {table.id}: a shot is still rolling")
+            missing = [field for field in ('angle', 'power') if field not in msg]
+            if missing:
+                raise ValueError(f"shoot: missing {', '.join(missing)}")
+            angle = float(msg['angle'])
+            power = float(msg['power'])
+            if not math.isfinite(angle):
+                raise ValueError(f"shoot: angle must be a finite number, got {msg['angle']!r}")
+            if not 0.0 <= power <= 1.0:
+                raise ValueError(f"shoot: power must be in 0..1, got {msg['power']!r}")
+            table.shoot(angle, power)
+            self.rolling.append(table)
+            self.wakeup.set()
+            return {'type': 'accepted', 'table': table.id, 'shot': table.shots}
+        elif op == 'reset':
+            if table in self.rolling:
+                self.rolling.remove(table)
+            table.reset(self.backend)
+        elif op != 'state':
+            raise ValueError(f"unknown op: {op!r}")
+        return dict(table.state(), type='state')
+
+    def leave(self, table, writer):
+        table.clients.discard(writer)
+        if not table.clients and self.tables.pop(table.id, None) is not None and table in self.rolling:
+            self.rolling.remove(table)
+
+    def send(self, writer, msg):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            # not reading its updates: drop it rather than buffer without end
+            writer.close()
+            return
+        writer.write(encode(msg))
+
+    async def run_physics(self):
+        """Step the tables with a shot in progress, round-robin, yielding for I/O between bursts."""
+        clock = time.perf_counter
+        rolling = self.rolling
+        while True:
+            if not rolling:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            deadline = clock() + self.slice_budget
+            while rolling and clock() < deadline:
+                table = rolling.popleft()
+                frames = table.frames
+                settled = table.advance(self.steps_per_slice)
+                self.steps += table.frames - frames
+                if settled:
+                    self.settled(table)
+                else:
+                    rolling.append(table)
+            await asyncio.sleep(0)
+
+    def settled(self, table):
+        latency = time.perf_counter() - table.received
+        table.received = None
+        self.shots += 1
+        self.latencies.append(latency)
+        rules = table.rules
+        msg = dict(table.state(), type='settled', shot=table.shots - 1, frames=table.frames,
+                   potted=table.potted,
+                   fouls=[{'kind': kind, 'ball': number} for kind, number in rules.shot_fouls],
+                   carom_success=rules.carom_success, latency_ms=round(latency * 1000.0, 3))
+        for writer in list(table.clients):
+            self.send(writer, msg)
+
+    def stats(self):
+        """Totals since start, rates per second and shot latency percentiles (ms)."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        latencies = sorted(t * 1000.0 for t in self.latencies)
+        return {
+            'tables': len(self.tables),
+            'rolling': len(self.rolling),
+            'clients': self.clients,
+            'steps': self.steps,
+            'shots': self.shots,
+            'table_steps_per_s': round(self.steps / elapsed, 1),
+            'shots_per_s': round(self.shots / elapsed, 2),
+            'latency_ms': {f'p{q}': round(percentile(latencies, q), 3) for q in (50, 99)},
+        }
+
+    async def report(self, interval):
+        """Every `interval` seconds print tables, throughput and p99 shot latency to stderr."""
+        last = (time.perf_counter(), self.steps, self.shots)
+        while True:
+            await asyncio.sleep(interval)
+            now = (time.perf_counter(), self.steps, self.shots)
+            seconds = now[0] - last[0]
+            p99 = percentile(sorted(self.latencies), 99) * 1000.0
+            print(f"{len(self.tables)} tables ({len(self.rolling)} rolling), {self.clients} clients: "
+                  f"{(now[1] - last[1]) / seconds:.0f} table-steps/s, {(now[2] - last[2]) / seconds:.1f} shots/s, "
+                  f"p99 shot latency {p99:.1f} ms", file=sys.stderr)
+            last = now
+
+
+class TableClient:
+    """
+    Small asyncio client (bots, tests): request() waits for its reply,
+    everything the server pushes ('settled' updates) goes to `pushes`.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 1
+        self.pending = {}
+        self.pushes = asyncio.Queue()
+        self.task = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, unix=None):
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """Send one command; returns the reply (ValueError if the server refused it)."""
+        msg_id = self.next_id
+        self.next_id += 1
+        reply = self.pending[msg_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(encode(dict(fields, op=op, id=msg_id)))
+        await self.writer.drain()
+        reply = await reply
+        if reply['type'] == 'error':
+            raise ValueError(reply['error'])
+        return reply
+
+    async def shoot(self, table, angle, power):
+        """Play a shot and wait for it to settle; returns the 'settled' update (other pushes are dropped)."""
+        await self.request('shoot', table=table, angle=angle, power=power)
+        while True:
+            msg = await self.pushes.get()
+            if msg['type'] == 'settled' and msg['table'] == table:
+                return msg
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                future = self.pending.pop(msg.get('id'), None)
+                if future is not None:
+                    future.set_result(msg)
+                else:
+                    self.pushes.put_nowait(msg)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server closed the connection"))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.task.cancel()
+
+
+async def run_bots(bots, shots, map_type=1, seed=None, backend='python', unix=None):
+    """
+    Self-test: serve on a local socket (free TCP port, or `unix`) and let
+    `bots` clients each create a table and play `shots` random shots on it,
+    all at once. Returns (server stats, wall seconds).
+    """
+    server = TableServer(backend)
+    listener = await server.start(port=0, unix=unix)
+    port = None if unix else listener.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    plans = [random_shots(shots, rng.random()) for _ in range(bots)]
+
+    async def bot(plan):
+        client = await TableClient.connect(port=port, unix=unix)
+        table = (await client.request('create', map=map_type))['table']
+        for angle, power in plan:
+            await client.shoot(table, angle, power)
+        await client.close()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(bot(plan) for plan in plans))
+        wall = time.perf_counter() - started
+        return server.stats(), wall
+    finally:
+        server.stop()
+        listener.close()
+        await listener.wait_closed()
+
+
+async def serve(args):
+    server = TableServer(args.backend)
+    listener = await server.start(args.host, args.port, args.unix, args.report)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"serving tables on {where} ({args.backend} physics)", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m server', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    parser.add_argument('--report', type=float, default=10.0,
+                        help='seconds between stats lines on stderr (0 = off)')
+    parser.add_argument('--bots', type=int, metavar='N',
+                        help='self-test: N local bot clients play against an in-process server, then exit')
+    parser.add_argument('--shots', type=int, default=5, help='shots per bot (--bots)')
+    parser.add_argument('--map', type=int, default=1, choices=sorted(MAP_NAMES), help='map the bots play on')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.bots is None:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    stats, wall = asyncio.run(run_bots(args.bots, args.shots, args.map, args.seed, args.backend, args.unix))
+    print(json.dumps(stats))
+    print(f"{args.bots} tables x {args.shots} shots on {MAP_NAMES[args.map]} in {wall:.2f}s: "
+          f"{stats['steps'] / wall:.0f} table-steps/s, {stats['shots'] / wall:.1f} shots/s, "
+          f"shot latency p50 {stats['latency_ms']['p50']:.1f} ms, p99 {stats['latency_ms']['p99']:.1f} ms",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Cache sprite cho bi (ball sprite atlas).
+
+Ball.draw trước đây mỗi frame, mỗi bi lại tạo Surface bóng đổ, Surface
+highlight, pygame.font.Font và render số hai lần. Ở đây ảnh hoàn chỉnh của
+từng bi (bóng đổ, màu, highlight, viền, sọc, số) được vẽ một lần theo khóa
+(number, color, is_cue, radius) rồi chỉ cần blit mỗi frame.
+
+Đổi bán kính sinh khóa mới; đổi theme (set_theme) thì xóa toàn bộ cache.
+
+Bi nhỏ (bán kính <= LOD_RADIUS, ví dụ map stress hàng nghìn bi) dùng sprite
+rút gọn: chỉ một hình tròn màu có colorkey, không bóng đổ, highlight, sọc
+hay số (số không đọc được ở cỡ đó), dùng chung cho mọi bi cùng màu và blit
+nhanh hơn nhiều so với sprite có alpha.
+
+LayerCache làm việc tương tự cho các lớp nền tĩnh toàn màn hình (bàn, menu,
+màn chọn level): vẽ một lần, mỗi frame chỉ blit một Surface.
+"""
+import pygame
+
+SHADOW_OFFSET = 2
+LOD_RADIUS = 9  # balls this small or smaller get the plain sprite
+LOD_COLORKEY = (255, 0, 255)
+
+
+class BallSpriteCache:
+    def __init__(self, theme='default'):
+        self.theme = theme
+        self.sprites = {}
+        self._font = None
+
+    def set_theme(self, theme):
+        if theme != self.theme:
+            self.theme = theme
+            self.clear()
+
+    def clear(self):
+        # also drops the font: it must not outlive pygame.quit()
+        self.sprites.clear()
+        self._font = None
+
+    def get(self, number, color, is_cue, radius):
+        """Returns (surface, anchor): blit at (int(x) - anchor, int(y) - anchor)."""
+        if radius <= LOD_RADIUS:
+            # plain disc: shared by every ball of this color, the number is dropped
+            key = (None, color, is_cue, radius)
+            sprite = self.sprites.get(key)
+            if sprite is None:
+                sprite = self.sprites[key] = (self._build_plain(color, is_cue, radius), radius)
+            return sprite
+        key = (number, color, is_cue, radius)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = (self._build(number, color, is_cue, radius), radius)
+        return sprite
+
+    def _font_for_numbers(self):
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+            self._font.set_bold(True)
+        return self._font
+
+    def _build_plain(self, color, is_cue, radius):
+        size = radius * 2 + 1
+        surf = pygame.Surface((size, size))
+        surf.fill(LOD_COLORKEY)
+        surf.set_colorkey(LOD_COLORKEY, pygame.RLEACCEL)
+        pygame.draw.circle(surf, (255, 255, 255) if is_cue else color, (radius, radius), radius)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        return surf
+
+    def _build(self, number, color, is_cue, radius):
+        size = radius * 2 + SHADOW_OFFSET + 1
+        surf = pygame.Surface((size, size), pygame.SRCALPHA)
+        c = (radius, radius)
+
+        # Draw shadow first
+        pygame.draw.circle(surf, (0, 0, 0, 80), (radius + SHADOW_OFFSET, radius + SHADOW_OFFSET), radius)
+
+        # Draw ball with gradient effect (simulated with highlight)
+        pygame.draw.circle(surf, color, c, radius)
+
+        # Draw highlight for 3D effect
+        highlight_radius = radius // 3
+        highlight_pos = (int(radius - radius * 0.3), int(radius - radius * 0.3))
+        highlight = pygame.Surface((highlight_radius * 2, highlight_radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(highlight, (255, 255, 255, 150), (highlight_radius, highlight_radius), highlight_radius)
+        surf.blit(highlight, (highlight_pos[0] - highlight_radius, highlight_pos[1] - highlight_radius))
+
+        # Draw border
+        pygame.draw.circle(surf, (40, 40, 40), c, radius, 2)
+
+        if not is_cue:
+            # Draw stripe pattern for pool balls 9-15
+            if 9 <= number <= 15:
+                stripe_width = radius * 1.2
+                stripe_height = radius * 0.4
+                stripe_rect = pygame.Rect(int(radius - stripe_width//2),
+                                          int(radius - stripe_height//2),
+                                          int(stripe_width), int(stripe_height))
+                pygame.draw.ellipse(surf, (255, 255, 255), stripe_rect)
+
+            # Draw number (shadow then main text)
+            font = self._font_for_numbers()
+            text = font.render(str(number), True, (0, 0, 0))
+            surf.blit(text, text.get_rect(center=(radius + 1, radius + 1)))
+            text = font.render(str(number), True, (255, 255, 255))
+            surf.blit(text, text.get_rect(center=c))
+        else:
+            # Cue ball with distinct white appearance
+            pygame.draw.circle(surf, (255, 255, 255), c, radius)
+            # Inner circle for depth
+            pygame.draw.circle(surf, (245, 245, 245), c, radius - 2)
+
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        return surf
+
+
+class LayerCache:
+    """
+    Named full-screen layers painted once and reused every frame. A layer is
+    repainted when it is requested with a different key (e.g. new table
+    geometry) or screen size.
+    """
+
+    def __init__(self):
+        self.layers = {}
+
+    def get(self, name, key, size, paint):
+        """Surface for `name`; paint(surface) fills it when (key, size) changed."""
+        cached = self.layers.get(name)
+        if cached is not None and cached[0] == (key, size):
+            return cached[1]
+        surf = pygame.Surface(size)
+        paint(surf)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        self.layers[name] = ((key, size), surf)
+        return surf
+
+    def invalidate(self, name):
+        self.layers.pop(name, None)
+
+    def clear(self):
+        self.layers.clear()
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from event_solver import EventSolver
+from physics import CONTACT, CUSHION, POCKET, BallState, Simulation, TableGeometry
+from rules import shot_velocity
+
+TABLE = (0, 0, 1000, 500, [(0, 0), (500, 0), (1000, 0), (0, 500), (500, 500), (1000, 500)])
+
+
+def _sim(*balls):
+    return Simulation(TableGeometry(*TABLE), list(balls))
+
+
+def _solve(sim):
+    events = []
+    solver = EventSolver(sim)
+    solver.run(events.append)
+    return solver, events
+
+
+def test_full_power_does_not_tunnel():
+    # small balls: a full-power shot moves 32 px a frame, four times their diameter
+    speed = shot_velocity(0.0, 1.0)[0]
+    target = BallState(400.0, 250.0, number=1, radius=4)
+    stepped = _sim(BallState(200.0, 252.0, is_cue=True, radius=4), BallState(400.0, 250.0, number=1, radius=4))
+    stepped.shoot(speed, 0.0)
+    stepped_events = []
+    while stepped.balls[0].x < 420.0:
+        stepped_events += stepped.step()
+    sim = _sim(BallState(200.0, 252.0, is_cue=True, radius=4), target)
+    sim.shoot(speed, 0.0)
+    _, events = _solve(sim)
+    assert (CONTACT, 0, 1) not in stepped_events  # the frame stepper jumps right over it
+    assert events[0] == (CONTACT, 0, 1)
+    assert target.in_pocket or target.x > 400.0
+
+
+def test_full_power_stays_on_the_table():
+    sim = _sim(BallState(900.0, 250.0, is_cue=True))
+    sim.shoot(*shot_velocity(10.0, 1.0))
+    _, events = _solve(sim)
+    cue = sim.balls[0]
+    assert events and all(kind == CUSHION for kind, _, _ in events)
+    assert cue.radius <= cue.x <= 1000 - cue.radius and cue.radius <= cue.y <= 500 - cue.radius
+
+
+def test_simultaneous_contacts_are_symmetric():
+    # the cue ball meets two balls, mirrored about its path, at the same moment
+    r = 18.0
+    sim = _sim(BallState(300.0, 250.0, is_cue=True),
+               BallState(500.0, 250.0 - r, number=1), BallState(500.0, 250.0 + r, number=2))
+    sim.shoot(10.0, 0.0)
+    solver, _ = _solve(sim)
+    first = [(t, event) for t, event in solver.log if event[0] == CONTACT][:2]
+    assert {event for _, event in first} == {(CONTACT, 0, 1), (CONTACT, 0, 2)}
+    assert first[0][0] == pytest.approx(first[1][0])
+    a, b = sim.balls[1], sim.balls[2]
+    assert a.x == pytest.approx(b.x) and a.y - 250.0 == pytest.approx(250.0 - b.y)
+
+
+def test_ball_is_pocketed():
+    sim = _sim(BallState(100.0, 250.0, is_cue=True), BallState(900.0, 400.0, number=1))
+    sim.balls[1].vx, sim.balls[1].vy = 6.0, 6.0
+    _, events = _solve(sim)
+    assert (POCKET, 1, 5) in events
+    ball = sim.balls[1]
+    assert ball.in_pocket and (ball.x, ball.y) == (1000.0, 500.0)
+
+
+def test_scratch_respawns_cue_on_the_spot():
+    sim = _sim(BallState(100.0, 100.0, is_cue=True))
+    sim.shoot(-6.0, -6.0)
+    _, events = _solve(sim)
+    assert (POCKET, 0, 0) in events
+    cue = sim.balls[0]
+    assert not cue.in_pocket and (cue.x, cue.y) == (250.0, 250.0)
+
+
+def test_scratch_respawn_avoids_a_ball_on_the_spot():
+    sim = _sim(BallState(100.0, 100.0, is_cue=True), BallState(255.0, 250.0, number=1))
+    sim.shoot(-6.0, -6.0)
+    _, events = _solve(sim)
+    assert (POCKET, 0, 0) in events
+    cue, blocker = sim.balls
+    assert not cue.in_pocket and cue.y == 250.0
+    # nothing overlaps, and the ball on the spot was not pushed aside
+    assert math.hypot(cue.x - blocker.x, cue.y - blocker.y) >= cue.radius + blocker.radius
+    assert (blocker.x, blocker.y) == (255.0, 250.0)
+    assert not any(event[0] == CONTACT for event in events)
@@ -0,0 +1,98 @@
+import math
+import time
+
+import pytest
+
+from netplay import (CORRECTION, CORRECTION_KIND, FINAL, FINAL_KIND, SHOT, SHOT_KIND, NetMatch, NetPeer,
+                     decode_correction, quantize, run_loopback, tables_agree, write_varint)
+from levels import load_level
+
+
+@pytest.mark.parametrize('map_type', [1, 2])
+def test_loopback_tables_identical(map_type):
+    host, guest = run_loopback(3, map_type, seed=5)
+    assert len(host.finals) == 6
+    assert tables_agree(host, guest)
+    assert guest.match.corrected == 0
+
+
+def test_drift_is_corrected():
+    host, guest = run_loopback(2, 1, seed=2, drift=0.5)
+    assert guest.match.corrected > 0
+    assert tables_agree(host, guest)
+
+
+def _connect(host_backend='python', guest_backend='python'):
+    host = NetMatch.host(0, 1, backend=host_backend)
+    guest = NetMatch.join(f'127.0.0.1:{host.peer.port}', backend=guest_backend)
+    events = {'host': [], 'guest': []}
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        events['host'] += host.poll()
+        events['guest'] += guest.poll()
+        if (host.started and guest.started) or (host.peer.closed and guest.peer.closed):
+            break
+        time.sleep(0.001)
+    return host, guest, events
+
+
+def _guest_receives(payload_kind, payload):
+    host, guest, _ = _connect()
+    sim, _ = load_level(1)
+    host.begin(sim)
+    guest.begin(load_level(1)[0])
+    host.peer.send(payload_kind, payload)
+    events = []
+    deadline = time.monotonic() + 5.0
+    while not guest.peer.closed and time.monotonic() < deadline:
+        events += guest.poll()
+        time.sleep(0.001)
+    host.close()
+    return events
+
+
+def _correction(*keys):
+    out = bytearray(CORRECTION.pack(0, 30))
+    write_varint(out, len(keys))
+    for key in keys:
+        write_varint(out, key)
+    return bytes(out)
+
+
+@pytest.mark.parametrize('kind, payload', [
+    (CORRECTION_KIND, _correction(99 * 2 + 1)),  # a ball this table does not have
+    (CORRECTION_KIND, _correction(2)),  # deltas missing
+    (FINAL_KIND, FINAL.pack(0, 10, 0, 0) + b'\x01'),  # ball state missing
+    (FINAL_KIND, FINAL.pack(0, 10, 0, 0) + b'\x01\xfc\x01' + bytes(16)),  # ball 127
+    (SHOT_KIND, SHOT.pack(0, math.nan, 0.0)),
+    (SHOT_KIND, b'\x00\x00'),
+])
+def test_bad_message_ends_match_without_exception(kind, payload):
+    events = _guest_receives(kind, payload)
+    assert events and events[-1][0] == 'closed' and 'bad message' in events[-1][1]
+
+
+def test_bad_correction_leaves_baseline_untouched():
+    sim, _ = load_level(1)
+    baseline = [quantize(b) for b in sim.balls]
+    before = list(baseline)
+    with pytest.raises(ValueError):
+        decode_correction(_correction(1, 99 * 2 + 1), baseline)
+    assert baseline == before
+
+
+def test_handshake_rejects_other_backend():
+    pytest.importorskip('numpy')
+    host, guest, events = _connect('python', 'numpy')
+    assert not (host.started and guest.started)
+    assert any(kind == 'closed' for kind, *_ in events['guest'])
+    host.close()
+    guest.close()
+
+
+def test_listens_on_this_machine_only_by_default():
+    peer = NetPeer.listen(0)
+    try:
+        assert peer.listener.getsockname()[0] == '127.0.0.1'
+    finally:
+        peer.close()
@@ -0,0 +1,135 @@
+import math
+
+import pytest
+
+from batch import random_shots
+from levels import load_level, simulation_class
+from physics import BallState, TableGeometry, free_roll, snapshot, stop_frames
+from rules import shot_velocity
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def backend(request):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    return request.param
+
+
+@pytest.mark.parametrize('dt', [1.0, 0.5])
+@pytest.mark.parametrize('speed', [0.03, 0.4, 7.5, 40.0])
+def test_free_roll_matches_stepping(speed, dt):
+    ball = BallState(0.0, 0.0)
+    ball.vx, ball.vy = speed * 0.6, -speed * 0.8
+    calls = 0
+    while ball.vx or ball.vy:
+        ball.update(dt)
+        calls += 1
+    assert calls * dt == stop_frames(speed, dt)
+    x, y, vx, vy = free_roll(0.0, 0.0, speed * 0.6, -speed * 0.8, calls * dt, dt)
+    assert (vx, vy) == (0.0, 0.0)
+    assert math.isclose(x, ball.x, abs_tol=1e-6) and math.isclose(y, ball.y, abs_tol=1e-6)
+
+
+def test_advance_matches_stepping_midway():
+    stepped = BallState(0.0, 0.0)
+    jumped = BallState(0.0, 0.0)
+    stepped.vx = jumped.vx = 12.0
+    for _ in range(100):
+        stepped.update()
+    jumped.advance(100)
+    assert math.isclose(jumped.x, stepped.x, abs_tol=1e-6)
+    assert math.isclose(jumped.vx, stepped.vx, rel_tol=1e-9)
+    assert jumped.frames_to_rest() == stop_frames(stepped.speed())
+
+
+def _shots():
+    for map_type in (1, 2, 3):
+        for k in range(4):
+            angle = k * 1.6
+            power = 6 + 9 * k
+            yield map_type, power * math.cos(angle), power * math.sin(angle)
+
+
+def _stepped(sim):
+    # frame by frame, never coasting
+    frames, events = 0, []
+    while True:
+        events.extend(sim.step())
+        frames += 1
+        if not sim.is_moving():
+            return frames, events
+
+
+@pytest.mark.parametrize('substeps', [1, 2])
+def test_coasting_is_identical_to_stepping(backend, substeps, monkeypatch):
+    cls = simulation_class(backend)
+    coast = cls.coast_to_rest
+    coasted = []
+
+    def counting(sim, *args):
+        coasted.append(coast(sim, *args))
+        return coasted[-1]
+    monkeypatch.setattr(cls, 'coast_to_rest', counting)
+    for map_type, vx, vy in _shots():
+        expected, _ = load_level(map_type, backend=backend, substeps=substeps)
+        sim, _ = load_level(map_type, backend=backend, substeps=substeps)
+        if backend == 'python':
+            # coasting moves balls behind the broad phase grid's back
+            sim.broadphase = expected.broadphase = True
+        expected.shoot(vx, vy)
+        sim.shoot(vx, vy)
+        frames, events = _stepped(expected)
+        seen = []
+        assert sim.run_until_rest(on_event=seen.append) == frames
+        assert seen == events
+        assert sim.positions() == expected.positions()
+        assert sim.frame == expected.frame
+        assert [b.in_pocket for b in sim.balls] == [b.in_pocket for b in expected.balls]
+        # a second shot from the coasted table (sleep state, broad phase grid)
+        sim.shoot(-vy, vx)
+        expected.shoot(-vy, vx)
+        assert sim.run_until_rest() == _stepped(expected)[0]
+        assert sim.positions() == expected.positions()
+    assert sum(coasted) > 0
+
+
+def test_coast_only_when_nothing_is_in_the_way(backend):
+    table = TableGeometry(0, 0, 1000, 500, [(0, 0), (1000, 0), (0, 500), (1000, 500)])
+    cls = simulation_class(backend)
+    free = cls(table, [BallState(200, 250, is_cue=True), BallState(800, 100, number=1)])
+    free.shoot(3.0, 0.5)
+    blocked = cls(table, [BallState(200, 250, is_cue=True), BallState(500, 250, number=1)])
+    blocked.shoot(3.0, 0.0)
+    cushion = cls(table, [BallState(200, 250, is_cue=True)])
+    cushion.shoot(0.0, 5.0)
+    assert free.coast_to_rest() > 0
+    assert not free.is_moving()
+    assert blocked.coast_to_rest() == 0
+    assert cushion.coast_to_rest() == 0
+
+
+def _played(backend, map_type, shots):
+    sim, _ = load_level(map_type, backend=backend)
+    played = []
+    for angle, power in shots:
+        events = []
+        sim.shoot(*shot_velocity(angle, power))
+        frames = sim.run_until_rest(on_event=events.append)
+        played.append((frames, events, snapshot(sim)))
+    return played
+
+
+@pytest.mark.parametrize('map_type', [1, 2, 3])
+@pytest.mark.parametrize('shot', range(12))
+def test_numpy_backend_matches_python(map_type, shot):
+    pytest.importorskip('numpy')
+    shots = random_shots(12, seed=map_type)[shot:shot + 1]
+    assert _played('numpy', map_type, shots) == _played('python', map_type, shots)
+
+
+@pytest.mark.parametrize('map_type', [1, 2, 3])
+def test_numpy_backend_matches_python_over_a_game(map_type):
+    # later shots start from the table the earlier ones left
+    pytest.importorskip('numpy')
+    shots = random_shots(6, seed=10 + map_type)
+    assert _played('numpy', map_type, shots) == _played('python', map_type, shots)
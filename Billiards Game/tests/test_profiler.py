@@ -0,0 +1,43 @@
+import profiler
+from profiler import FrameProfiler
+
+
+def test_toggle_off_mid_frame():
+    # Game.run keeps the profiler for the whole frame; F3 can switch it off after the events phase
+    prof = FrameProfiler()
+    prof.toggle()
+    prof.begin_frame()
+    prof.mark(profiler.EVENTS)
+    prof.toggle()
+    prof.mark(profiler.PHYSICS)
+    prof.mark(profiler.FLIP)
+    prof.end_frame()
+    assert not prof.enabled
+    assert len(prof.rows) == 0
+
+
+def test_frame_recorded():
+    prof = FrameProfiler()
+    prof.toggle()
+    prof.begin_frame()
+    for phase in range(len(profiler.PHASES)):
+        prof.mark(phase)
+    prof.end_frame()
+    assert len(prof.rows) == len(profiler.PHASES)
+    assert len(prof.history) == 1
+
+
+def test_long_session_keeps_the_last_frames(tmp_path):
+    prof = FrameProfiler(max_frames=3)
+    prof.toggle()
+    for k in range(5):
+        prof.begin_frame()
+        prof.row[profiler.PHYSICS] = k / 1000.0
+        prof.end_frame()
+    assert len(prof.rows) == 3 * len(profiler.PHASES)
+    path = tmp_path / 'profile.csv'
+    prof.export_csv(str(path))
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines[0].startswith('# first 2 frames dropped')
+    assert [line.split(',')[0] for line in lines[2:]] == ['2', '3', '4']
+    assert [line.split(',')[1 + profiler.PHYSICS] for line in lines[2:]] == ['2.000', '3.000', '4.000']
@@ -0,0 +1,28 @@
+from levels import load_level
+from replay import Recorder, ReplayFile
+from rules import GameRules
+
+
+def _record(path, vx):
+    sim, cfg = load_level(1)
+    rules = GameRules(1)
+    rules.sim = sim
+    rules.reset_rules(cfg)
+    recorder = Recorder(str(path))
+    recorder.record(sim, rules, vx, 0.0)
+    recorder.close()
+    return recorder.path
+
+
+def test_same_second_sessions_do_not_overwrite(tmp_path):
+    # two sessions started in the same second get the same time-stamped name
+    path = tmp_path / 'replays' / '20261016-201500.blr'
+    first = _record(path, 10.0)
+    second = _record(path, -10.0)
+    assert first == str(path)
+    assert second != first
+    for name, vx in ((first, 10.0), (second, -10.0)):
+        replay = ReplayFile(name)
+        assert len(replay) == 1
+        assert replay[0].velocity[0] == vx
+        replay.close()
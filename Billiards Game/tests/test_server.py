@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from server import TableClient, TableServer
+
+
+async def _session(requests, server=None):
+    """Send `requests` [(op, fields)] from one client; returns the replies (ValueError text for refusals)."""
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+    server = server or TableServer()
+    listener = await server.start(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    client = await TableClient.connect(port=port)
+    replies = []
+    try:
+        for op, fields in requests:
+            try:
+                replies.append(await client.request(op, **fields))
+            except ValueError as exc:
+                replies.append(str(exc))
+    finally:
+        await client.close()
+        # let the server see the disconnect before it stops
+        for _ in range(200):
+            if not server.clients:
+                break
+            await asyncio.sleep(0.01)
+        server.stop()
+        listener.close()
+        await listener.wait_closed()
+    assert not errors
+    return replies
+
+
+def test_malformed_shoot_keeps_session():
+    created, bad, state = asyncio.run(_session([
+        ('create', {'map': 1}),
+        ('shoot', {'table': 1}),
+        ('state', {'table': 1}),
+    ]))
+    assert created['type'] == 'created'
+    assert 'angle' in bad and 'power' in bad
+    # same connection, the table is still there
+    assert state['type'] == 'state' and state['table'] == 1
+
+
+@pytest.mark.parametrize('fields', [{'table': 1, 'angle': 'left', 'power': 1}, {'table': [1]}, {'table': 7}])
+def test_bad_fields_are_errors(fields):
+    replies = asyncio.run(_session([('create', {'map': 3}), ('shoot', fields), ('stats', {})]))
+    assert isinstance(replies[1], str)
+    assert replies[2]['tables'] == 1
+
+
+@pytest.mark.parametrize('bad', [{'angle': float('inf'), 'power': 0.5}, {'angle': float('nan'), 'power': 0.5},
+                                 {'angle': 30.0, 'power': float('nan')}, {'angle': 30.0, 'power': 2.0}])
+def test_bad_shot_leaves_table_playable(bad):
+    server = TableServer()
+    replies = asyncio.run(_session([
+        ('create', {'map': 1}),
+        ('shoot', dict(bad, table=1)),
+        ('state', {'table': 1}),
+        ('shoot', {'table': 1, 'angle': 30.0, 'power': 0.5}),
+    ], server))
+    assert isinstance(replies[1], str)
+    assert replies[2]['rolling'] is False and replies[2]['shots'] == 0
+    assert replies[3]['type'] == 'accepted'
+    # disconnecting mid-shot closes the table cleanly
+    assert not server.tables and not server.rolling
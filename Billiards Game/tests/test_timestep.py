@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+from levels import load_level
+from physics import snapshot
+from rules import GameRules, shot_velocity
+from timestep import FixedTimestep
+
+SHOTS = [(12.0, 0.9), (200.0, 0.6), (95.0, 1.0)]
+
+
+def _play(frame_times, map_type=1):
+    """Play SHOTS the way Game.update_physics does, one shot after the other; returns a digest of the end state."""
+    sim, cfg = load_level(map_type)
+    rules = GameRules(map_type)
+    rules.sim = sim
+    rules.reset_rules(cfg)
+    timestep = FixedTimestep(60, 5)
+    frames = 0
+    for angle, power in SHOTS:
+        rules.begin_shot()
+        sim.shoot(*shot_velocity(angle, power))
+        rolling = True
+        while rolling:
+            for _ in range(timestep.advance(frame_times[frames % len(frame_times)])):
+                for event in sim.step():
+                    rules.handle_physics_event(event)
+                if not sim.is_moving():
+                    # a shot ends on the step its balls stop
+                    rolling = False
+                    break
+            frames += 1
+        rules.finish_shot()
+        timestep.reset()
+    state = repr((snapshot(sim), sim.frame, rules.score)).encode()
+    return hashlib.blake2b(state, digest_size=8).hexdigest(), timestep
+
+
+@pytest.mark.parametrize('map_type', [1, 2, 3])
+def test_same_result_at_any_frame_rate(map_type):
+    runs = {
+        '30 fps': [1 / 30],
+        '60 fps': [1 / 60],
+        '144 fps': [1 / 144],
+        'jittery': [0.011, 0.023, 0.016, 0.009, 0.031],
+        'slow-frame spike': [1 / 60] * 20 + [0.5] + [1 / 144] * 30,
+    }
+    digests = {name: _play(times, map_type)[0] for name, times in runs.items()}
+    assert len(set(digests.values())) == 1, digests
+
+
+def test_spike_is_clamped():
+    timestep = FixedTimestep(60, 5)
+    assert timestep.advance(1 / 60) == 1
+    assert timestep.advance(0.5) == 5
+    # the rest of the half second is dropped, not owed to the next frames
+    assert timestep.dropped_time == pytest.approx(0.5 - 5 / 60, abs=1 / 60)
+    assert timestep.accumulator <= timestep.dt
+    assert timestep.advance(1 / 60) <= 2
+    _, played = _play([1 / 60] * 20 + [0.5] + [1 / 144] * 30)
+    assert played.dropped_time > 0.0
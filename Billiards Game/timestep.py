@@ -0,0 +1,54 @@
+"""
+Fixed-timestep accumulator: tách tốc độ vật lý khỏi tốc độ khung hình.
+
+Mỗi frame game cộng thời gian thực đã trôi qua vào accumulator rồi chạy đúng
+số bước vật lý cố định (PHYSICS_HZ) tương ứng, nên kết quả vật lý giống hệt
+nhau dù màn hình chạy 30, 60 hay 144 fps. Phần dư (alpha) dùng để nội suy vị
+trí khi vẽ. Số bước bù trong một frame bị giới hạn (max_steps) để một frame
+chậm không kéo theo vòng xoáy "spiral of death".
+"""
+
+
+class FixedTimestep:
+    def __init__(self, step_hz=60, max_steps=5):
+        self.dt = 1.0 / step_hz
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.dropped_time = 0.0  # seconds discarded by the catch-up cap
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self, frame_seconds):
+        """Add elapsed real time; return how many physics steps to run now."""
+        self.accumulator += max(0.0, frame_seconds)
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            # too far behind: run max_steps and drop the rest instead of
+            # trying to catch up (which would make the next frame slower still)
+            self.dropped_time += (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+            self.accumulator = min(self.accumulator - steps * self.dt, self.dt)
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        """How far (0..1) the render time is between the last two physics states."""
+        return min(1.0, self.accumulator / self.dt)
+
+
+def lerp_positions(previous, current, alpha, max_jump):
+    """
+    Interpolated (x, y) per ball between two position snapshots. Balls that
+    jumped further than max_jump in one step (pocketed, cue respawn) are
+    drawn at their current position instead of sliding across the table.
+    """
+    out = []
+    for (px, py), (cx, cy) in zip(previous, current):
+        if abs(cx - px) > max_jump or abs(cy - py) > max_jump:
+            out.append((cx, cy))
+        else:
+            out.append((px + (cx - px) * alpha, py + (cy - py) * alpha))
+    return out
@@ -0,0 +1,152 @@
+"""
+Ghi quỹ đạo (vị trí + vận tốc của mọi bi ở mọi bước physics) để phân tích.
+
+TrajectoryBuffer là mảng NumPy cấp phát trước, dạng frames x balls x 4
+(x, y, vx, vy), tăng gấp đôi khi đầy và được dùng lại giữa các cú đánh; mỗi
+bước physics chỉ là một phép gán vào mảng (với ArraySimulation là copy thẳng
+pos/vel), không tạo object Python nào theo frame.
+
+TrajectoryWriter ghi cú đánh vừa xong vào một file .npz (zip) ngay khi cú
+đánh kết thúc; cú đánh quá dài được ghi thành nhiều khúc (part) theo
+chunk_bytes, nên bộ nhớ luôn bị chặn dù phiên chơi dài bao lâu. Đọc lại:
+
+    data = numpy.load('trajectories/20261016-201500.npz')
+    shot = load_shot(data, 0)        # (frames, balls, 4), frame 0 = lúc đánh
+    numbers = data['shot00000_numbers']
+"""
+import os
+import zipfile
+
+import numpy as np
+
+FIELDS = ('x', 'y', 'vx', 'vy')
+CHUNK_BYTES = 32 * 1024 * 1024  # largest part of a shot kept in memory
+
+
+class TrajectoryBuffer:
+    """Growable (frames, balls, 4) array filled one physics step at a time."""
+
+    def __init__(self, n_balls, capacity=256, dtype=np.float64, max_capacity=None):
+        self.data = np.empty((capacity, n_balls, len(FIELDS)), dtype)
+        self.max_capacity = max_capacity
+        self.frames = 0
+
+    def reset(self, n_balls, max_capacity=None):
+        """Empty the buffer for a shot with n_balls balls (keeps the allocation if it fits)."""
+        self.max_capacity = max_capacity
+        capacity, balls, fields = self.data.shape
+        if max_capacity is not None and capacity > max_capacity:
+            capacity = max_capacity
+        if capacity != len(self.data) or balls != n_balls:
+            self.data = np.empty((capacity, n_balls, fields), self.data.dtype)
+        self.frames = 0
+
+    def capture(self, sim):
+        if self.frames == len(self.data):
+            self._grow()
+        row = self.data[self.frames]
+        pos = getattr(sim, 'pos', None)
+        if pos is not None:
+            # ArraySimulation: the state already is an array
+            row[:, :2] = pos
+            row[:, 2:] = sim.vel
+        else:
+            row[:] = [(b.x, b.y, b.vx, b.vy) for b in sim.balls]
+        self.frames += 1
+
+    def _grow(self):
+        capacity = 2 * len(self.data)
+        if self.max_capacity is not None:
+            capacity = max(len(self.data) + 1, min(capacity, self.max_capacity))
+        data = np.empty((capacity,) + self.data.shape[1:], self.data.dtype)
+        data[:self.frames] = self.data[:self.frames]
+        self.data = data
+
+    def view(self):
+        """The captured frames (a view, valid until the next reset)."""
+        return self.data[:self.frames]
+
+
+class TrajectoryWriter:
+    """
+    Streams shots to one .npz file: begin_shot(sim) when the cue ball is
+    struck, capture(sim) after every physics step, end_shot() when it is over.
+    Members: shotNNNNN_numbers (ball numbers) and shotNNNNN_partPPP arrays.
+    """
+
+    def __init__(self, path, dtype=np.float64, chunk_bytes=CHUNK_BYTES, compress=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.chunk_bytes = chunk_bytes
+        self.compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self.zip = None
+        self.buffer = None
+        self.chunk_frames = 1
+        self.shots = 0
+        self.part = 0
+        self.active = False
+
+    def begin_shot(self, sim):
+        if self.active:
+            self.end_shot()
+        n = len(sim.balls)
+        self.chunk_frames = max(1, self.chunk_bytes // max(1, n * len(FIELDS) * self.dtype.itemsize))
+        if self.buffer is None:
+            self.buffer = TrajectoryBuffer(n, min(256, self.chunk_frames), self.dtype, self.chunk_frames)
+        else:
+            self.buffer.reset(n, self.chunk_frames)
+        self.part = 0
+        self.active = True
+        self._write(f'shot{self.shots:05d}_numbers', np.array([b.number for b in sim.balls], np.int32))
+        # frame 0: the table as the cue ball is struck
+        self.capture(sim)
+
+    def capture(self, sim):
+        if not self.active:
+            return
+        self.buffer.capture(sim)
+        if self.buffer.frames >= self.chunk_frames:
+            self._flush()
+
+    def end_shot(self):
+        if not self.active:
+            return
+        self._flush()
+        self.active = False
+        self.shots += 1
+
+    def _flush(self):
+        if self.buffer.frames:
+            self._write(f'shot{self.shots:05d}_part{self.part:03d}', self.buffer.view())
+            self.part += 1
+            self.buffer.frames = 0
+
+    def _write(self, name, array):
+        if self.zip is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.zip = zipfile.ZipFile(self.path, 'w', self.compression, allowZip64=True)
+        with self.zip.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+
+    def close(self):
+        """Finish the current shot and write the .npz directory."""
+        if self.active:
+            self.end_shot()
+        if self.zip is not None:
+            self.zip.close()
+            self.zip = None
+
+
+def shot_count(npz):
+    return sum(1 for name in npz.files if name.endswith('_numbers'))
+
+
+def load_shot(npz, k):
+    """(frames, balls, 4) trajectory of shot k from numpy.load() of a writer's file."""
+    prefix = f'shot{k:05d}_part'
+    parts = sorted((int(name[len(prefix):]), name) for name in npz.files if name.startswith(prefix))
+    if not parts:
+        raise KeyError(f"no trajectory for shot {k}")
+    return np.concatenate([npz[name] for _, name in parts])